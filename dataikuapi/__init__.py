@@ -1,9 +1,13 @@
 from .dssclient import DSSClient
+from .async_dssclient import AsyncDSSClient
 from .fmclient import FMClientAWS, FMClientAzure, FMClientGCP
 from .govern_client import GovernClient
 
 from .apinode_client import APINodeClient
 from .apinode_admin_client import APINodeAdminClient
+from .transport import TransportPolicy
+from .cache import MetadataCache
+from .instrumentation import RequestInstrumentation, EndpointLatencyStats
 
 from .dss.recipe import GroupingRecipeCreator, UpsertRecipeCreator, JoinRecipeCreator, StackRecipeCreator, WindowRecipeCreator, SyncRecipeCreator, SamplingRecipeCreator, SQLQueryRecipeCreator, CodeRecipeCreator, SplitRecipeCreator, SortRecipeCreator, TopNRecipeCreator, DistinctRecipeCreator, DownloadRecipeCreator, PredictionScoringRecipeCreator, ClusteringScoringRecipeCreator
 
@@ -9,7 +9,7 @@ from .base_client import DSSBaseClient
 class APINodeAdminClient(DSSBaseClient):
     """Entry point for the DSS APINode admin client"""
 
-    def __init__(self, uri, api_key, no_check_certificate=False, client_certificate=None, **kwargs):
+    def __init__(self, uri, api_key, no_check_certificate=False, client_certificate=None, transport_policy=None, **kwargs):
         """Initialize a new DSS API Node Admin client.
 
         This client provides administrative access to DSS API node admin.
@@ -21,6 +21,8 @@ class APINodeAdminClient(DSSBaseClient):
                 Defaults to False.
             client_certificate (str or tuple, optional): Path to client certificate file or tuple of 
                 (cert, key) paths for client certificate authentication
+            transport_policy (:class:`dataikuapi.transport.TransportPolicy`, optional): Timeouts, connection pool
+                and retries of the HTTP requests. Defaults to no timeout and no retry.
             **kwargs: Additional keyword arguments. Note: 'insecure_tls' is deprecated in favor of 
                 no_check_certificate.
 
@@ -34,7 +36,7 @@ class APINodeAdminClient(DSSBaseClient):
             warnings.warn("insecure_tls field is now deprecated. It has been replaced by no_check_certificate.", DeprecationWarning)
             no_check_certificate = kwargs.get("insecure_tls") or no_check_certificate
 
-        DSSBaseClient.__init__(self, "%s/%s" % (uri, "admin/api"), api_key, no_check_certificate=no_check_certificate, client_certificate=client_certificate)
+        DSSBaseClient.__init__(self, "%s/%s" % (uri, "admin/api"), api_key, no_check_certificate=no_check_certificate, client_certificate=client_certificate, transport_policy=transport_policy)
 
     ########################################################
     # Services generations
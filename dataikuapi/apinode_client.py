@@ -1,12 +1,20 @@
+import logging
+import threading
+import time
 import warnings
+from collections import deque
 from .base_client import DSSBaseClient
+from .utils import _ExponentialBackoff, _is_transient_error, _iter_ordered_concurrently
+
+logger = logging.getLogger(__name__)
+
 
 class APINodeClient(DSSBaseClient):
     """Entry point for the DSS API Node client
     This is an API client for the user-facing API of DSS API Node server (user facing API)
     """
 
-    def __init__(self, uri, service_id, api_key=None, bearer_token=None, no_check_certificate=False, client_certificate=None, **kwargs):
+    def __init__(self, uri, service_id, api_key=None, bearer_token=None, no_check_certificate=False, client_certificate=None, transport_policy=None, **kwargs):
         """
         Instantiate a new DSS API client on the given base URI with the given API key.
 
@@ -16,13 +24,51 @@ class APINodeClient(DSSBaseClient):
         :param str bearer_token: Optional, The bearer token. Only required if the service has its authorization setup to OAuth2/JWT
         :param bool no_check_certificate: Optional, If True, disables SSL certificate verification
         :param str or tuple client_certificate: Optional, Path to client certificate file or tuple of (cert, key) paths for client certificate authentication
+        :param transport_policy: Optional, timeouts, connection pool and retries of the HTTP requests, as a :class:`dataikuapi.transport.TransportPolicy`.
+            As prediction calls are POST requests, add "POST" to its retry_methods to retry them
         """
         if "insecure_tls" in kwargs:
             # Backward compatibility before removing insecure_tls option
             warnings.warn("insecure_tls field is now deprecated. It has been replaced by no_check_certificate.", DeprecationWarning)
             no_check_certificate = kwargs.get("insecure_tls") or no_check_certificate
 
-        DSSBaseClient.__init__(self, "%s/%s" % (uri, "public/api/v1/%s" % service_id), api_key=api_key, bearer_token=bearer_token, no_check_certificate=no_check_certificate, client_certificate=client_certificate)
+        DSSBaseClient.__init__(self, "%s/%s" % (uri, "public/api/v1/%s" % service_id), api_key=api_key, bearer_token=bearer_token, no_check_certificate=no_check_certificate, client_certificate=client_certificate, transport_policy=transport_policy)
+        self._coalescer = None
+
+    def enable_request_coalescing(self, window_ms=2, max_batch_size=64):
+        """
+        Group concurrent single-record calls into multi-record calls.
+
+        Once enabled, calls to :meth:`predict_record` and :meth:`lookup_record` made at the same time from several
+        threads are not sent separately: the first call waits up to `window_ms` milliseconds for other calls to the
+        same endpoint (with the same options), then sends all of them in a single call to the multi-record endpoint,
+        and each caller gets its own answer. A batch is sent without waiting as soon as it has `max_batch_size` records.
+
+        This trades a little latency (at most `window_ms`) for far fewer HTTP round trips under concurrent load.
+        Use :meth:`get_request_coalescing_metrics` to monitor the effect.
+
+        :param float window_ms: Optional, maximum time a call waits for other calls to group with, in milliseconds
+        :param int max_batch_size: Optional, maximum number of records in a grouped call
+        """
+        self._coalescer = _RequestCoalescer(window_ms, max_batch_size)
+
+    def disable_request_coalescing(self):
+        """
+        Send each single-record call separately again. See :meth:`enable_request_coalescing`
+        """
+        self._coalescer = None
+
+    def get_request_coalescing_metrics(self):
+        """
+        Get metrics about the grouping of single-record calls, since it was enabled
+
+        :return: a Python dict with the number of "calls" and "batches", the "averageBatchSize", the latency of the calls
+                 ("latencyP50Ms", "latencyP99Ms", computed on the most recent calls) and the average time spent waiting
+                 for other calls ("averageOverheadMs"), or None if coalescing is not enabled
+        """
+        if self._coalescer is None:
+            return None
+        return self._coalescer.get_metrics()
 
     @staticmethod
     def _set_dispatch(obj, forced_generation, dispatch_key):
@@ -60,6 +106,24 @@ class APINodeClient(DSSBaseClient):
         }
 
         self._set_dispatch(obj, forced_generation, dispatch_key)
+
+        coalescer = self._coalescer
+        if coalescer is not None:
+            record = {"features": features}
+            if context is not None:
+                record["context"] = context
+            key = ("predict", endpoint_id, forced_generation, dispatch_key, with_explanations, explanation_method, n_explanations, n_explanations_mc_steps)
+
+            def predict_multi(records):
+                resp = self.predict_records(endpoint_id, records, forced_generation=forced_generation, dispatch_key=dispatch_key,
+                                            with_explanations=with_explanations, explanation_method=explanation_method,
+                                            n_explanations=n_explanations, n_explanations_mc_steps=n_explanations_mc_steps)
+                # same shape as the answer of a single prediction
+                others = {k: v for (k, v) in resp.items() if k != "results"}
+                return [dict(others, result=result) for result in resp["results"]]
+
+            return coalescer.submit(key, record, predict_multi)
+
         if context is not None:
             obj["context"] = context
 
@@ -101,6 +165,54 @@ class APINodeClient(DSSBaseClient):
 
         return self._perform_json("POST", "%s/predict-multi" % endpoint_id, body = obj)
 
+    def predict_stream(self, endpoint_id, records, batch_size=100, concurrency=4, forced_generation=None, dispatch_key=None,
+                       with_explanations=None, explanation_method=None, n_explanations=None, n_explanations_mc_steps=None,
+                       max_retries=3, progress_callback=None):
+        """
+        Predicts a large number of records on a DSS API node endpoint (standard or custom prediction)
+
+        The records are sent in batches with :meth:`predict_records`, with up to `concurrency` batches in flight at the
+        same time. Records are read from the input only as batches complete, so that the input can be larger than the
+        memory. A batch which fails with a transient error (connection error, timeout, HTTP 429 or 5xx) is retried alone,
+        with an exponential backoff.
+
+        Usage example:
+
+        .. code-block:: python
+
+            client = APINodeClient(uri, service_id, transport_policy=TransportPolicy(pool_maxsize=8))
+            records = ({"features": row} for row in read_rows())
+            for result in client.predict_stream("my_endpoint", records, concurrency=8):
+                write_prediction(result["result"])
+
+        :param str endpoint_id: Identifier of the endpoint to query
+        :param records: the records, either as an iterable of records, each one being a Python dict containing a
+                        "features" dict (see predict_records), or as a pandas DataFrame of features
+        :param int batch_size: Optional, number of records sent in each call to the endpoint
+        :param int concurrency: Optional, maximum number of calls in flight at the same time. The connection pool of
+                                the client (see :class:`dataikuapi.transport.TransportPolicy`) should be at least as large
+        :param forced_generation: See documentation about multi-version prediction
+        :param dispatch_key: See documentation about multi-version prediction
+        :param with_explanations: Optional, see predict_records
+        :param explanation_method: Optional, see predict_records
+        :param n_explanations: Optional, see predict_records
+        :param n_explanations_mc_steps: Optional, see predict_records
+        :param int max_retries: Optional, number of times a batch failing with a transient error is retried
+        :param progress_callback: Optional, function called after each batch with a dict of statistics: "rows" (number
+                                  of records processed so far), "batches", "elapsedSeconds" and "rowsPerSecond"
+
+        :return: an iterator over the result objects, one per record, in the order of the records
+        """
+        def predict(batch):
+            return self.predict_records(endpoint_id, batch, forced_generation=forced_generation, dispatch_key=dispatch_key,
+                                        with_explanations=with_explanations, explanation_method=explanation_method,
+                                        n_explanations=n_explanations, n_explanations_mc_steps=n_explanations_mc_steps)
+
+        for (batch, resp) in self._iter_batch_responses(predict, _iter_record_batches(records, batch_size, "features"),
+                                                         concurrency, max_retries, progress_callback):
+            for result in resp["results"]:
+                yield result
+
     def forecast(self, endpoint_id, records, forced_generation=None, dispatch_key=None):
         """
         Forecast using a time series forecasting model on a DSS API node endpoint
@@ -199,6 +311,33 @@ class APINodeClient(DSSBaseClient):
 
         return self._perform_json("POST", "%s/predict-effect-multi" % endpoint_id, body = obj)
 
+    def predict_effects_stream(self, endpoint_id, records, batch_size=100, concurrency=4, forced_generation=None,
+                               dispatch_key=None, max_retries=3, progress_callback=None):
+        """
+        Predicts the treatment effects of a large number of records on a DSS API node endpoint (standard causal prediction)
+
+        The records are sent in batches with :meth:`predict_effects`, as in :meth:`predict_stream`.
+
+        :param str endpoint_id: Identifier of the endpoint to query
+        :param records: the records, either as an iterable of records, each one being a Python dict containing a
+                        "features" dict (see predict_records), or as a pandas DataFrame of features
+        :param int batch_size: Optional, number of records sent in each call to the endpoint
+        :param int concurrency: Optional, maximum number of calls in flight at the same time
+        :param forced_generation: See documentation about multi-version prediction
+        :param dispatch_key: See documentation about multi-version prediction
+        :param int max_retries: Optional, number of times a batch failing with a transient error is retried
+        :param progress_callback: Optional, function called after each batch with a dict of statistics, see predict_stream
+
+        :return: an iterator over the result objects, one per record, in the order of the records
+        """
+        def predict(batch):
+            return self.predict_effects(endpoint_id, batch, forced_generation=forced_generation, dispatch_key=dispatch_key)
+
+        for (batch, resp) in self._iter_batch_responses(predict, _iter_record_batches(records, batch_size, "features"),
+                                                         concurrency, max_retries, progress_callback):
+            for result in resp["results"]:
+                yield result
+
     def sql_query(self, endpoint_id, parameters):
         """
         Queries a "SQL query" endpoint on a DSS API node
@@ -227,6 +366,13 @@ class APINodeClient(DSSBaseClient):
         if context is not None:
             obj["context"] = context
 
+        coalescer = self._coalescer
+        if coalescer is not None:
+            def lookup_multi(records):
+                return self.lookup_records(endpoint_id, records)["results"]
+
+            return coalescer.submit(("lookup", endpoint_id), obj, lookup_multi)
+
         return self._perform_json("POST", "%s/lookup" % endpoint_id, body = obj).get("results", [])[0]
 
     def lookup_records(self, endpoint_id, records):
@@ -249,6 +395,85 @@ class APINodeClient(DSSBaseClient):
 
         return self._perform_json("POST", "%s/lookup-multi" % endpoint_id, body = obj)
 
+    def lookup_stream(self, endpoint_id, records, batch_size=100, concurrency=4, max_retries=3, progress_callback=None):
+        """
+        Lookups a large number of records on a DSS API node endpoint of "dataset lookup" type
+
+        The records are sent in batches with :meth:`lookup_records`, as in :meth:`predict_stream`.
+
+        :param str endpoint_id: Identifier of the endpoint to query
+        :param records: the records, either as an iterable of records, each one being a Python dict containing a
+                        "data" dict (see lookup_records), or as a pandas DataFrame of input columns
+        :param int batch_size: Optional, number of records sent in each call to the endpoint
+        :param int concurrency: Optional, maximum number of calls in flight at the same time
+        :param int max_retries: Optional, number of times a batch failing with a transient error is retried
+        :param progress_callback: Optional, function called after each batch with a dict of statistics, see predict_stream
+
+        :return: an iterator over the result objects, one per record, in the order of the records
+        """
+        def lookup(batch):
+            return self.lookup_records(endpoint_id, batch)
+
+        for (batch, resp) in self._iter_batch_responses(lookup, _iter_record_batches(records, batch_size, "data"),
+                                                         concurrency, max_retries, progress_callback):
+            for result in resp["results"]:
+                yield result
+
+    def forecast_stream(self, endpoint_id, batches, concurrency=4, forced_generation=None, dispatch_key=None,
+                        max_retries=3, progress_callback=None):
+        """
+        Forecast many batches of time series on a DSS API node endpoint
+
+        Unlike the other streaming methods, the records are not batched automatically, since all the records of a
+        time series must be sent in the same call. Each batch is sent with :meth:`forecast`, as in :meth:`predict_stream`.
+
+        :param str endpoint_id: Identifier of the endpoint to query
+        :param batches: an iterable of batches of records, each batch being a list of records as in :meth:`forecast`,
+                        or a pandas DataFrame
+        :param int concurrency: Optional, maximum number of calls in flight at the same time
+        :param forced_generation: See documentation about multi-version prediction
+        :param dispatch_key: See documentation about multi-version prediction
+        :param int max_retries: Optional, number of times a batch failing with a transient error is retried
+        :param progress_callback: Optional, function called after each batch with a dict of statistics, see predict_stream
+
+        :return: an iterator over the API answers, one per batch, in the order of the batches
+        """
+        def forecast(batch):
+            return self.forecast(endpoint_id, batch, forced_generation=forced_generation, dispatch_key=dispatch_key)
+
+        batches = (_dataframe_to_records(batch) if hasattr(batch, "iloc") else batch for batch in batches)
+        for (batch, resp) in self._iter_batch_responses(forecast, batches, concurrency, max_retries, progress_callback):
+            yield resp
+
+    def _iter_batch_responses(self, call, batches, concurrency, max_retries, progress_callback):
+        def run(batch):
+            eb = _ExponentialBackoff(500, 30000, 2)
+            attempt = 0
+            while True:
+                try:
+                    return (batch, call(batch))
+                except Exception as e:
+                    # invalid records, an unknown endpoint or an authentication failure would fail again
+                    if attempt >= max_retries or not _is_transient_error(e):
+                        raise
+                    attempt += 1
+                    logger.warning("Batch of %s records failed, retrying (%s/%s): %s" % (len(batch), attempt, max_retries, e))
+                    eb.sleep_next()
+
+        start = time.time()
+        rows = 0
+        batch_count = 0
+        for (batch, resp) in _iter_ordered_concurrently(run, batches, concurrency):
+            rows += len(batch)
+            batch_count += 1
+            if progress_callback is not None:
+                elapsed = time.time() - start
+                progress_callback({"rows": rows, "batches": batch_count, "elapsedSeconds": elapsed,
+                                   "rowsPerSecond": rows / elapsed if elapsed > 0 else None})
+            yield (batch, resp)
+        elapsed = time.time() - start
+        logger.info("Processed %s records in %s batches in %.1fs (%.0f records/s)" % (rows, batch_count, elapsed, rows / elapsed if elapsed > 0 else 0))
+
     def run_function(self, endpoint_id, **kwargs):
         """
         Calls a "Run function" endpoint on a DSS API node
@@ -262,3 +487,118 @@ class APINodeClient(DSSBaseClient):
         for (k,v) in kwargs.items():
             obj[k] = v
         return self._perform_json("POST", "%s/run" % endpoint_id, body = obj)
+
+
+class _CoalescedBatch(object):
+    def __init__(self):
+        self.records = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class _RequestCoalescer(object):
+    """
+    Groups records submitted concurrently for the same key. The first caller of a batch is its leader: it waits for
+    the window to elapse or the batch to be full, sends the batch, and wakes up the other callers. No background
+    thread is needed.
+    """
+    LATENCY_SAMPLES = 10000
+
+    def __init__(self, window_ms, max_batch_size):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._open_batches = {}
+        self._calls = 0
+        self._batches = 0
+        self._total_overhead = 0.0
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def submit(self, key, record, call_multi):
+        start = time.time()
+        with self._lock:
+            batch = self._open_batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = _CoalescedBatch()
+                self._open_batches[key] = batch
+            index = len(batch.records)
+            batch.records.append(record)
+            if len(batch.records) >= self.max_batch_size:
+                # closed, the next call starts a new batch
+                del self._open_batches[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open_batches.get(key) is batch:
+                    del self._open_batches[key]
+                self._batches += 1
+            sent = time.time()
+            try:
+                batch.results = call_multi(batch.records)
+            except Exception as e:
+                batch.error = e
+            batch.done.set()
+        else:
+            batch.done.wait()
+            sent = None
+
+        end = time.time()
+        with self._lock:
+            self._calls += 1
+            self._latencies.append(end - start)
+            if sent is not None:
+                self._total_overhead += sent - start
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def get_metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls = self._calls
+            batches = self._batches
+            total_overhead = self._total_overhead
+
+        def percentile(p):
+            if len(latencies) == 0:
+                return None
+            return 1000.0 * latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "calls": calls,
+            "batches": batches,
+            "averageBatchSize": float(calls) / batches if batches > 0 else None,
+            "latencyP50Ms": percentile(0.5),
+            "latencyP99Ms": percentile(0.99),
+            "averageOverheadMs": 1000.0 * total_overhead / batches if batches > 0 else None
+        }
+
+
+def _dataframe_to_records(df):
+    import pandas as pd
+    return df.astype(object).where(pd.notnull(df), None).to_dict(orient="records")
+
+
+def _iter_record_batches(records, batch_size, key):
+    """
+    Split records in lists of `batch_size` records. A pandas DataFrame is converted to records, each row being put in
+    a dict under `key`, with missing values as None
+    """
+    if hasattr(records, "iloc"):
+        for start in range(0, len(records), batch_size):
+            yield [{key: row} for row in _dataframe_to_records(records.iloc[start:start + batch_size])]
+    else:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
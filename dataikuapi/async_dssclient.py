@@ -0,0 +1,246 @@
+import asyncio
+import json
+import ssl
+
+from .dss.async_handles import AsyncDSSProject, AsyncDSSFuture
+from .transport import TransportPolicy
+from .utils import _get_http_exception
+
+
+class AsyncDSSClient(object):
+    """
+    Entry point for the asyncio flavor of the DSS API client.
+
+    The requests are sent on an `aiohttp` session, and at most `max_concurrency` of them are in flight at the same
+    time. This allows a single process to drive hundreds of calls concurrently, for example with :func:`asyncio.gather`.
+    Only the most frequently used handles have an asyncio flavor: see :class:`dataikuapi.dss.async_handles.AsyncDSSProject`.
+    For everything else, use a :class:`dataikuapi.DSSClient`.
+
+    .. note::
+
+        This client requires the aiohttp package.
+
+    Usage example:
+
+    .. code-block:: python
+
+        async def get_all_dataset_settings():
+            async with AsyncDSSClient(host, api_key, max_concurrency=50) as client:
+                projects = [client.get_project(key) for key in await client.list_project_keys()]
+                datasets = []
+                for project, items in zip(projects, await asyncio.gather(*[p.list_datasets() for p in projects])):
+                    datasets.extend(project.get_dataset(item["name"]) for item in items)
+                return await asyncio.gather(*[d.get_settings() for d in datasets])
+
+    :param str host: The host URL of the DSS instance (e.g., "http://localhost:11200")
+    :param str api_key: (optional) API key for authentication
+    :param str internal_ticket: (optional) internal ticket for authentication
+    :param dict extra_headers: (optional) additional HTTP headers to include in requests
+    :param bool no_check_certificate: (optional) if True, disables SSL certificate verification
+    :param client_certificate: (optional) path to client certificate file or tuple of (cert, key) paths
+    :type client_certificate: str or tuple
+    :param transport_policy: (optional) timeouts and retries of the HTTP requests. Defaults to no timeout and no retry
+    :type transport_policy: :class:`dataikuapi.transport.TransportPolicy`
+    :param int max_concurrency: (optional) maximum number of requests in flight at the same time, defaults to 64
+    """
+
+    def __init__(self, host, api_key=None, internal_ticket=None, extra_headers=None, no_check_certificate=False, client_certificate=None, transport_policy=None, max_concurrency=64):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncDSSClient requires the aiohttp package")
+        self._aiohttp = aiohttp
+
+        self.api_key = api_key
+        self.internal_ticket = internal_ticket
+        self.host = host
+        self._transport_policy = transport_policy if transport_policy is not None else TransportPolicy()
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._session = None
+
+        self._headers = {}
+        if self.api_key is not None:
+            self._auth = aiohttp.BasicAuth(self.api_key, "")
+        elif self.internal_ticket is not None:
+            self._auth = None
+            self._headers["X-DKU-APITicket"] = self.internal_ticket
+        else:
+            raise ValueError("API Key is required")
+        if extra_headers is not None:
+            self._headers.update(extra_headers)
+
+        if no_check_certificate:
+            self._ssl = False
+        elif client_certificate:
+            self._ssl = ssl.create_default_context()
+            if isinstance(client_certificate, (tuple, list)):
+                self._ssl.load_cert_chain(*client_certificate)
+            else:
+                self._ssl.load_cert_chain(client_certificate)
+        else:
+            self._ssl = True
+
+    async def close(self):
+        """
+        Close the underlying HTTP session
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    ########################################################
+    # Futures
+    ########################################################
+
+    async def list_futures(self, all_users=False):
+        """
+        List the currently-running long tasks (a.k.a futures)
+
+        :param boolean all_users: if True, returns futures for all users (requires admin privileges)
+
+        :return: list of futures, each one as a dict containing at least a 'jobId' field
+        :rtype: list of dict
+        """
+        return await self._perform_json("GET", "/futures/", params={"withScenarios": False, "withNotScenarios": True, 'allUsers': all_users})
+
+    def get_future(self, job_id):
+        """
+        Get a handle to interact with a specific long task (a.k.a future).
+
+        :param str job_id: the job_id key of the desired future
+
+        :returns: A :class:`dataikuapi.dss.async_handles.AsyncDSSFuture`
+        """
+        return AsyncDSSFuture(self, job_id)
+
+    ########################################################
+    # Projects
+    ########################################################
+
+    async def list_project_keys(self):
+        """
+        List the project keys (=project identifiers).
+
+        :returns: list of project keys identifiers, as strings
+        :rtype: list of strings
+        """
+        return [x["projectKey"] for x in await self._perform_json("GET", "/projects/")]
+
+    async def list_projects(self, include_location=False):
+        """
+        List the projects
+
+        :param bool include_location: whether to include project locations (slower)
+        :returns: a list of projects, each as a dict. Each dict contains at least a 'projectKey' field
+        :rtype: list of dicts
+        """
+        return await self._perform_json("GET", "/projects/", params={"includeLocation": include_location})
+
+    def get_project(self, project_key):
+        """
+        Get a handle to interact with a specific project.
+
+        :param str project_key: the project key of the desired project
+        :returns: A :class:`dataikuapi.dss.async_handles.AsyncDSSProject`
+        """
+        return AsyncDSSProject(self, project_key)
+
+    ########################################################
+    # Internal Request handling
+    ########################################################
+
+    def _get_session(self):
+        if self._session is None:
+            policy = self._transport_policy
+            timeout = self._aiohttp.ClientTimeout(total=None, sock_connect=policy.connect_timeout, sock_read=policy.read_timeout)
+            connector = self._aiohttp.TCPConnector(limit=self._max_concurrency, ssl=self._ssl)
+            self._session = self._aiohttp.ClientSession(headers=self._headers, auth=self._auth, timeout=timeout, connector=connector)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    @staticmethod
+    def _encode_params(params):
+        # same encoding as requests: None values are dropped, lists are repeated keys
+        if params is None:
+            return None
+        encoded = []
+        for (k, v) in params.items():
+            values = v if isinstance(v, (list, tuple)) else [v]
+            for value in values:
+                if value is not None:
+                    encoded.append((k, str(value)))
+        return encoded
+
+    async def _perform_http(self, method, path, params=None, body=None, stream=False, raw_body=None, headers=None, timeout=None):
+        if body is not None:
+            body = json.dumps(body)
+        if raw_body is not None:
+            body = raw_body
+
+        session = self._get_session()
+        policy = self._transport_policy
+        request_timeout = None
+        if timeout is not None:
+            if isinstance(timeout, tuple):
+                request_timeout = self._aiohttp.ClientTimeout(total=None, sock_connect=timeout[0], sock_read=timeout[1])
+            else:
+                request_timeout = self._aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        replayable = method.upper() in policy.retry_methods and policy._is_replayable({"data": body})
+        backoff = None
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                try:
+                    http_res = await session.request(method, "%s/dip/publicapi%s" % (self.host, path),
+                                                     params=self._encode_params(params), data=body,
+                                                     headers=headers, timeout=request_timeout)
+                except (self._aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt >= policy.max_retries or not replayable:
+                        raise
+                    retry_after = None
+                else:
+                    if attempt >= policy.max_retries or not replayable or http_res.status not in policy.retry_statuses:
+                        break
+                    retry_after = policy._get_retry_after(http_res)
+                    http_res.release()
+                attempt += 1
+                if backoff is None:
+                    backoff = policy._new_backoff()
+                await asyncio.sleep(policy._get_sleep_time(backoff, retry_after))
+
+            if http_res.status >= 400:
+                text = await http_res.text()
+                http_res.release()
+                try:
+                    ex = json.loads(text)
+                except ValueError:
+                    ex = {"message": text}
+                raise _get_http_exception(ex, http_res.status)
+            if not stream:
+                await http_res.read()
+                http_res.release()
+        return http_res
+
+    async def _perform_empty(self, method, path, params=None, body=None, raw_body=None, headers=None, timeout=None):
+        await self._perform_http(method, path, params=params, body=body, stream=False, raw_body=raw_body, headers=headers, timeout=timeout)
+
+    async def _perform_text(self, method, path, params=None, body=None, raw_body=None, headers=None, timeout=None):
+        http_res = await self._perform_http(method, path, params=params, body=body, stream=False, raw_body=raw_body, headers=headers, timeout=timeout)
+        return await http_res.text()
+
+    async def _perform_json(self, method, path, params=None, body=None, raw_body=None, headers=None, timeout=None):
+        http_res = await self._perform_http(method, path, params=params, body=body, stream=False, raw_body=raw_body, headers=headers, timeout=timeout)
+        return json.loads(await http_res.text())
+
+    async def _perform_raw(self, method, path, params=None, body=None, raw_body=None, headers=None, timeout=None):
+        """
+        The returned :class:`aiohttp.ClientResponse` must be released by the caller once its content is consumed
+        """
+        return await self._perform_http(method, path, params=params, body=body, stream=True, raw_body=raw_body, headers=headers, timeout=timeout)
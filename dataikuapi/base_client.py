@@ -5,9 +5,10 @@ from requests import exceptions
 from requests.auth import HTTPBasicAuth
 from .auth import HTTPBearerAuth
 from .utils import handle_http_exception
+from .transport import TransportPolicy
 
 class DSSBaseClient(object):
-    def __init__(self, base_uri, api_key=None, internal_ticket=None, bearer_token=None, no_check_certificate=False, client_certificate=None, **kwargs):
+    def __init__(self, base_uri, api_key=None, internal_ticket=None, bearer_token=None, no_check_certificate=False, client_certificate=None, transport_policy=None, **kwargs):
         if "insecure_tls" in kwargs:
             # Backward compatibility before removing insecure_tls option
             warnings.warn("insecure_tls field is now deprecated. It has been replaced by no_check_certificate.", DeprecationWarning)
@@ -21,13 +22,15 @@ class DSSBaseClient(object):
             self._session.verify = False
         if client_certificate:
             self._session.cert = client_certificate
+        self._transport_policy = transport_policy if transport_policy is not None else TransportPolicy()
+        self._transport_policy.mount(self._session)
 
 
     ########################################################
     # Internal Request handling
     ########################################################
 
-    def _perform_http(self, method, path, params=None, body=None, stream=False):
+    def _perform_http(self, method, path, params=None, body=None, stream=False, timeout=None):
         if body:
             body = json.dumps(body)
 
@@ -39,22 +42,23 @@ class DSSBaseClient(object):
         elif self.bearer_token:
             auth = HTTPBearerAuth(self.bearer_token)
 
-        http_res = self._session.request(
-                    method, "%s/%s" % (self.base_uri, path),
+        http_res = self._transport_policy.request(
+                    self._session, method, "%s/%s" % (self.base_uri, path),
                     params=params, data=body, headers=headers,
                     auth=auth, stream = stream,
-                    verify=self._session.verify)
+                    verify=self._session.verify,
+                    timeout=timeout)
         handle_http_exception(http_res)
         return http_res
 
-    def _perform_empty(self, method, path, params=None, body=None):
-        self._perform_http(method, path, params, body, False)
+    def _perform_empty(self, method, path, params=None, body=None, timeout=None):
+        self._perform_http(method, path, params, body, False, timeout)
 
-    def _perform_text(self, method, path, params=None, body=None):
-        return self._perform_http(method, path, params, body, False).text
+    def _perform_text(self, method, path, params=None, body=None, timeout=None):
+        return self._perform_http(method, path, params, body, False, timeout).text
 
-    def _perform_json(self, method, path, params=None, body=None):
-        return self._perform_http(method, path, params, body, False).json()
+    def _perform_json(self, method, path, params=None, body=None, timeout=None):
+        return self._perform_http(method, path, params, body, False, timeout).json()
 
-    def _perform_raw(self, method, path, params=None, body=None):
-        return self._perform_http(method, path, params, body, True)
+    def _perform_raw(self, method, path, params=None, body=None, timeout=None):
+        return self._perform_http(method, path, params, body, True, timeout)
@@ -0,0 +1,151 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class MetadataCache(object):
+    """
+    A read-through cache of the GET responses of a :class:`dataikuapi.DSSClient`, for the metadata of DSS objects:
+    settings, schemas, definitions, and lists of objects.
+
+    Responses are keyed on their path and parameters, and kept for a TTL that depends on the path. The TTL of a path is
+    given by the first rule of `ttls` whose regular expression matches the path, or `default_ttl` if none matches. Paths
+    with a TTL of 0 are never cached. The default rules only cache metadata, never states that change by themselves, like
+    the status of futures, jobs or scenario runs.
+
+    When the client sends a POST, PUT or DELETE, the cached responses of the same object path, of its parents (for
+    example the list of datasets of the project) and of its children are invalidated. Changes done outside the client
+    are not seen until the TTL expires.
+
+    Each cache hit returns a new copy of the response, so the objects returned can be modified as usual.
+
+    Usage example:
+
+    .. code-block:: python
+
+        client = DSSClient(host, api_key)
+        with client.metadata_caching(MetadataCache(default_ttl=0, max_size=5000)) as cache:
+            for project_key in client.list_project_keys():
+                for dataset in client.get_project(project_key).list_datasets():
+                    ...
+            print(cache.get_stats())
+
+    :param float default_ttl: (optional) TTL in seconds of the paths not matched by a rule, defaults to 0 (not cached)
+    :param list ttls: (optional) list of (regular expression, TTL in seconds) rules, matched against the path of the
+                      requests. Defaults to :attr:`DEFAULT_TTLS`
+    :param int max_size: (optional) maximum number of responses kept. The least recently used responses are evicted first
+    """
+
+    DEFAULT_TTLS = [
+        (r"^/projects/$", 60),
+        (r"^/projects/[^/]+/(metadata|settings|permissions)$", 60),
+        (r"^/projects/[^/]+/(datasets|recipes|managedfolders|savedmodels|streamingendpoints|knowledge-banks)/$", 60),
+        (r"^/projects/[^/]+/(datasets|recipes|managedfolders|savedmodels|streamingendpoints|knowledge-banks)/[^/]+$", 60),
+        (r"^/projects/[^/]+/datasets/[^/]+/schema$", 60),
+        (r"^/admin/(connections|users|groups|code-envs)/", 60),
+        (r"^/admin/general-settings$", 60),
+    ]
+    """ Default rules: metadata of projects, of the main objects of projects, and of the main instance objects """
+
+    def __init__(self, default_ttl=0, ttls=None, max_size=1024):
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self._rules = [(re.compile(pattern), ttl) for (pattern, ttl) in (ttls if ttls is not None else self.DEFAULT_TTLS)]
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        # incremented by each invalidation, to not store the responses of the GETs running concurrently
+        self._generation = 0
+
+    def get_ttl(self, path):
+        """
+        Get the TTL of the responses of a path
+
+        :param str path: the path of a request, relative to the public API root, like "/projects/"
+        :returns: the TTL in seconds, 0 if the responses of this path are not cached
+        :rtype: float
+        """
+        for (pattern, ttl) in self._rules:
+            if pattern.match(path):
+                return ttl
+        return self.default_ttl
+
+    def get_stats(self):
+        """
+        Get the usage statistics of the cache
+
+        :returns: a dict with the number of "hits", "misses", "evictions" and "invalidations" of responses, the
+                  "hitRate" (None before the first lookup) and the current "size"
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRate": float(self._hits) / lookups if lookups > 0 else None,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "size": len(self._entries)
+            }
+
+    def clear(self):
+        """
+        Remove all the responses from the cache. The statistics are kept
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, path):
+        """
+        Remove the cached responses of an object path, of its parents and of its children
+
+        :param str path: the path of an object, relative to the public API root, like "/projects/MYPROJECT/datasets/mydataset"
+        """
+        path = path.rstrip("/")
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries.keys()):
+                cached_path = key[0].rstrip("/")
+                if _is_same_or_child(cached_path, path) or _is_same_or_child(path, cached_path):
+                    del self._entries[key]
+                    self._invalidations += 1
+
+    def _get_key(self, path, params):
+        if params is None or len(params) == 0:
+            return (path, None)
+        return (path, json.dumps(params, sort_keys=True, default=str))
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            text = entry[1]
+        # a new copy for each hit
+        return json.loads(text)
+
+    def _put(self, key, ttl, text, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.time() + ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+
+def _is_same_or_child(path, parent_path):
+    return path == parent_path or path.startswith(parent_path + "/")
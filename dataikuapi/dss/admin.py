@@ -667,10 +667,11 @@ class DSSUser(object):
         from dataikuapi.dssclient import DSSClient
 
         if self.client.api_key is not None:
-            return DSSClient(self.client.host, self.client.api_key, extra_headers={"X-DKU-ProxyUser":  self.login}, no_check_certificate=not self.client._session.verify, client_certificate=self.client._session.cert)
+            return DSSClient(self.client.host, self.client.api_key, extra_headers={"X-DKU-ProxyUser":  self.login}, no_check_certificate=not self.client._session.verify, client_certificate=self.client._session.cert, transport_policy=self.client._transport_policy)
         elif self.client.internal_ticket is not None:
             client_as = DSSClient(self.client.host, internal_ticket = self.client.internal_ticket,
-                                         extra_headers={"X-DKU-ProxyUser":  self.login}, client_certificate=self.client._session.cert)
+                                         extra_headers={"X-DKU-ProxyUser":  self.login}, client_certificate=self.client._session.cert,
+                                         transport_policy=self.client._transport_policy)
             client_as._session.verify = self.client._session.verify
             return client_as
         else:
@@ -1,6 +1,6 @@
 import json
 from .future import DSSFuture
-from ..utils import CallableStr
+from ..utils import CallableStr, _guess_upload_filename
 
 class DSSAPIDeployer(object):
     """
@@ -801,8 +801,8 @@ class DSSAPIDeployerService(object):
 
         :param string fp: A file-like object pointing to a version package Zip file
         """
-        return self.client._perform_empty("POST",
-                "/api-deployer/services/%s/versions" % (self.service_id), files={"file":fp})
+        self.client._perform_json_upload("POST",
+                "/api-deployer/services/%s/versions" % (self.service_id), _guess_upload_filename(fp), fp)
 
     def get_settings(self):
         """
@@ -0,0 +1,529 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from ..utils import DataikuException, _ExponentialBackoff
+from .llm import DSSLLMCompletionQuery, DSSLLMCompletionsQuery, DSSLLMEmbeddingsQuery, DSSLLMCompletionResponse, DSSLLMCompletionsResponse, DSSLLMEmbeddingsResponse, \
+    DSSLLMStreamedCompletionChunk, DSSLLMStreamedCompletionFooter, _SSEDecoder, _dku_bypass_guardrail_ls
+
+
+async def _sleep_next(eb):
+    await asyncio.sleep(float(eb.next_sleep_time()) / 1000.0)
+
+
+class AsyncDSSProject(object):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.project.DSSProject`.
+
+    Methods returning settings or lists return the raw dicts, since the sync wrappers around them perform blocking calls.
+
+    .. important::
+
+        Do not create this class directly, instead use :meth:`dataikuapi.AsyncDSSClient.get_project`
+    """
+    def __init__(self, client, project_key):
+        self.client = client
+        self.project_key = project_key
+
+    async def get_metadata(self):
+        """
+        Get the metadata attached to this project.
+
+        :returns: the project metadata.
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/metadata" % self.project_key)
+
+    async def get_settings(self):
+        """
+        Get the raw settings of this project.
+
+        :returns: the settings, as a dict (see :meth:`dataikuapi.dss.project.DSSProjectSettings.get_raw`)
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/settings" % self.project_key)
+
+    async def get_variables(self):
+        """
+        Get the variables of this project.
+
+        :returns: a dictionary containing two dictionaries : "standard" and "local".
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/variables/" % self.project_key)
+
+    async def list_datasets(self, include_shared=False, tags=None):
+        """
+        List the datasets in this project.
+
+        :param boolean include_shared: If **True**, also lists the datasets from other projects that are shared in this project (defaults to **False**).
+        :param list[str] tags: List of tags. The query will only return datasets having one of these tags.
+        :returns: the list of the datasets, each one as a dict
+        :rtype: list[dict]
+        """
+        return await self.client._perform_json("GET", "/projects/%s/datasets/" % self.project_key,
+                                               params={"foreign": include_shared, "tags": tags if tags is not None else []})
+
+    def get_dataset(self, dataset_name):
+        """
+        Get a handle to interact with a specific dataset
+
+        :param str dataset_name: the name of the desired dataset
+        :rtype: :class:`AsyncDSSDataset`
+        """
+        return AsyncDSSDataset(self.client, self.project_key, dataset_name)
+
+    async def list_scenarios(self):
+        """
+        List the scenarios in this project.
+
+        :returns: the list of the scenarios, each one as a dict
+        :rtype: list[dict]
+        """
+        return await self.client._perform_json("GET", "/projects/%s/scenarios/" % self.project_key)
+
+    def get_scenario(self, scenario_id):
+        """
+        Get a handle to interact with a specific scenario
+
+        :param str scenario_id: the ID of the desired scenario
+        :rtype: :class:`AsyncDSSScenario`
+        """
+        return AsyncDSSScenario(self.client, self.project_key, scenario_id)
+
+    async def list_llms(self, purpose="GENERIC_COMPLETION"):
+        """
+        List the LLM usable in this project
+
+        :param str purpose: Usage purpose of the LLM. Main values are GENERIC_COMPLETION, TEXT_EMBEDDING_EXTRACTION and IMAGE_GENERATION
+        :returns: the list of LLMs, each one as a dict
+        :rtype: list[dict]
+        """
+        return await self.client._perform_json("GET", "/projects/%s/llms" % self.project_key, params={"purpose": purpose})
+
+    def get_llm(self, llm_id):
+        """
+        Get a handle to interact with a specific LLM
+
+        :param str llm_id: the identifier of an LLM
+        :rtype: :class:`AsyncDSSLLM`
+        """
+        return AsyncDSSLLM(self.client, self.project_key, llm_id)
+
+
+class AsyncDSSDataset(object):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.dataset.DSSDataset`.
+
+    .. important::
+
+        Do not create this class directly, instead use :meth:`AsyncDSSProject.get_dataset`
+    """
+    def __init__(self, client, project_key, dataset_name):
+        self.client = client
+        self.project_key = project_key
+        self.dataset_name = dataset_name
+
+    async def get_settings(self):
+        """
+        Get the raw settings of this dataset.
+
+        :returns: the settings, as a dict (see :meth:`dataikuapi.dss.dataset.DSSDatasetSettings.get_raw`)
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/datasets/%s" % (self.project_key, self.dataset_name))
+
+    async def get_schema(self):
+        """
+        Get the dataset schema.
+
+        :returns: a dict object of the schema, with the list of columns.
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/datasets/%s/schema" % (self.project_key, self.dataset_name))
+
+    async def get_metadata(self):
+        """
+        Get the metadata attached to this dataset.
+
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/datasets/%s/metadata" % (self.project_key, self.dataset_name))
+
+    async def list_partitions(self):
+        """
+        Get the list of all partitions of this dataset.
+
+        :rtype: list[string]
+        """
+        return await self.client._perform_json("GET", "/projects/%s/datasets/%s/partitions" % (self.project_key, self.dataset_name))
+
+    async def get_last_metric_values(self, partition=''):
+        """
+        Get the last values of the metrics on this dataset.
+
+        :param string partition: (optional) partition identifier, use ALL to retrieve metric values on all data.
+        :returns: the metric values, as a dict (see :class:`dataikuapi.dss.metrics.ComputedMetrics`)
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/datasets/%s/metrics/last/%s" % (self.project_key, self.dataset_name, 'NP' if len(partition) == 0 else partition))
+
+    async def compute_metrics(self, partition='', metric_ids=None, probes=None):
+        """
+        Compute metrics on a partition of this dataset.
+
+        :param string partition: (optional) partition identifier, use ALL to compute metrics on all data.
+        :param list[string] metric_ids: (optional) ids of the metrics to build
+        :param dict probes: (optional) custom probes set to compute
+        :returns: a metric computation report, as a dict
+        :rtype: dict
+        """
+        url = "/projects/%s/datasets/%s/actions" % (self.project_key, self.dataset_name)
+        if metric_ids is not None:
+            return await self.client._perform_json("POST", "%s/computeMetricsFromIds" % url, params={'partition': partition}, body={"metricIds": metric_ids})
+        elif probes is not None:
+            return await self.client._perform_json("POST", "%s/computeMetrics" % url, params={'partition': partition}, body=probes)
+        else:
+            return await self.client._perform_json("POST", "%s/computeMetrics" % url, params={'partition': partition})
+
+
+class AsyncDSSFuture(object):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.future.DSSFuture`.
+
+    .. important::
+
+        Do not create this class directly, instead use :meth:`dataikuapi.AsyncDSSClient.get_future`
+    """
+    def __init__(self, client, job_id, state=None):
+        self.client = client
+        self.job_id = job_id
+        self.state = state
+        self.state_is_peek = True
+
+    @staticmethod
+    def from_resp(client, resp):
+        """
+        Creates an :class:`AsyncDSSFuture` from the response of an endpoint that initiated a long-running task.
+
+        :param client: an :class:`dataikuapi.AsyncDSSClient`
+        :param dict resp: the response of the API call that initiated a long-running task
+        :rtype: :class:`AsyncDSSFuture`
+        """
+        return AsyncDSSFuture(client, resp.get('jobId', None), state=resp)
+
+    async def abort(self):
+        """
+        Aborts the long-running task.
+        """
+        await self.client._perform_empty("DELETE", "/futures/%s" % self.job_id)
+
+    async def get_state(self):
+        """
+        Queries the state of the future, and fetches the result if it's ready.
+
+        :rtype: dict
+        """
+        self.state = await self.client._perform_json("GET", "/futures/%s" % self.job_id, params={'peek': False})
+        self.state_is_peek = False
+        return self.state
+
+    async def peek_state(self):
+        """
+        Queries the state of the future, without fetching the result.
+
+        :rtype: dict
+        """
+        self.state = await self.client._perform_json("GET", "/futures/%s" % self.job_id, params={'peek': True})
+        self.state_is_peek = True
+        return self.state
+
+    async def wait_for_result(self):
+        """
+        Waits for the completion of the long-running task, and returns its result.
+
+        :return: the result of the future
+        :rtype: object
+        """
+        if self.state is not None and self.state.get('hasResult', False):
+            # no future created in backend, result already in the state
+            return self.state.get('result', None)
+        await self.get_state()
+        eb = _ExponentialBackoff()
+        while not self.state.get('hasResult', False):
+            await _sleep_next(eb)
+            await self.get_state()
+        return self.state.get('result', None)
+
+
+class AsyncDSSScenario(object):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.scenario.DSSScenario`.
+
+    Scenario runs are returned as raw dicts (see :meth:`dataikuapi.dss.scenario.DSSScenarioRun.get_info`).
+
+    .. important::
+
+        Do not create this class directly, instead use :meth:`AsyncDSSProject.get_scenario`
+    """
+    def __init__(self, client, project_key, id):
+        self.client = client
+        self.project_key = project_key
+        self.id = id
+
+    async def get_settings(self):
+        """
+        Get the raw settings of this scenario.
+
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/scenarios/%s" % (self.project_key, self.id))
+
+    async def get_status(self):
+        """
+        Get the raw status of this scenario.
+
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/scenarios/%s/light" % (self.project_key, self.id))
+
+    async def get_last_runs(self, limit=10, only_finished_runs=False):
+        """
+        Get the list of the last runs of the scenario.
+
+        :param int limit: maximum number of last runs to retrieve
+        :param boolean only_finished_runs: if True, currently running runs are not returned.
+        :rtype: list[dict]
+        """
+        return await self.client._perform_json("GET", "/projects/%s/scenarios/%s/get-last-runs" % (self.project_key, self.id),
+                                               params={'limit': limit, 'onlyFinishedRuns': only_finished_runs})
+
+    async def get_runs_by_date(self, from_date, to_date=None):
+        """
+        Get the list of the runs of the scenario in a given date range.
+
+        :param datetime from_date: start of the date range to retrieve runs for, inclusive
+        :param datetime to_date: (optional) end of the date range to retrieve runs for, exclusive. Defaults to now
+        :rtype: list[dict]
+        """
+        def as_date(d):
+            if isinstance(d, datetime):
+                return d.strftime("%Y-%m-%d")
+            else:
+                return d
+
+        if to_date is None:
+            to_date = datetime.now()
+        return await self.client._perform_json("GET", "/projects/%s/scenarios/%s/get-runs-by-date" % (self.project_key, self.id),
+                                               params={'fromDate': as_date(from_date), 'toDate': as_date(to_date)})
+
+    async def get_run_details(self, run_id):
+        """
+        Get the full details of a run of the scenario, including its step runs.
+
+        :param string run_id: identifier of the run.
+        :returns: a dict with **scenarioRun** and **stepRuns** fields
+        :rtype: dict
+        """
+        return await self.client._perform_json("GET", "/projects/%s/scenarios/%s/%s/" % (self.project_key, self.id, run_id))
+
+    async def run(self, params=None):
+        """
+        Request a run of the scenario.
+
+        :param dict params: additional parameters that will be passed to the scenario through trigger params
+        :returns: the trigger fire, as a dict
+        :rtype: dict
+        """
+        return await self.client._perform_json("POST", "/projects/%s/scenarios/%s/run" % (self.project_key, self.id),
+                                               body=params if params is not None else {})
+
+    async def run_and_wait(self, params=None, no_fail=False):
+        """
+        Request a run of the scenario and wait the end of the run to complete.
+
+        :param dict params: additional parameters that will be passed to the scenario through trigger params
+        :param boolean no_fail: if False, raises if the run doesn't end with a SUCCESS outcome
+        :returns: the final state of the scenario run, as a dict
+        :rtype: dict
+        """
+        trigger_fire = await self.run(params)
+        trigger_id = trigger_fire['trigger']['id']
+        trigger_run_id = trigger_fire['runId']
+        eb = _ExponentialBackoff()
+        refresh_trigger_counter = 0
+        while True:
+            refresh_trigger_counter += 1
+            if refresh_trigger_counter == 10:
+                refresh_trigger_counter = 0
+                trigger_fire = await self.client._perform_json(
+                    "GET", "/projects/%s/scenarios/trigger/%s/%s" % (self.project_key, self.id, trigger_id),
+                    params={'triggerRunId': trigger_run_id})
+            if trigger_fire.get("cancelled", False):
+                if no_fail:
+                    return None
+                raise DataikuException("Scenario run has been cancelled")
+            run = await self.client._perform_json(
+                "GET", "/projects/%s/scenarios/%s/get-run-for-trigger" % (self.project_key, self.id),
+                params={'triggerId': trigger_id, 'triggerRunId': trigger_run_id})
+            if 'scenarioRun' in run and run['scenarioRun'].get('result', False):
+                break
+            await _sleep_next(eb)
+        scenario_run = run['scenarioRun']
+        outcome = scenario_run['result'].get('outcome', 'UNKNOWN')
+        if outcome == 'SUCCESS' or no_fail:
+            return scenario_run
+        raise DataikuException("Scenario run returned status %s" % outcome)
+
+    async def abort(self):
+        """
+        Abort the scenario.
+        """
+        return await self.client._perform_json("POST", "/projects/%s/scenarios/%s/abort" % (self.project_key, self.id))
+
+
+class AsyncDSSLLM(object):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.llm.DSSLLM`.
+
+    The queries are built like the sync ones, only their `execute` method is a coroutine.
+
+    .. important::
+
+        Do not create this class directly, instead use :meth:`AsyncDSSProject.get_llm`
+    """
+    def __init__(self, client, project_key, llm_id):
+        self.client = client
+        self.project_key = project_key
+        self.llm_id = llm_id
+
+    def new_completion(self):
+        """
+        Create a new completion query.
+
+        :rtype: :class:`AsyncDSSLLMCompletionQuery`
+        """
+        return AsyncDSSLLMCompletionQuery(self)
+
+    def new_completions(self):
+        """
+        Create a new multi-completion query.
+
+        :rtype: :class:`AsyncDSSLLMCompletionsQuery`
+        """
+        return AsyncDSSLLMCompletionsQuery(self)
+
+    def new_embeddings(self, text_overflow_mode="FAIL"):
+        """
+        Create a new embedding query.
+
+        :param str text_overflow_mode: How to handle longer texts than what the model supports. Either 'TRUNCATE' or 'FAIL'.
+        :rtype: :class:`AsyncDSSLLMEmbeddingsQuery`
+        """
+        return AsyncDSSLLMEmbeddingsQuery(self, text_overflow_mode)
+
+
+def _get_llm_query_headers():
+    if hasattr(_dku_bypass_guardrail_ls, "current_bypass_token"):
+        return {"x-dku-guardrails-bypass-token": _dku_bypass_guardrail_ls.current_bypass_token}
+    return None
+
+
+async def _post_llm_query(llm, path, body):
+    return await llm.client._perform_json("POST", "/projects/%s/llms/%s" % (llm.project_key, path), body=body,
+                                          headers=_get_llm_query_headers())
+
+
+class AsyncDSSLLMCompletionQuery(DSSLLMCompletionQuery):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.llm.DSSLLMCompletionQuery`.
+    """
+    async def execute(self):
+        """
+        Run the completion query and retrieve the LLM response.
+
+        :rtype: :class:`dataikuapi.dss.llm.DSSLLMCompletionResponse`
+        """
+        queries = {"queries": [self.cq], "settings": self._settings, "llmId": self.llm.llm_id}
+        if self._guardrails is not None:
+            queries["guardrails"] = self._guardrails
+        ret = await _post_llm_query(self.llm, "completions", queries)
+        return DSSLLMCompletionResponse(raw_resp=ret["responses"][0], response_parser=self._response_parser)
+
+    async def execute_streamed(self, read_size=4096):
+        """
+        Run the completion query and retrieve the LLM response as streamed chunks.
+
+        .. code-block:: python
+
+            async for chunk in llm.new_completion().with_message("Hello").execute_streamed():
+                if isinstance(chunk, DSSLLMStreamedCompletionChunk):
+                    print(chunk.text, end="")
+
+        :param int read_size: (optional) maximum number of bytes read from the connection at once. Chunks are decoded
+                              as soon as they are received, whatever this size
+        :returns: An asynchronous iterator over the LLM response chunks
+        :rtype: AsyncIterator[Union[:class:`dataikuapi.dss.llm.DSSLLMStreamedCompletionChunk`,
+                :class:`dataikuapi.dss.llm.DSSLLMStreamedCompletionFooter`]]
+        """
+        start_time = time.time()
+        time_to_first_chunk = None
+        request = {"query": self.cq, "settings": self.settings, "llmId": self.llm.llm_id}
+        if self._guardrails is not None:
+            request["guardrails"] = self._guardrails
+
+        http_res = await self.llm.client._perform_raw("POST", "/projects/%s/llms/streamed-completion" % self.llm.project_key,
+                                                      body=request, headers=_get_llm_query_headers())
+        decoder = _SSEDecoder()
+        try:
+            done = False
+            while not done:
+                chunk = await http_res.content.read(read_size)
+                if len(chunk) > 0:
+                    events = decoder.feed(chunk)
+                else:
+                    events = decoder.flush()
+                    done = True
+                for evt in events:
+                    if evt.event == "completion-chunk":
+                        if time_to_first_chunk is None:
+                            time_to_first_chunk = time.time() - start_time
+                        yield DSSLLMStreamedCompletionChunk(json.loads(evt.data))
+                    else:
+                        yield DSSLLMStreamedCompletionFooter(json.loads(evt.data), time_to_first_chunk=time_to_first_chunk)
+        finally:
+            http_res.release()
+
+
+class AsyncDSSLLMCompletionsQuery(DSSLLMCompletionsQuery):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.llm.DSSLLMCompletionsQuery`.
+    """
+    async def execute(self):
+        """
+        Run the completions query and retrieve the LLM response.
+
+        :rtype: :class:`dataikuapi.dss.llm.DSSLLMCompletionsResponse`
+        """
+        queries = {"queries": [q.cq for q in self.queries], "settings": self._settings, "llmId": self.llm.llm_id}
+        if self._guardrails is not None:
+            queries["guardrails"] = self._guardrails
+        ret = await _post_llm_query(self.llm, "completions", queries)
+        return DSSLLMCompletionsResponse(ret["responses"], response_parser=self._response_parser)
+
+
+class AsyncDSSLLMEmbeddingsQuery(DSSLLMEmbeddingsQuery):
+    """
+    Asyncio flavor of :class:`dataikuapi.dss.llm.DSSLLMEmbeddingsQuery`.
+    """
+    async def execute(self):
+        """
+        Run the embedding query.
+
+        :rtype: :class:`dataikuapi.dss.llm.DSSLLMEmbeddingsResponse`
+        """
+        if self._guardrails is not None:
+            self.eq["guardrails"] = self._guardrails
+        ret = await _post_llm_query(self.llm, "embeddings", self.eq)
+        return DSSLLMEmbeddingsResponse(ret)
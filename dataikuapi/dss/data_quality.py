@@ -1,4 +1,7 @@
+import itertools
+
 from dataikuapi.dss.future import DSSFuture
+from dataikuapi.utils import _iter_ordered_concurrently
 
 
 class DSSDataQualityRuleSet(object):
@@ -126,6 +129,52 @@ class DSSDataQualityRuleSet(object):
         """
         rule_results = self.client._perform_json("GET", "/projects/%s/datasets/%s/data-quality/rules-history" % (self.project_key, self.dataset_name), params={ "minTimestamp": min_timestamp, "maxTimestamp": max_timestamp, "resultsPerPage": results_per_page, "page": page, "ruleIds": rule_ids })
         return [DSSDataQualityRuleResult(result) for result in rule_results]
+
+    def iter_rules_history(self, min_timestamp=None, max_timestamp=None, rule_ids=None, results_per_page=10000, prefetch=2, as_type="records"):
+        """
+        Iterate over the whole history of computed rules, page after page.
+
+        The next pages are fetched in the background while the current one is consumed.
+
+        .. code-block:: python
+
+            failures = 0
+            for record in dataset.get_data_quality_rules().iter_rules_history(min_timestamp=last_week):
+                if record["outcome"] == "ERROR":
+                    failures += 1
+
+        :param int min_timestamp: Timestamp representing the beginning of the timeframe. (included)
+        :param int max_timestamp: Timestamp representing the end of the timeframe. (included)
+        :param list rule_ids: A list of rule ids to get the history from. Default is all the rules on the dataset.
+        :param int results_per_page: The number of records fetched per call, default is 10 000.
+        :param int prefetch: The number of pages fetched ahead of the one being consumed, default is 2.
+        :param str as_type: How to return the results. Possible values are "records", "dict" and "objects" (defaults to **records**).
+            A record is a dict with only the "id", "name", "outcome", "message", "computeDate", "runOrigin" and "partition" of the result.
+
+        :returns: an iterator over the results of the rules
+        :rtype: iterator of dict if as_type is "records" or "dict", of :class:`DSSDataQualityRuleResult` if as_type is "objects"
+        """
+        if as_type == "records":
+            convert = _to_rule_history_record
+        elif as_type == "dict":
+            convert = None
+        elif as_type == "objects":
+            convert = DSSDataQualityRuleResult
+        else:
+            raise ValueError("Unknown as_type")
+
+        def fetch_page(page):
+            return self.client._perform_json("GET", "/projects/%s/datasets/%s/data-quality/rules-history" % (self.project_key, self.dataset_name), params={ "minTimestamp": min_timestamp, "maxTimestamp": max_timestamp, "resultsPerPage": results_per_page, "page": page, "ruleIds": rule_ids })
+
+        pages = _iter_ordered_concurrently(fetch_page, itertools.count(), prefetch + 1)
+        try:
+            for rule_results in pages:
+                for result in rule_results:
+                    yield result if convert is None else convert(result)
+                if len(rule_results) < results_per_page:
+                    break
+        finally:
+            pages.close()
     
 
     def delete_rules_history(self, partition="NP"):
@@ -273,3 +322,94 @@ class DSSDataQualityRuleResult(object):
     @property
     def partition(self):
         return self.data["partition"]
+
+
+def _to_rule_history_record(result):
+    return {
+        "id": result.get("id"),
+        "name": result.get("name"),
+        "outcome": result.get("outcome"),
+        "message": result.get("message"),
+        "computeDate": result.get("computeDate"),
+        "runOrigin": result.get("runOrigin"),
+        "partition": result.get("partition")
+    }
+
+
+class DSSDataQualityHistoryCollector(object):
+    """
+    Collects the history of the data quality rules of many datasets of a project, incrementally, as columns ready for
+    trend analysis.
+
+    The datasets are processed concurrently. For each dataset, the collector keeps a cursor: the compute date of the
+    most recent result collected. Each call to :meth:`collect` only fetches the results computed after the cursors.
+    Save :attr:`cursors` to resume the collection from another process.
+
+    .. note::
+
+        Getting the results as columns requires numpy
+
+    .. caution::
+        Do not instantiate this class directly, use :meth:`dataikuapi.dss.project.DSSProject.get_data_quality_history_collector`
+
+    Usage example:
+
+    .. code-block:: python
+
+        collector = project.get_data_quality_history_collector(concurrency=16)
+        columns = collector.collect()
+        errors = columns["outcome"] == "ERROR"
+        print(numpy.unique(columns["datasetName"][errors], return_counts=True))
+        save_cursors(collector.cursors)
+    """
+    COLUMNS = ["datasetName", "id", "name", "outcome", "message", "computeDate", "runOrigin", "partition"]
+
+    def __init__(self, client, project_key, dataset_names=None, concurrency=8, cursors=None):
+        self.client = client
+        self.project_key = project_key
+        self.dataset_names = dataset_names
+        self.concurrency = concurrency
+        self.cursors = dict(cursors) if cursors is not None else {}
+        """ The compute date of the most recent result collected, per dataset name """
+
+    def collect(self, max_timestamp=None, rule_ids=None):
+        """
+        Collect the results of the rules computed since the previous collection, for all the datasets.
+
+        :param int max_timestamp: Timestamp representing the end of the timeframe. (included) Default is no limit.
+        :param list rule_ids: A list of rule ids to get the history from. Default is all the rules.
+
+        :returns: the results, as a dict of column name to numpy array. The columns are "datasetName", "id", "name",
+            "outcome", "message", "computeDate" (as int64 timestamps), "runOrigin" and "partition"
+        :rtype: dict
+        """
+        import numpy as np
+
+        dataset_names = self.dataset_names
+        if dataset_names is None:
+            dataset_names = [d["name"] for d in self.client._perform_json("GET", "/projects/%s/datasets/" % self.project_key)]
+
+        def collect_dataset(dataset_name):
+            cursor = self.cursors.get(dataset_name)
+            ruleset = DSSDataQualityRuleSet(self.project_key, dataset_name, self.client)
+            records = list(ruleset.iter_rules_history(min_timestamp=cursor + 1 if cursor is not None else None,
+                                                      max_timestamp=max_timestamp, rule_ids=rule_ids, prefetch=0))
+            return dataset_name, records
+
+        columns = dict((column, []) for column in self.COLUMNS)
+        for dataset_name, records in _iter_ordered_concurrently(collect_dataset, dataset_names, self.concurrency):
+            for record in records:
+                columns["datasetName"].append(dataset_name)
+                for column in self.COLUMNS[1:]:
+                    columns[column].append(record[column])
+            if len(records) > 0:
+                latest = max(record["computeDate"] for record in records)
+                self.cursors[dataset_name] = max(latest, self.cursors.get(dataset_name, latest))
+
+        result = {}
+        for column in self.COLUMNS:
+            if column == "computeDate":
+                result[column] = np.array(columns[column], dtype=np.int64)
+            else:
+                result[column] = np.array(columns[column], dtype=object)
+        return result
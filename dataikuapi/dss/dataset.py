@@ -6,16 +6,22 @@ from ..utils import _timestamp_ms_to_zoned_datetime
 import json, warnings
 from .utils import DSSTaggableObjectListItem, DSSTaggableObjectSettings
 from .future import DSSFuture
-from .metrics import ComputedMetrics
+from .metrics import ComputedMetrics, _metric_history_to_arrays
 from .discussion import DSSObjectDiscussions
 from .statistics import DSSStatisticsWorksheet
 from .data_quality import DSSDataQualityRuleSet
 from . import recipe
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 try:
     basestring
 except NameError:
     basestring = str
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 class DSSDatasetListItem(DSSTaggableObjectListItem):
     """
@@ -313,16 +319,129 @@ class DSSDataset(object):
     # Dataset data
     ########################################################
 
-    def iter_rows(self, partitions=None):
+    def iter_rows(self, partitions=None, raw_strings=False):
         """
         Get the dataset data as a row-by-row iterator.
 
         :param partitions: (optional) partition identifier, or list of partitions to include, if applicable.
         :type partitions: Union[string, list[string]]
+        :param bool raw_strings: (optional) if True, the values are returned as strings, without being cast according
+                                 to the schema. Defaults to False
+        :returns: an iterator over the rows, each row being a list of values. The order of values
+                  in the list is the same as the order of columns in the schema returned by :meth:`get_schema`
+        :rtype: generator[list]
+        """
+        return self._get_data_reader(self.get_schema()["columns"], partitions, raw_strings).iter_rows()
+
+    def parallel_read(self, partitions=None, workers=4, ordered=True, raw_strings=False, chunk_size=1000):
+        """
+        Get the dataset data as a row-by-row iterator, reading several partitions concurrently.
+
+        Each partition is read through its own streaming session, on a pool of threads. Each session is verified
+        once its partition has been fully read, and an error on any partition is raised by the iterator.
+
+        .. note::
+
+            The number of concurrent downloads is also bounded by the size of the connection pool of the client.
+
+        Usage example:
+
+        .. code-block:: python
+
+            dataset = project.get_dataset("my_partitioned_dataset")
+            for row in dataset.parallel_read(workers=8, ordered=False):
+                process(row)
+
+        :param partitions: (optional) list of partition identifiers to read. Defaults to all the partitions
+                           returned by :meth:`list_partitions`
+        :type partitions: Union[string, list[string]]
+        :param int workers: (optional) maximum number of partitions read at the same time, defaults to 4
+        :param bool ordered: (optional) if True (default), rows are yielded partition after partition, in the order
+                             of the partitions list. If False, rows are yielded as soon as they are received, with
+                             rows of different partitions interleaved
+        :param bool raw_strings: (optional) if True, the values are returned as strings, without being cast according
+                                 to the schema. Defaults to False
+        :param int chunk_size: (optional) number of rows handed over at once from a reading thread, defaults to 1000
         :returns: an iterator over the rows, each row being a list of values. The order of values
                   in the list is the same as the order of columns in the schema returned by :meth:`get_schema`
         :rtype: generator[list]
         """
+        if partitions is None:
+            partitions = self.list_partitions()
+        elif isinstance(partitions, basestring):
+            partitions = [partitions]
+        if len(partitions) == 0:
+            return
+        schema = self.get_schema()["columns"]
+        stop = threading.Event()
+        if ordered:
+            # bounded queues provide back-pressure on the partitions that are ahead of the consumer
+            queues = [queue.Queue(maxsize=4) for partition in partitions]
+        else:
+            shared_queue = queue.Queue(maxsize=4 * workers)
+            queues = [shared_queue for partition in partitions]
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read_partition(index, partition):
+            q = queues[index]
+            if stop.is_set():
+                return
+            try:
+                rows = self._get_data_reader(schema, partition, raw_strings).iter_rows()
+                try:
+                    chunk = []
+                    for row in rows:
+                        chunk.append(row)
+                        if len(chunk) >= chunk_size:
+                            if not put(q, (chunk, None)):
+                                return
+                            chunk = []
+                    if chunk and not put(q, (chunk, None)):
+                        return
+                finally:
+                    rows.close()
+                put(q, (None, None))
+            except Exception as e:
+                put(q, (None, e))
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for index, partition in enumerate(partitions):
+                executor.submit(read_partition, index, partition)
+            if ordered:
+                for q in queues:
+                    while True:
+                        chunk, error = q.get()
+                        if error is not None:
+                            raise error
+                        if chunk is None:
+                            break
+                        for row in chunk:
+                            yield row
+            else:
+                remaining = len(partitions)
+                while remaining > 0:
+                    chunk, error = shared_queue.get()
+                    if error is not None:
+                        raise error
+                    if chunk is None:
+                        remaining -= 1
+                        continue
+                    for row in chunk:
+                        yield row
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+
+    def _get_data_reader(self, schema, partitions, raw_strings=False):
         read_session_id = str(uuid.uuid4())
         csv_stream = self.client._perform_raw(
                 "GET" , "/projects/%s/datasets/%s/data/" %(self.project_key, self.dataset_name),
@@ -332,9 +451,41 @@ class DSSDataset(object):
                     "readSessionId": read_session_id
                 })
 
-        return DataikuStreamedHttpUTF8CSVReader(self.get_schema()["columns"], csv_stream, read_session_id=read_session_id,
+        return DataikuStreamedHttpUTF8CSVReader(schema, csv_stream, read_session_id=read_session_id,
                                                 client=self.client, project_key=self.project_key,
-                                                dataset_name=self.dataset_name).iter_rows()
+                                                dataset_name=self.dataset_name, raw_strings=raw_strings)
+
+    def iter_batches(self, batch_size=10000, format="numpy", partitions=None):
+        """
+        Get the dataset data as an iterator over batches of typed columns.
+
+        This is much faster than :meth:`iter_rows` for large exports, because values are parsed column by column
+        according to the dataset schema instead of being cast one row at a time.
+
+        .. note::
+
+            The "numpy" format requires the numpy and pyarrow packages, the "arrow" format requires the pyarrow package.
+
+        Usage example:
+
+        .. code-block:: python
+
+            dataset = project.get_dataset("my_dataset")
+            total = 0.0
+            for batch in dataset.iter_batches(batch_size=100000, format="numpy"):
+                total += numpy.nansum(batch["price"])
+
+        :param int batch_size: (optional) maximum number of rows in each batch, defaults to 10000
+        :param str format: (optional) "numpy" (default) to get each batch as a dict of column name to numpy array,
+                           or "arrow" to get each batch as a :class:`pyarrow.RecordBatch`
+        :param partitions: (optional) partition identifier, or list of partitions to include, if applicable.
+        :type partitions: Union[string, list[string]]
+        :returns: an iterator over the batches. See :meth:`dataikuapi.utils.DataikuStreamedHttpUTF8CSVReader.iter_batches`
+                  for the mapping of DSS types to array types
+        :rtype: generator[Union[dict, pyarrow.RecordBatch]]
+        """
+        reader = self._get_data_reader(self.get_schema()["columns"], partitions)
+        return reader.iter_batches(batch_size=batch_size, format=format)
 
 
     def list_partitions(self):
@@ -409,7 +560,7 @@ class DSSDataset(object):
         future_resp = self.client._perform_json("GET", "/projects/%s/datasets/%s/search-data-elastic" % (self.project_key, self.dataset_name), params=params)
         result = DSSFuture(self.client, future_resp.get("jobId", None), future_resp).wait_for_result()
         value_caster = DataikuValueCaster(result["columns"])
-        result["rows"] = [value_caster.cast_values(row) for row in result["rows"]]
+        result["rows"] = value_caster.cast_rows(result["rows"])
         return result
 
     ########################################################
@@ -509,15 +660,19 @@ class DSSDataset(object):
                     "POST" , "/projects/%s/datasets/%s/actions/runChecks" %(self.project_key, self.dataset_name),
                     params={'partition':partition}, body=checks)
 
-    def uploaded_add_file(self, fp, filename):
+    def uploaded_add_file(self, fp, filename, progress_callback=None):
         """
         Add a file to an "uploaded files" dataset
 
+        The file is streamed, it is never fully loaded in memory.
+
         :param file fp: A file-like object that represents the file to upload
         :param str filename: The filename for the file to upload 
+        :param progress_callback: (optional) function called as the file is sent, with the number of bytes sent so
+                                  far and the total size of the file (None if not known)
         """
-        self.client._perform_empty("POST", "/projects/%s/datasets/%s/uploaded/files" % (self.project_key, self.dataset_name),
-         files={"file":(filename, fp)})
+        self.client._perform_json_upload("POST", "/projects/%s/datasets/%s/uploaded/files" % (self.project_key, self.dataset_name),
+                                         filename, fp, progress_callback=progress_callback)
 
     def uploaded_list_files(self):
         """
@@ -743,20 +898,27 @@ class DSSDataset(object):
         return ComputedMetrics(self.client._perform_json(
                 "GET", "/projects/%s/datasets/%s/metrics/last/%s" % (self.project_key, self.dataset_name, 'NP' if len(partition) == 0 else partition)))
 
-    def get_metric_history(self, metric, partition=''):
+    def get_metric_history(self, metric, partition='', as_arrays=False):
         """
         Get the history of the values of the metric on this dataset
 
         :param string metric: id of the metric to get
         :param partition: (optional) partition identifier, use ALL to retrieve metric history on all data.
         :type partition: string
+        :param bool as_arrays: (optional) if True, return the history as a pair of numpy arrays: the times of the values
+                               (as datetime64[ms]), and the values (as float64 for numeric metrics, else as objects).
+                               Requires numpy
 
-        :returns: a dict containing the values of the metric, cast to the appropriate type (double, boolean,...)
-        :rtype: dict
+        :returns: a dict containing the values of the metric, cast to the appropriate type (double, boolean,...), or a
+                  (timestamps, values) pair of numpy arrays if `as_arrays` is True
+        :rtype: dict or tuple
         """
-        return self.client._perform_json(
+        history = self.client._perform_json(
                 "GET", "/projects/%s/datasets/%s/metrics/history/%s" % (self.project_key, self.dataset_name, 'NP' if len(partition) == 0 else partition),
                 params={'metricLookup' : metric if isinstance(metric, str) or isinstance(metric, unicode) else json.dumps(metric)})
+        if as_arrays:
+            return _metric_history_to_arrays(history)
+        return history
 
     def get_info(self):
         """
@@ -5,7 +5,7 @@ from io import BytesIO
 from .discussion import DSSObjectDiscussions
 from .drift import DataDriftResult, DriftResult
 from .future import DSSFuture
-from .metrics import ComputedMetrics
+from .metrics import ComputedMetrics, _metric_history_to_arrays
 
 try:
     basestring
@@ -219,16 +219,23 @@ class DSSEvaluationStore(object):
         url = "/projects/%s/evaluationstores/%s/metrics/last" % (self.project_key, self.id)
         return ComputedMetrics(self.client._perform_json("GET", url))
 
-    def get_metric_history(self, metric):
+    def get_metric_history(self, metric, as_arrays=False):
         """
         Get the history of the values of the metric on this evaluation store
 
+        :param bool as_arrays: (optional) if True, return the history as a pair of numpy arrays: the times of the values
+                               (as datetime64[ms]), and the values. Requires numpy
+
         :returns:
-            an object containing the values of the metric, cast to the appropriate type (double, boolean,...)
+            an object containing the values of the metric, cast to the appropriate type (double, boolean,...), or a
+            (timestamps, values) pair of numpy arrays if `as_arrays` is True
         """
         url = "/projects/%s/evaluationstores/%s/metrics/history" % (self.project_key, self.id)
         metric_lookup = metric if isinstance(metric, str) or isinstance(metric, unicode) else json.dumps(metric)
-        return self.client._perform_json("GET", url, params={"metricLookup": metric_lookup})
+        history = self.client._perform_json("GET", url, params={"metricLookup": metric_lookup})
+        if as_arrays:
+            return _metric_history_to_arrays(history)
+        return history
 
     def compute_metrics(self, metric_ids=None, probes=None):
         """
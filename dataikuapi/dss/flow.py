@@ -10,7 +10,12 @@ from .recipe import DSSRecipe, DSSRecipeDefinitionAndPayload
 from .knowledgebank import DSSKnowledgeBank
 from .future import DSSFuture
 from .streaming_endpoint import DSSStreamingEndpoint
+from .waiter import DSSFutureWaiter
+from ..utils import DataikuException
+from collections import deque
+from concurrent.futures import wait as _wait_futures, FIRST_COMPLETED
 import logging, json
+import time
 import warnings
 
 
@@ -234,6 +239,31 @@ class DSSProjectFlow(object):
         """
         return DSSSchemaPropagationRunBuilder(self.project, self.client, dataset_name)
 
+    def new_parallel_build(self, targets, max_concurrent_jobs=4, recursive=True, stop_at=None,
+                           job_type="NON_RECURSIVE_FORCED_BUILD", max_poll_ms=5000):
+        """
+        Prepare a build of some items of the flow, running the jobs of independent branches at the same time.
+
+        .. code-block:: python
+
+            build = project.get_flow().new_parallel_build(["sales_by_region", "churn_scores"], max_concurrent_jobs=8)
+            report = build.run()
+            print("Built in %.0fs, critical path %s took %.0fs" % (
+                report["totalSeconds"], " > ".join(report["criticalPath"]), report["criticalPathSeconds"]))
+
+        :param list targets: the items to build, each one either a name, a node dict of the flow graph or a dataset object
+        :param int max_concurrent_jobs: (optional) maximum number of jobs running at the same time
+        :param bool recursive: (optional) if True, also rebuild the items upstream of the targets, else only the targets
+        :param list stop_at: (optional) items upstream of the targets which are not rebuilt, as are their own upstream items
+        :param str job_type: (optional) the type of the job of each recipe, see :meth:`.DSSProject.new_job`
+        :param int max_poll_ms: (optional) maximum delay between two polls of the status of a job, in milliseconds
+
+        :returns: A handle to inspect the plan and run the build
+        :rtype: :class:`.DSSFlowParallelBuild`
+        """
+        return DSSFlowParallelBuild(self, self.get_graph(), targets, max_concurrent_jobs=max_concurrent_jobs,
+                                    recursive=recursive, stop_at=stop_at, job_type=job_type, max_poll_ms=max_poll_ms)
+
     def _to_smart_ref(self, obj):
         if isinstance(obj, DSSDataset):
             ot = "DATASET"
@@ -406,6 +436,272 @@ class DSSSchemaPropagationRunBuilder(object):
         return DSSFuture.from_resp(self.client, future_resp)
 
 
+# types of the flow graph nodes which can be built by a job, with the type of the job output
+_JOB_OUTPUT_TYPES = {
+    "COMPUTABLE_DATASET": "DATASET",
+    "COMPUTABLE_FOLDER": "MANAGED_FOLDER",
+    "COMPUTABLE_SAVED_MODEL": "SAVED_MODEL",
+    "COMPUTABLE_STREAMING_ENDPOINT": "STREAMING_ENDPOINT",
+    "COMPUTABLE_RETRIEVABLE_KNOWLEDGE": "KNOWLEDGE_BANK"
+}
+
+
+class DSSFlowParallelBuild(object):
+    """
+    A build of some items of the flow, with one job per recipe to run, and independent branches of the flow built at
+    the same time.
+
+    The recipes to run are ordered by the dependencies of the flow graph: the job of a recipe is started as soon as the
+    jobs of the recipes building its inputs are done, as long as less than `max_concurrent_jobs` jobs are running. If a
+    job fails, the recipes downstream of it are skipped, and the other branches go on.
+
+    .. important ::
+        Do not create this directly, use :meth:`DSSProjectFlow.new_parallel_build`.
+    """
+
+    def __init__(self, flow, graph, targets, max_concurrent_jobs=4, recursive=True, stop_at=None,
+                 job_type="NON_RECURSIVE_FORCED_BUILD", max_poll_ms=5000):
+        if max_concurrent_jobs < 1:
+            raise ValueError("max_concurrent_jobs must be at least 1")
+        self.flow = flow
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.job_type = job_type
+        self.max_poll_ms = max_poll_ms
+        self._steps = self._get_steps(graph, targets, recursive, stop_at if stop_at is not None else [])
+        self._report = None
+
+    def get_plan(self):
+        """
+        Get the recipes run by this build.
+
+        :returns: a list of dicts, one per recipe, each with the "recipe" name, the "outputs" it builds (as dicts with
+                  "type" and "id") and the names of the recipes it waits for, in "dependsOn". The recipes come after
+                  the recipes they wait for
+        :rtype: list
+        """
+        return [{
+            "recipe": step["recipe"],
+            "outputs": [{"type": object_type, "id": name} for (object_type, name) in step["outputs"]],
+            "dependsOn": [self._steps[i]["recipe"] for i in step["dependsOn"]]
+        } for step in self._steps]
+
+    def run(self, no_fail=False, stop_on_failure=False):
+        """
+        Run the build, and wait for it to complete.
+
+        :param bool no_fail: (optional) if True, do not raise if a job does not end successfully
+        :param bool stop_on_failure: (optional) if True, do not start new jobs once a job failed. The running jobs are
+                                     waited for
+
+        Polls of the status of a job failing with a transient error are retried. If the status of a job still cannot be
+        polled, the job is aborted and counted as failed.
+
+        :returns: the report of the build, see :meth:`get_report`
+        :rtype: dict
+        :raises DataikuException: if a job did not end successfully, unless `no_fail` is True
+        """
+        waiter = DSSFutureWaiter(max_poll_ms=self.max_poll_ms)
+        records = [{
+            "recipe": step["recipe"],
+            "outputs": [name for (_, name) in step["outputs"]],
+            "jobId": None,
+            "state": None,
+            "readyTime": None,
+            "startTime": None,
+            "endTime": None,
+            "error": None
+        } for step in self._steps]
+        dependents = [[] for _ in self._steps]
+        remaining_inputs = []
+        for (i, step) in enumerate(self._steps):
+            remaining_inputs.append(len(step["dependsOn"]))
+            for dependency in step["dependsOn"]:
+                dependents[dependency].append(i)
+
+        start_time = time.time()
+        ready = deque(i for (i, count) in enumerate(remaining_inputs) if count == 0)
+        for i in ready:
+            records[i]["readyTime"] = start_time
+        running = {}
+        jobs = {}
+        stopped = False
+
+        def finish(i, state, error):
+            now = time.time()
+            records[i]["endTime"] = now
+            records[i]["state"] = state
+            records[i]["error"] = error
+            if state != "DONE":
+                return True
+            for dependent in dependents[i]:
+                remaining_inputs[dependent] -= 1
+                if remaining_inputs[dependent] == 0:
+                    records[dependent]["readyTime"] = now
+                    ready.append(dependent)
+            return False
+
+        try:
+            while len(ready) > 0 or len(running) > 0:
+                while len(ready) > 0 and len(running) < self.max_concurrent_jobs and not stopped:
+                    i = ready.popleft()
+                    builder = self.flow.project.new_job(self.job_type)
+                    for (object_type, name) in self._steps[i]["outputs"]:
+                        builder.with_output(name, object_type=object_type)
+                    records[i]["startTime"] = time.time()
+                    try:
+                        job = builder.start()
+                    except Exception as e:
+                        stopped = finish(i, "FAILED", e) and stop_on_failure
+                        continue
+                    records[i]["jobId"] = job.id
+                    jobs[i] = job
+                    running[waiter.submit(job, no_fail=True)] = i
+                if len(running) == 0:
+                    break
+                done, _ = _wait_futures(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        state, error = future.result(), None
+                    except Exception as e:
+                        # the status of the job could not be polled: the job may still be running, abort it so that
+                        # the report matches what runs on DSS
+                        state, error = "FAILED", e
+                        self._abort_job(jobs[i])
+                    stopped = (finish(i, state, error) and stop_on_failure) or stopped
+        except BaseException:
+            # interrupted: do not leave jobs running behind
+            for i in running.values():
+                self._abort_job(jobs[i])
+            raise
+
+        for record in records:
+            if record["state"] is None:
+                record["state"] = "SKIPPED"
+        self._report = self._build_report(records, start_time, time.time())
+        if not no_fail and len(self._report["failed"]) > 0:
+            raise DataikuException("Parallel build failed, jobs not done for recipes: %s" % (
+                ", ".join("%s (%s)" % (r["recipe"], r["state"]) for r in records if r["state"] not in ("DONE", "SKIPPED"))))
+        return self._report
+
+    @staticmethod
+    def _abort_job(job):
+        try:
+            job.abort()
+        except Exception:
+            logging.exception("Failed to abort job %s" % job.id)
+
+    def get_report(self):
+        """
+        Get the report of the last run of this build.
+
+        The critical path is the chain of dependent jobs with the longest total duration: with unlimited concurrent
+        jobs, the build could not be faster. The difference between "totalSeconds" and "criticalPathSeconds" is the time
+        spent waiting for a free job slot, starting the jobs and polling their status.
+
+        :returns: None if the build was not run, else a dict with:
+
+                  * **totalSeconds**: the duration of the build
+                  * **criticalPath**: the names of the recipes of the critical path, upstream first
+                  * **criticalPathSeconds**: the total duration of the jobs of the critical path
+                  * **done**, **failed**, **skipped**: the names of the recipes whose job was done, did not end
+                    successfully, and which were not run because an upstream job failed
+                  * **jobs**: a dict per recipe, in the order of :meth:`get_plan`, with the "recipe", its "outputs",
+                    the "jobId", the final "state" (DONE, FAILED, ABORTED or SKIPPED), the "error" raised when starting
+                    or polling the job, the "readyTime", "startTime" and "endTime" as epochs in seconds, the
+                    "queuedSeconds" between the recipe being ready and its job starting, and the "durationSeconds" of
+                    the job
+
+        :rtype: dict
+        """
+        return self._report
+
+    def _build_report(self, records, start_time, end_time):
+        for record in records:
+            record["queuedSeconds"] = None
+            record["durationSeconds"] = None
+            if record["startTime"] is not None:
+                record["queuedSeconds"] = record["startTime"] - record["readyTime"]
+                record["durationSeconds"] = record["endTime"] - record["startTime"]
+
+        # longest chain of jobs, the steps being in topological order
+        path_seconds = [0.0] * len(records)
+        path_previous = [None] * len(records)
+        for (i, step) in enumerate(self._steps):
+            for dependency in step["dependsOn"]:
+                if path_seconds[dependency] > path_seconds[i]:
+                    path_seconds[i] = path_seconds[dependency]
+                    path_previous[i] = dependency
+            path_seconds[i] += records[i]["durationSeconds"] or 0.0
+        critical_path = []
+        if len(records) > 0:
+            last = max(range(len(records)), key=lambda i: path_seconds[i])
+            critical_path_seconds = path_seconds[last]
+            while last is not None:
+                critical_path.append(records[last]["recipe"])
+                last = path_previous[last]
+            critical_path.reverse()
+        else:
+            critical_path_seconds = 0.0
+
+        return {
+            "totalSeconds": end_time - start_time,
+            "criticalPath": critical_path,
+            "criticalPathSeconds": critical_path_seconds,
+            "done": [r["recipe"] for r in records if r["state"] == "DONE"],
+            "failed": [r["recipe"] for r in records if r["state"] not in ("DONE", "SKIPPED")],
+            "skipped": [r["recipe"] for r in records if r["state"] == "SKIPPED"],
+            "jobs": records
+        }
+
+    @staticmethod
+    def _get_steps(graph, targets, recursive, stop_at):
+        index = graph._get_index()
+        stopped = set(index.get_position(node) for node in stop_at)
+
+        def is_buildable(position):
+            return index.nodes[position]["type"] in _JOB_OUTPUT_TYPES and len(index.predecessors[position]) > 0
+
+        # the items to build
+        built = set()
+        frontier = []
+        for target in targets:
+            position = index.get_position(target)
+            if not is_buildable(position):
+                raise ValueError("%s is not built by a recipe" % index.nodes[position]["ref"])
+            if position not in built:
+                built.add(position)
+                frontier.append(position)
+        while recursive and len(frontier) > 0:
+            position = frontier.pop()
+            for recipe in index.predecessors[position]:
+                for recipe_input in index.predecessors[recipe]:
+                    if recipe_input not in built and recipe_input not in stopped and is_buildable(recipe_input):
+                        built.add(recipe_input)
+                        frontier.append(recipe_input)
+
+        # one step per recipe, building all its outputs to build at once
+        step_of_recipe = {}
+        outputs_of_recipe = {}
+        for position in built:
+            recipe = index.predecessors[position][0]
+            outputs_of_recipe.setdefault(recipe, []).append(position)
+        recipes = [position for position in index.get_topological_order() if position in outputs_of_recipe]
+        steps = []
+        for recipe in recipes:
+            step_of_recipe[recipe] = len(steps)
+            depends_on = set()
+            for recipe_input in index.predecessors[recipe]:
+                if recipe_input in built:
+                    depends_on.add(step_of_recipe[index.predecessors[recipe_input][0]])
+            steps.append({
+                "recipe": index.nodes[recipe]["ref"],
+                "outputs": [(_JOB_OUTPUT_TYPES[index.nodes[o]["type"]], index.nodes[o]["ref"]) for o in sorted(outputs_of_recipe[recipe])],
+                "dependsOn": sorted(depends_on)
+            })
+        return steps
+
+
 class DSSFlowZone(object):
     """
     A zone in the Flow.
@@ -680,6 +976,7 @@ class DSSProjectFlowGraph(object):
         self.flow = flow
         self.data = data
         self.nodes = data["nodes"]
+        self._index = None
 
     def get_source_computables(self, as_type="dict"):
         """
@@ -807,32 +1104,38 @@ class DSSProjectFlowGraph(object):
                 :class:`.DSSRecipe`
         """
         ret = []
-
-        def add_to_set(node):
-            ret.append(node)
-
-        def in_set(obj):
-            for candidate in ret:
-                if candidate["type"] == obj["type"] and candidate["ref"] == obj["ref"]:
-                    return True
-            return False
+        added = set()
 
         def add_from(graph_node):
-            # To keep traversal order, we recurse to predecessors first
-            for predecessor_ref in graph_node["predecessors"]:
-                predecessor_node = self.nodes[predecessor_ref]
-                if not in_set(predecessor_node):
-                    add_from(predecessor_node)
-
-            # Then add ourselves
-            if not in_set(graph_node):
-                add_to_set(graph_node)
-
-            # Then recurse to successors
-            for successor_ref in graph_node["successors"]:
-                successor_node = self.nodes[successor_ref]
-                if not in_set(successor_node):
-                    add_from(successor_node)
+            # Iterative version of a recursive walk: to keep traversal order, we go to the predecessors first,
+            # then add the node, then go to the successors. Each frame is [node, visiting successors, next index]
+            stack = [[graph_node, False, 0]]
+            while len(stack) > 0:
+                frame = stack[-1]
+                node = frame[0]
+                if not frame[1]:
+                    predecessors = node["predecessors"]
+                    if frame[2] < len(predecessors):
+                        predecessor_node = self.nodes[predecessors[frame[2]]]
+                        frame[2] += 1
+                        if (predecessor_node["type"], predecessor_node["ref"]) not in added:
+                            stack.append([predecessor_node, False, 0])
+                        continue
+                    key = (node["type"], node["ref"])
+                    if key not in added:
+                        added.add(key)
+                        ret.append(node)
+                    frame[1] = True
+                    frame[2] = 0
+
+                successors = node["successors"]
+                if frame[2] < len(successors):
+                    successor_node = self.nodes[successors[frame[2]]]
+                    frame[2] += 1
+                    if (successor_node["type"], successor_node["ref"]) not in added:
+                        stack.append([successor_node, False, 0])
+                    continue
+                stack.pop()
 
         for source_computable in self.get_source_computables():
             add_from(source_computable)
@@ -842,6 +1145,159 @@ class DSSProjectFlowGraph(object):
 
         return self._convert_nodes_list(ret, as_type)
 
+    def get_topological_order(self, as_type="dict"):
+        """
+        Get the list of nodes, each node coming after all its predecessors.
+
+        Unlike :meth:`get_items_in_traversal_order`, the nodes are not grouped by branch: this is the order in which
+        they can be built.
+
+        :param str as_type: How to return the nodes. Possible values are "dict" and "object" (defaults to **dict**).
+
+        :returns: A list of nodes
+        :rtype: If as_type=dict, each item is returned as a dict containing at least "ref" and "type".
+                If as_type=object, each item is returned as a :class:`.DSSDataset`.
+                :class:`.DSSManagedFolder`,
+                :class:`.DSSSavedModel`,
+                :class:`.DSSModelEvaluationStore`,
+                :class:`.DSSStreamingEndpoint` or
+                :class:`.DSSRecipe`
+        """
+        index = self._get_index()
+        return self._convert_nodes_list([index.nodes[i] for i in index.get_topological_order()], as_type)
+
+    def get_upstream(self, node, depth=None, as_type="dict"):
+        """
+        Get the nodes from which a node is built, directly or not.
+
+        :param node: Either a node name, a node dict of this graph, a dataset object or a recipe object
+        :type node: str, dict, :class:`.DSSDataset` or :class:`.DSSRecipe`
+        :param int depth: (optional) maximum number of edges between the node and the returned nodes. Note that
+                          recipes and computables alternate, so a depth of 2 returns the direct input computables
+                          and their recipes. Defaults to no limit
+        :param str as_type: How to return the nodes. Possible values are "dict" and "object" (defaults to **dict**).
+
+        :returns: A list of nodes, closest ones first. The node itself is not included
+        :rtype: If as_type=dict, each item is returned as a dict containing at least "ref" and "type".
+                If as_type=object, each item is returned as an object, as in :meth:`get_items_in_traversal_order`
+        """
+        index = self._get_index()
+        closure = index.get_closure(index.get_position(node), index.predecessors, depth)
+        return self._convert_nodes_list([index.nodes[i] for i in closure], as_type)
+
+    def get_downstream(self, node, depth=None, as_type="dict"):
+        """
+        Get the nodes which are built from a node, directly or not.
+
+        :param node: Either a node name, a node dict of this graph, a dataset object or a recipe object
+        :type node: str, dict, :class:`.DSSDataset` or :class:`.DSSRecipe`
+        :param int depth: (optional) maximum number of edges between the node and the returned nodes. Defaults to
+                          no limit
+        :param str as_type: How to return the nodes. Possible values are "dict" and "object" (defaults to **dict**).
+
+        :returns: A list of nodes, closest ones first. The node itself is not included
+        :rtype: If as_type=dict, each item is returned as a dict containing at least "ref" and "type".
+                If as_type=object, each item is returned as an object, as in :meth:`get_items_in_traversal_order`
+        """
+        index = self._get_index()
+        closure = index.get_closure(index.get_position(node), index.successors, depth)
+        return self._convert_nodes_list([index.nodes[i] for i in closure], as_type)
+
+    def get_impacted_items(self, nodes, as_type="dict"):
+        """
+        Get the nodes impacted by a change of some nodes, i.e. everything downstream of them.
+
+        :param list nodes: the changed nodes, each one either a node name, a node dict of this graph, a dataset object
+                           or a recipe object
+        :param str as_type: How to return the nodes. Possible values are "dict" and "object" (defaults to **dict**).
+
+        :returns: A list of nodes, in topological order, so that the impacted items can be rebuilt in this order.
+                  The changed nodes are not included, unless they are downstream of another changed node
+        :rtype: If as_type=dict, each item is returned as a dict containing at least "ref" and "type".
+                If as_type=object, each item is returned as an object, as in :meth:`get_items_in_traversal_order`
+        """
+        index = self._get_index()
+        impacted = set()
+        for node in nodes:
+            impacted.update(index.get_closure(index.get_position(node), index.successors, None))
+        ordered = [i for i in index.get_topological_order() if i in impacted]
+        return self._convert_nodes_list([index.nodes[i] for i in ordered], as_type)
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = _DSSFlowGraphIndex(self.nodes)
+        return self._index
+
+
+class _DSSFlowGraphIndex(object):
+    """
+    Adjacency arrays of a flow graph, where nodes are identified by their position in `nodes`.
+    Built once per graph, closures are cached.
+    """
+
+    def __init__(self, nodes_by_id):
+        self.ids = list(nodes_by_id.keys())
+        self.nodes = [nodes_by_id[node_id] for node_id in self.ids]
+        self.positions = {node_id: i for (i, node_id) in enumerate(self.ids)}
+        self._positions_by_ref = None
+        # zone graphs can reference nodes outside of the zone, skip them
+        self.predecessors = [[self.positions[x] for x in node["predecessors"] if x in self.positions] for node in self.nodes]
+        self.successors = [[self.positions[x] for x in node["successors"] if x in self.positions] for node in self.nodes]
+        self._topological_order = None
+        self._closures = {}
+
+    def get_position(self, node):
+        if isinstance(node, DSSDataset):
+            node = node.dataset_name
+        elif isinstance(node, DSSRecipe):
+            node = node.recipe_name
+        if isinstance(node, dict):
+            if self._positions_by_ref is None:
+                self._positions_by_ref = {(n["type"], n["ref"]): i for (i, n) in enumerate(self.nodes)}
+            position = self._positions_by_ref.get((node.get("type"), node.get("ref")), None)
+        else:
+            position = self.positions.get(node, None)
+        if position is None:
+            raise ValueError("Node %s not found in Flow graph" % node)
+        return position
+
+    def get_topological_order(self):
+        if self._topological_order is None:
+            remaining_predecessors = [len(p) for p in self.predecessors]
+            order = [i for (i, count) in enumerate(remaining_predecessors) if count == 0]
+            next_position = 0
+            while next_position < len(order):
+                for successor in self.successors[order[next_position]]:
+                    remaining_predecessors[successor] -= 1
+                    if remaining_predecessors[successor] == 0:
+                        order.append(successor)
+                next_position += 1
+            if len(order) != len(self.nodes):
+                raise ValueError("Flow graph contains a cycle")
+            self._topological_order = order
+        return self._topological_order
+
+    def get_closure(self, position, adjacency, depth):
+        key = (position, adjacency is self.successors, depth)
+        closure = self._closures.get(key, None)
+        if closure is None:
+            seen = {position}
+            closure = []
+            frontier = [position]
+            level = 0
+            while len(frontier) > 0 and (depth is None or level < depth):
+                next_frontier = []
+                for current in frontier:
+                    for neighbour in adjacency[current]:
+                        if neighbour not in seen:
+                            seen.add(neighbour)
+                            closure.append(neighbour)
+                            next_frontier.append(neighbour)
+                frontier = next_frontier
+                level += 1
+            self._closures[key] = closure
+        return closure
+
 
 class DSSFlowTool(object):
     """
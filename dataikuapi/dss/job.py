@@ -1,4 +1,5 @@
 import sys
+import time
 from ..utils import DataikuException
 from ..utils import _ExponentialBackoff
 
@@ -52,6 +53,71 @@ class DSSJob(object):
                 "activity" : activity
             })
 
+    def tail_log(self, activity=None, follow=True, sink=None, poll_interval=2, encoding="utf-8"):
+        """
+        Iterates over the lines of the logs of the job, as they are written.
+
+        Only the part of the log not yet read is requested at each poll, using a HTTP Range request from the current
+        offset in the log. The log is processed in chunks, so it is never held in memory as a whole. If `follow` is True,
+        the log is polled until the job reaches a terminal state (DONE, ABORTED or FAILED), then its last lines are read.
+
+        .. code-block:: python
+
+            job = project.get_job(job_id)
+            with open("job.log", "wb") as f:
+                for line in job.tail_log(sink=f):
+                    if "Exception" in line:
+                        print(line)
+
+        :param string activity: (optional) the name of the activity in the job whose log is requested (defaults to **None**)
+        :param boolean follow: (optional) whether to keep polling the log until the job is finished (defaults to **True**).
+                               If False, only the current content of the log is read
+        :param sink: (optional) a file-like object opened in binary mode, where the log is written as it is read
+        :param float poll_interval: (optional) the delay between two polls of the log, in seconds (defaults to **2**)
+        :param string encoding: (optional) the encoding of the log (defaults to **utf-8**)
+
+        :returns: a generator over the lines of the log, without their line terminator
+        :rtype: generator of string
+        """
+        offset = 0
+        partial = b""
+        while True:
+            finished = not follow or self.get_status().get("baseStatus", {}).get("state", "") in ["DONE", "ABORTED", "FAILED"]
+            for chunk in self._iter_log_chunks(activity, offset):
+                offset += len(chunk)
+                if sink is not None:
+                    sink.write(chunk)
+                lines = (partial + chunk).split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    yield line.rstrip(b"\r").decode(encoding, "replace")
+            if finished:
+                break
+            time.sleep(poll_interval)
+        if len(partial) > 0:
+            yield partial.rstrip(b"\r").decode(encoding, "replace")
+
+    def _iter_log_chunks(self, activity, offset, chunk_size=65536):
+        # ask from the last byte already read, so that the range is always satisfiable even without new content
+        headers = {"Range": "bytes=%d-" % (offset - 1)} if offset > 0 else None
+        resp = self.client._perform_raw(
+            "GET", "/projects/%s/jobs/%s/log" % (self.project_key, self.id),
+            params={
+                "activity" : activity
+            }, headers=headers)
+        try:
+            # full content if the range is not supported
+            skip = 1 if resp.status_code == 206 else offset
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if skip > 0:
+                    skipped = min(skip, len(chunk))
+                    chunk = chunk[skipped:]
+                    skip -= skipped
+                if len(chunk) > 0:
+                    yield chunk
+        finally:
+            resp.close()
+
 
 class DSSJobWaiter(object):
     """
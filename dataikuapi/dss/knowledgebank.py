@@ -1,9 +1,13 @@
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 
 from .document_extractor import ManagedFolderImageRef, ManagedFolderDocumentRef
 from .managedfolder import DSSManagedFolder
 from .utils import DSSTaggableObjectListItem, DSSTaggableObjectSettings, AnyLoc
+from ..utils import _iter_ordered_concurrently
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +77,7 @@ class DSSKnowledgeBank(object):
         self.client = client
         self.project_key = project_key
         self._id = id
+        self._search_cache = None
 
     @property
     def id(self):
@@ -138,6 +143,25 @@ class DSSKnowledgeBank(object):
         else:
             return jd.start()
 
+    def set_search_cache(self, cache):
+        """
+        Set the cache of the search results of this handle, for :meth:`search` and :meth:`search_many`.
+
+        A cache can be shared by several knowledge bank handles, and is then also used by the Langchain retrievers of
+        these handles. Results are only served from the cache if the query and all the search parameters are the same.
+
+        .. code-block:: python
+
+            cache = DSSKnowledgeBankSearchCache(max_size=10000, ttl_seconds=3600)
+            kb.set_search_cache(cache)
+            ...
+            print(cache.get_stats())
+
+        :param cache: the cache to use, or None to stop caching search results
+        :type cache: :class:`dataikuapi.dss.knowledgebank.DSSKnowledgeBankSearchCache`
+        """
+        self._search_cache = cache
+
     # Keep args in sync with dataikuapi.dss.langchain.knowledge_bank.DKUKnowledgeBankRetriever
     def search(self, query,
                max_documents=10, search_type="SIMILARITY",
@@ -162,6 +186,42 @@ class DSSKnowledgeBank(object):
         :rtype: :class:`dataikuapi.dss.knowledgebank.DSSKnowledgeBankSearchResult`
         """
         assert query, "the query is required"
+        params = self._get_search_params(max_documents, search_type, similarity_threshold, mmr_documents_count, mmr_factor,
+                                         hybrid_use_advanced_reranking, hybrid_rrf_rank_constant, hybrid_rrf_rank_window_size)
+        return self._search(query, params)
+
+    def search_many(self, queries, concurrency=4,
+                    max_documents=10, search_type="SIMILARITY",
+                    similarity_threshold=0.5,
+                    mmr_documents_count=20, mmr_factor=0.25,
+                    hybrid_use_advanced_reranking=False, hybrid_rrf_rank_constant=60, hybrid_rrf_rank_window_size=4):
+        """
+        Search for documents in a knowledge bank, for many queries
+
+        The queries are sent with at most `concurrency` searches running at the same time, and share the same search
+        parameters. See :meth:`search` for the meaning of the parameters.
+
+        .. code-block:: python
+
+            questions = ["What is the refund policy?", "How do I reset my password?"]
+            for question, result in zip(questions, kb.search_many(questions, concurrency=8, max_documents=5)):
+                print(question, [d.text for d in result.documents])
+
+        :param list queries: the queries, as a list of strings
+        :param int concurrency: the maximum number of searches running at the same time, defaults to 4
+        :returns: a list with the result of each query, in the order of the queries
+        :rtype: list[:class:`dataikuapi.dss.knowledgebank.DSSKnowledgeBankSearchResult`]
+        """
+        queries = list(queries)
+        for query in queries:
+            assert query, "the query is required"
+        params = self._get_search_params(max_documents, search_type, similarity_threshold, mmr_documents_count, mmr_factor,
+                                         hybrid_use_advanced_reranking, hybrid_rrf_rank_constant, hybrid_rrf_rank_window_size)
+        return list(_iter_ordered_concurrently(lambda query: self._search(query, params), queries, concurrency))
+
+    @staticmethod
+    def _get_search_params(max_documents, search_type, similarity_threshold, mmr_documents_count, mmr_factor,
+                           hybrid_use_advanced_reranking, hybrid_rrf_rank_constant, hybrid_rrf_rank_window_size):
         assert type(max_documents) is int and max_documents > 0, "max_documents should be a positive integer"
         valid_search_types = ["SIMILARITY", "SIMILARITY_THRESHOLD", "MMR", "HYBRID"]
         assert search_type in valid_search_types, "invalid search_type, it should be one of " + ",".join(valid_search_types)
@@ -174,27 +234,107 @@ class DSSKnowledgeBank(object):
             assert type(hybrid_rrf_rank_constant) is int and hybrid_rrf_rank_constant > 0, "hybrid_rrf_rank_constant should be a positive integer"
             assert type(hybrid_rrf_rank_window_size) is int and hybrid_rrf_rank_window_size > 0, "hybrid_rrf_rank_window_size should be a positive integer"
 
+        # sorted keys, so that the encoded params can be used in the key of the cache
+        return json.dumps({
+            "maxDocuments": max_documents,
+            "searchType": search_type,
+            "similarityThreshold": similarity_threshold,
+            "mmrK": mmr_documents_count,
+            "mmrDiversity": mmr_factor,
+            "useAdvancedReranking": hybrid_use_advanced_reranking,
+            "rrfRankConstant": hybrid_rrf_rank_constant,
+            "rrfRankWindowSize": hybrid_rrf_rank_window_size,
+            "includeScore": True,
+            "filter": {},
+            "includeMultimodalContent": True
+        }, sort_keys=True)
+
+    def _search(self, query, params):
+        cache = self._search_cache
+        if cache is not None:
+            key = (self.project_key, self.id, query, params)
+            documents = cache._get(key)
+            if documents is not None:
+                return DSSKnowledgeBankSearchResult(self, documents)
+
         response = self.client._perform_json("POST", "/projects/%s/knowledge-banks/%s/search" % (self.project_key, self.id), params={
             "query": query,
-            "params": json.dumps({
-                "maxDocuments": max_documents,
-                "searchType": search_type,
-                "similarityThreshold": similarity_threshold,
-                "mmrK": mmr_documents_count,
-                "mmrDiversity": mmr_factor,
-                "useAdvancedReranking": hybrid_use_advanced_reranking,
-                "rrfRankConstant": hybrid_rrf_rank_constant,
-                "rrfRankWindowSize": hybrid_rrf_rank_window_size,
-                "includeScore": True,
-                "filter": {},
-                "includeMultimodalContent": True
-            })
+            "params": params
         })
         if response.get("error"):
             raise Exception("search failed: " + response["error"].get("message", json.dumps(response)))
+        if cache is not None:
+            cache._put(key, response["documents"])
         return DSSKnowledgeBankSearchResult(self, response["documents"])
 
 
+class DSSKnowledgeBankSearchCache(object):
+    """
+    A bounded cache of knowledge bank search results, to set on knowledge bank handles with
+    :meth:`dataikuapi.dss.knowledgebank.DSSKnowledgeBank.set_search_cache`.
+
+    Results are keyed on the knowledge bank, the query and the search parameters. When the cache is full, the least
+    recently used result is evicted. The cache can be used from several threads.
+
+    .. note::
+
+        Cached results are not invalidated when the knowledge bank is rebuilt. Use a `ttl_seconds`, or :meth:`clear`
+        the cache after a build.
+
+    :param int max_size: the maximum number of results kept, defaults to 1024
+    :param float ttl_seconds: (optional) how long a result is kept, in seconds. If None, results do not expire
+    """
+    def __init__(self, max_size=1024, ttl_seconds=None):
+        assert max_size > 0, "max_size should be a positive integer"
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get_stats(self):
+        """
+        Get the usage statistics of the cache
+
+        :return: a dict with the number of "hits" and "misses" since the creation of the cache, and the current "size"
+        :rtype: dict
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "size": len(self._entries)}
+
+    def clear(self):
+        """
+        Remove all the results from the cache. The statistics are kept
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and entry[0] + self.ttl_seconds < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            text = entry[1]
+        # a new copy for each hit, so that the documents can be modified by the caller
+        return json.loads(text)
+
+    def _put(self, key, documents):
+        # kept as JSON text, not affected by changes to the documents returned
+        text = json.dumps(documents)
+        with self._lock:
+            self._entries[key] = (time.time(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
 class DSSKnowledgeBankSettings(DSSTaggableObjectSettings):
     """
     Settings for a knowledge bank
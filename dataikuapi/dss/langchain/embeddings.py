@@ -1,6 +1,6 @@
 """Wrapper around Dataiku-mediated embedding LLMs"""
 import asyncio
-import concurrent
+import concurrent.futures
 import logging
 import threading 
 
@@ -43,6 +43,9 @@ class DKUEmbeddings(LockedDownBaseModel, Embeddings):
     llm_id: str
     """LLM identifier to use"""
 
+    max_in_flight: int = 4
+    """Maximum number of embeddings queries running at the same time"""
+
     _llm_handle = None
     """:class:`dataikuapi.dss.llm.DSSLLM` object to wrap."""
 
@@ -91,39 +94,70 @@ class DKUEmbeddings(LockedDownBaseModel, Embeddings):
             logger.info("Performing embedding of {num_texts} texts".format(num_texts=len(texts)))
 
             embeddings = []
-            for i in range(0, len(texts), CHUNK_SIZE):
-                query = self._llm_handle.new_embeddings(text_overflow_mode="FAIL")
+            for (chunk, resp) in self._new_pipeline().iter_responses(texts):
+                embeddings.extend(self._handle_response(trace, resp, len(embeddings) + len(chunk), len(texts)))
 
-                for text in texts[i:i+CHUNK_SIZE]:
-                    query.add_text(text)
+            logger.info("Done performing embedding of {num_texts} texts".format(num_texts=len(texts)))
 
-                resp = query.execute()
+            return embeddings
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Call out to Dataiku-mediated LLM, without blocking the event loop
 
-                # TODO
-                #if not resp.success:
-                #    raise Exception("LLM call failed: %s" % resp._raw.get("errorMessage", "Unknown error"))
+        Args:
+            texts: The list of texts to embed.
 
-                if "responses" in resp._raw and len(resp._raw["responses"]) == 1:
-                    if "trace" in resp._raw["responses"][0]:
-                        trace_response = resp._raw["responses"][0]["trace"]
-                        trace.append_trace(trace_response)
-                        for callback in self._callbacks:
-                            callback(trace_response)
+        Returns:
+            List of embeddings, one for each text.
+        """
+        with new_trace("DKUEmbeddings") as trace:
+            self._last_trace.trace = trace
 
-                embeddings.extend(resp.get_embeddings())
+            logger.info("Performing embedding of {num_texts} texts".format(num_texts=len(texts)))
 
-                logger.info("Finished a chunk. Embedded {num_embedded} of {num_texts} texts".format(
-                    num_embedded=min(i + CHUNK_SIZE, len(texts)), num_texts=len(texts)))
+            # Same pipeline as embed_documents, iterated from a single executor thread. The iterator is created
+            # here so that it picks the guardrails bypass token of the calling thread
+            responses = self._new_pipeline().iter_responses(texts)
+            loop = asyncio.get_running_loop()
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            embeddings = []
+            try:
+                while True:
+                    item = await loop.run_in_executor(executor, next, responses, None)
+                    if item is None:
+                        break
+                    (chunk, resp) = item
+                    embeddings.extend(self._handle_response(trace, resp, len(embeddings) + len(chunk), len(texts)))
+            finally:
+                # runs after the current call to next if cancelled while waiting for it
+                executor.submit(responses.close)
+                executor.shutdown(wait=False)
 
             logger.info("Done performing embedding of {num_texts} texts".format(num_texts=len(texts)))
 
             return embeddings
 
-    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(executor, self.embed_documents, texts)
-        return result
+    def _new_pipeline(self):
+        return self._llm_handle.new_embeddings_pipeline(text_overflow_mode="FAIL", max_chunk_size=CHUNK_SIZE,
+                                                        max_in_flight=self.max_in_flight)
+
+    def _handle_response(self, trace, resp, num_embedded, num_texts):
+        # TODO
+        #if not resp.success:
+        #    raise Exception("LLM call failed: %s" % resp._raw.get("errorMessage", "Unknown error"))
+
+        if "responses" in resp._raw and len(resp._raw["responses"]) == 1:
+            if "trace" in resp._raw["responses"][0]:
+                trace_response = resp._raw["responses"][0]["trace"]
+                trace.append_trace(trace_response)
+                for callback in self._callbacks:
+                    callback(trace_response)
+
+        embeddings = resp.get_embeddings()
+
+        logger.info("Finished a chunk. Embedded {num_embedded} of {num_texts} texts".format(
+            num_embedded=num_embedded, num_texts=num_texts))
+        return embeddings
 
     def embed_query(self, text: str) -> List[float]:
         return self.embed_documents([text])[0]
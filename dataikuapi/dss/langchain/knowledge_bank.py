@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, ClassVar, List
 
 from langchain_core.documents import Document
@@ -33,6 +34,16 @@ class DKUKnowledgeBankRetriever(BaseRetriever):
 
     def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
         result = self._kb_handle.search(query, **self._search_kwargs)
+        return self._to_documents(result)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        # the search is a blocking HTTP call, run it in the default executor so that the event loop is not blocked
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, lambda: self._kb_handle.search(query, **self._search_kwargs))
+        return self._to_documents(result)
+
+    @staticmethod
+    def _to_documents(result):
         return [
             Document(
                 page_content=document.text,
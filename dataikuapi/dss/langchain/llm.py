@@ -529,6 +529,7 @@ class DKUChatModel(LockedDownBaseChatModel):
                 tool_call_chunks = _parse_tool_call_chunks(raw_tool_calls)
 
             if type(raw_chunk) == DSSLLMStreamedCompletionFooter:
+                logging.debug("DKUChatModel _stream: time to first chunk: %s" % raw_chunk.time_to_first_chunk)
                 usage_metadata = UsageMetadata(
                     input_tokens=raw_chunk.data.get("promptTokens", 0),
                     output_tokens=raw_chunk.data.get("completionTokens", 0),
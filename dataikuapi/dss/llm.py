@@ -1,8 +1,13 @@
 import json
+import logging
+import re
 import threading
+import time
 
 from .utils import DSSTaggableObjectListItem
+from ..utils import DataikuException, _ExponentialBackoff, _is_transient_error, _iter_ordered_concurrently
 
+logger = logging.getLogger(__name__)
 _dku_bypass_guardrail_ls = threading.local()
 
 
@@ -92,6 +97,21 @@ class DSSLLM(object):
         """
         return DSSLLMEmbeddingsQuery(self, text_overflow_mode)
 
+    def new_embeddings_pipeline(self, text_overflow_mode="FAIL", max_chunk_size=1000, max_chunk_bytes=4 * 1024 * 1024,
+                                max_in_flight=4, max_retries=3):
+        """
+        Create a pipeline to embed a large number of texts.
+
+        :param str text_overflow_mode: How to handle longer texts than what the model supports. Either 'TRUNCATE' or 'FAIL'.
+        :param int max_chunk_size: maximum number of texts sent in one embeddings query
+        :param int max_chunk_bytes: maximum size of the texts sent in one embeddings query, in bytes
+        :param int max_in_flight: maximum number of embeddings queries running at the same time
+        :param int max_retries: number of times an embeddings query failing with a transient error is retried
+        :returns: A handle on the pipeline.
+        :rtype: :class:`DSSLLMEmbeddingsPipeline`
+        """
+        return DSSLLMEmbeddingsPipeline(self, text_overflow_mode, max_chunk_size, max_chunk_bytes, max_in_flight, max_retries)
+
     def new_images_generation(self):
         return DSSLLMImageGenerationQuery(self)
 
@@ -197,10 +217,14 @@ class DSSLLMEmbeddingsQuery(object):
         """
         return DSSLLMRequestGuardrailBuilder(self, type)
 
-    def execute(self):
+    def execute(self, as_array=False):
         """
         Run the embedding query.
 
+        :param bool as_array: if True, the embedding vectors are read from the response directly into a float32
+                              numpy matrix, without building Python lists of floats. Requires numpy. The vectors can
+                              then be retrieved with :meth:`DSSLLMEmbeddingsResponse.get_embeddings`, preferably with
+                              `as_array=True`
         :returns: The results of the embedding query.
         :rtype: :class:`DSSLLMEmbeddingsResponse`
         """
@@ -208,11 +232,21 @@ class DSSLLMEmbeddingsQuery(object):
         if self._guardrails is not None:
             self.eq["guardrails"] = self._guardrails
 
+        headers = None
         if hasattr(_dku_bypass_guardrail_ls, "current_bypass_token"):
-            ret = self.llm.client._perform_json("POST", "/projects/%s/llms/embeddings" % (self.llm.project_key), body=self.eq,
-                                        headers= {"x-dku-guardrails-bypass-token": _dku_bypass_guardrail_ls.current_bypass_token})
-        else:
-            ret = self.llm.client._perform_json("POST", "/projects/%s/llms/embeddings" % (self.llm.project_key), body=self.eq)
+            headers = {"x-dku-guardrails-bypass-token": _dku_bypass_guardrail_ls.current_bypass_token}
+
+        if as_array:
+            http_res = self.llm.client._perform_raw("POST", "/projects/%s/llms/embeddings" % (self.llm.project_key), body=self.eq,
+                                                    headers=headers)
+            try:
+                body = http_res.content
+            finally:
+                http_res.close()
+            return DSSLLMEmbeddingsResponse(*_parse_embeddings_response(body))
+
+        ret = self.llm.client._perform_json("POST", "/projects/%s/llms/embeddings" % (self.llm.project_key), body=self.eq,
+                                            headers=headers)
         return DSSLLMEmbeddingsResponse(ret)
 
 class DSSLLMEmbeddingsResponse(object):
@@ -222,23 +256,204 @@ class DSSLLMEmbeddingsResponse(object):
     .. important::
         Do not create this class directly, use :meth:`dataikuapi.dss.llm.DSSLLMEmbeddingsQuery.execute` instead.
     """
-    def __init__(self, raw_resp):
+    def __init__(self, raw_resp, embeddings_array=None, embedding_texts=None):
         self._raw = raw_resp
+        self._embeddings_array = embeddings_array
+        # the vectors as they appear in the response, to return them as lists without losing precision
+        self._embedding_texts = embedding_texts
 
-    def get_embeddings(self):
+    def get_embeddings(self, as_array=False):
         """
         Retrieve vectors resulting from the embeddings query.
 
-        :returns: A list of lists containing all embedding vectors.
-        :rtype: list
+        :param bool as_array: if True, return the vectors as a float32 numpy matrix, with one row per vector. Requires
+                              numpy. If the query was executed with `as_array=True`, the matrix is returned without any
+                              copy
+        :returns: A list of lists containing all embedding vectors, or a numpy matrix if `as_array` is True.
+        :rtype: list or :class:`numpy.ndarray`
         """
         for r in self._raw["responses"]:
             if not "embedding" in r:
                 raise Exception("At least one embedding request failed: %s" % r.get("errorMessage", "Unknown error"))
 
+        if as_array:
+            import numpy as np
+            if self._embeddings_array is not None:
+                return self._embeddings_array
+            return np.array([r["embedding"] for r in self._raw["responses"]], dtype=np.float32)
+
+        if self._embedding_texts is not None:
+            return [json.loads(b"[" + text + b"]") for text in self._embedding_texts]
         return [r["embedding"] for r in self._raw["responses"]]
 
 
+# strings and brackets of a JSON document. Numbers, commas and colons are skipped
+_JSON_STRUCTURE_RE = re.compile(br'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+_JSON_FLAT_ARRAY_RE = re.compile(br'\s*:\s*\[([^\]]*)\]')
+
+
+def _parse_embeddings_response(body):
+    """
+    Parse the JSON body of an embeddings response, reading the vectors of the responses directly into a float32
+    numpy matrix. The vectors are replaced in the parsed response by views on the rows of the matrix.
+
+    :returns: a tuple of (the parsed response, the matrix, the text of each vector in the body)
+    """
+    import numpy as np
+
+    # first pass: locate the vectors, and replace them by their row number in the rest of the document
+    vectors = []
+    skeleton = []
+    skeleton_start = 0
+    depth = []
+    pos = 0
+    while True:
+        m = _JSON_STRUCTURE_RE.search(body, pos)
+        if m is None:
+            break
+        token = m.group(0)
+        pos = m.end()
+        if token == b"{" or token == b"[":
+            depth.append(token)
+        elif token == b"}" or token == b"]":
+            depth.pop()
+        elif token == b'"embedding"' and depth == [b"{", b"[", b"{"]:
+            # key of an object in the "responses" array
+            vector = _JSON_FLAT_ARRAY_RE.match(body, pos)
+            if vector is not None:
+                skeleton.append(body[skeleton_start:pos])
+                skeleton.append(b":%d" % len(vectors))
+                vectors.append((vector.start(1), vector.end(1)))
+                skeleton_start = pos = vector.end()
+    skeleton.append(body[skeleton_start:])
+    raw_resp = json.loads(b"".join(skeleton).decode("utf8"))
+
+    # second pass: parse the vectors into the matrix
+    if len(vectors) == 0:
+        embeddings_array = np.zeros((0, 0), dtype=np.float32)
+    else:
+        first = np.fromstring(body[vectors[0][0]:vectors[0][1]], dtype=np.float32, sep=",")
+        embeddings_array = np.empty((len(vectors), len(first)), dtype=np.float32)
+        embeddings_array[0] = first
+        for i in range(1, len(vectors)):
+            row = np.fromstring(body[vectors[i][0]:vectors[i][1]], dtype=np.float32, sep=",")
+            if len(row) != len(first):
+                raise DataikuException("Cannot read the embeddings as a matrix, the vectors have different sizes: %s and %s"
+                                       % (len(first), len(row)))
+            embeddings_array[i] = row
+
+    for r in raw_resp.get("responses", []):
+        if "embedding" in r:
+            r["embedding"] = embeddings_array[r["embedding"]]
+    return raw_resp, embeddings_array, [body[start:end] for (start, end) in vectors]
+
+
+class DSSLLMEmbeddingsPipeline(object):
+    """
+    A pipeline to embed a large number of texts.
+
+    The texts are split in chunks, each chunk being sent as one embeddings query. A chunk is closed when it reaches
+    either `max_chunk_size` texts or `max_chunk_bytes` bytes of text. Up to `max_in_flight` chunks are embedded at
+    the same time, and a chunk which fails with a transient error (connection error, timeout, HTTP 429 or 5xx) is
+    retried alone, with an exponential backoff. Results are always returned in the order of the texts.
+
+    Usage example:
+
+    .. code-block:: python
+
+        pipeline = llm.new_embeddings_pipeline(max_in_flight=8)
+        vectors = pipeline.embed(texts)
+
+    .. important::
+
+        Do not create this class directly, use :meth:`dataikuapi.dss.llm.DSSLLM.new_embeddings_pipeline` instead.
+    """
+    def __init__(self, llm, text_overflow_mode, max_chunk_size, max_chunk_bytes, max_in_flight, max_retries):
+        self.llm = llm
+        self.text_overflow_mode = text_overflow_mode
+        self.max_chunk_size = max_chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+
+    def embed(self, texts, as_array=False):
+        """
+        Embed texts.
+
+        :param list texts: the texts to embed, as strings
+        :param bool as_array: if True, return the vectors as a float32 numpy matrix, read directly from the responses
+                              (see :meth:`DSSLLMEmbeddingsQuery.execute`). Requires numpy
+        :returns: the embedding vectors, one per text, in the order of the texts
+        :rtype: list of lists of floats, or :class:`numpy.ndarray` if `as_array` is True
+        """
+        if as_array:
+            import numpy as np
+            arrays = [resp.get_embeddings(as_array=True) for (chunk, resp) in self.iter_responses(texts, as_array=True)]
+            if len(arrays) == 0:
+                return np.zeros((0, 0), dtype=np.float32)
+            return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+        embeddings = []
+        for (chunk, resp) in self.iter_responses(texts):
+            embeddings.extend(resp.get_embeddings())
+        return embeddings
+
+    def iter_responses(self, texts, as_array=False):
+        """
+        Embed texts, and iterate over the responses of the embeddings queries, in the order of the texts.
+
+        :param texts: the texts to embed, as strings. Can be any iterable, which is consumed lazily
+        :param bool as_array: if True, the vectors are read directly into numpy matrices
+                              (see :meth:`DSSLLMEmbeddingsQuery.execute`)
+        :returns: an iterator over (chunk, response) pairs, where chunk is the list of texts embedded in the response
+        :rtype: iterator over tuples of (list of str, :class:`DSSLLMEmbeddingsResponse`)
+        """
+        bypass_token = getattr(_dku_bypass_guardrail_ls, "current_bypass_token", None)
+
+        def execute(chunk):
+            return (chunk, self._execute_chunk(chunk, bypass_token, as_array))
+
+        return _iter_ordered_concurrently(execute, self._iter_chunks(texts), self.max_in_flight)
+
+    def _iter_chunks(self, texts):
+        chunk = []
+        chunk_bytes = 0
+        for text in texts:
+            text_bytes = len(text.encode("utf8"))
+            if len(chunk) > 0 and (len(chunk) >= self.max_chunk_size or chunk_bytes + text_bytes > self.max_chunk_bytes):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+            chunk.append(text)
+            chunk_bytes += text_bytes
+        if len(chunk) > 0:
+            yield chunk
+
+    def _execute_chunk(self, chunk, bypass_token=None, as_array=False):
+        # the guardrails bypass token is thread-local, forward it to the worker thread
+        if bypass_token is not None:
+            _dku_bypass_guardrail_ls.current_bypass_token = bypass_token
+        try:
+            eb = _ExponentialBackoff(1000, 30000, 2)
+            attempt = 0
+            while True:
+                query = self.llm.new_embeddings(text_overflow_mode=self.text_overflow_mode)
+                for text in chunk:
+                    query.add_text(text)
+                try:
+                    return query.execute(as_array=as_array)
+                except Exception as e:
+                    # errors like a text overflow or an unknown LLM would fail again
+                    if attempt >= self.max_retries or not _is_transient_error(e):
+                        raise
+                    attempt += 1
+                    logger.warning("Embeddings query of %s texts failed, retrying (%s/%s): %s" % (len(chunk), attempt, self.max_retries, e))
+                    eb.sleep_next()
+        finally:
+            if bypass_token is not None:
+                del _dku_bypass_guardrail_ls.current_bypass_token
+
+
 class DSSLLMCompletionsQuerySingleQuery(object):
     def __init__(self):
         self.cq = {"messages": []}
@@ -448,13 +663,19 @@ class DSSLLMCompletionQuery(DSSLLMCompletionsQuerySingleQuery, SettingsMixin):
 
         return DSSLLMCompletionResponse(raw_resp=ret["responses"][0], response_parser=self._response_parser)
 
-    def execute_streamed(self):
+    def execute_streamed(self, read_size=4096):
         """
         Run the completion query and retrieve the LLM response as streamed chunks.
 
+        The footer records the time to the first chunk, see :attr:`DSSLLMStreamedCompletionFooter.time_to_first_chunk`.
+
+        :param int read_size: (optional) maximum number of bytes read from the connection at once. Chunks are decoded
+                              as soon as they are received, whatever this size
         :returns: An iterator over the LLM response chunks
         :rtype: Iterator[Union[:class:`DSSLLMStreamedCompletionChunk`, :class:`DSSLLMStreamedCompletionFooter`]]
         """
+        start_time = time.time()
+        time_to_first_chunk = None
         request = {"query": self.cq, "settings": self.settings, "llmId": self.llm.llm_id}
 
         if self._guardrails is not None:
@@ -466,13 +687,15 @@ class DSSLLMCompletionQuery(DSSLLMCompletionsQuerySingleQuery, SettingsMixin):
         else:
             ret = self.llm.client._perform_raw("POST", "/projects/%s/llms/streamed-completion" % (self.llm.project_key), body=request)
 
-        sseclient = _SSEClient(ret.iter_content(128))
+        sseclient = _SSEClient(ret.iter_content(read_size))
 
         for evt in sseclient.iterevents():
             if evt.event == "completion-chunk":
+                if time_to_first_chunk is None:
+                    time_to_first_chunk = time.time() - start_time
                 yield DSSLLMStreamedCompletionChunk(json.loads(evt.data))
             else:
-                yield DSSLLMStreamedCompletionFooter(json.loads(evt.data))
+                yield DSSLLMStreamedCompletionFooter(json.loads(evt.data), time_to_first_chunk=time_to_first_chunk)
 
 
 class DSSLLMCompletionsQuery(SettingsMixin):
@@ -646,8 +869,9 @@ class DSSLLMStreamedCompletionChunk(object):
 
 
 class DSSLLMStreamedCompletionFooter(object):
-    def __init__(self, data):
+    def __init__(self, data, time_to_first_chunk=None):
         self.data = data
+        self._time_to_first_chunk = time_to_first_chunk
 
     # Compatibility for code that just checks for "type""
     @property
@@ -658,6 +882,11 @@ class DSSLLMStreamedCompletionFooter(object):
     def trace(self):
         return self.data.get("trace", None)
 
+    @property
+    def time_to_first_chunk(self):
+        """Time between the sending of the query and the reception of the first chunk, in seconds. None if no chunk was received"""
+        return self._time_to_first_chunk
+
     def __repr__(self):
         return "<completion-footer: %s>" % self.data
 
@@ -668,54 +897,83 @@ class _SSEEvent(object):
         self.event = event
         self.data = data
 
-class _SSEClient(object):
-    def __init__(self, raw_source):
-        self.raw_source = raw_source
-
-    def _read(self):
-        """Reads the raw source and yields events. Reassembles events
-        that may span multiple HTTP chunks"""
-        #logging.debug("SSEClient._read")
-        data = b''
-        for chunk in self.raw_source:
-            #logging.info("SSEClient._read: got chunk (len=%s): %s" % (len(chunk), chunk))
-            for line in chunk.splitlines(True):
-                data += line
-                if data.endswith(b'\r\r') or data.endswith(b'\n\n') or data.endswith(b'\r\n\r\n'):
-                    yield data
-                    data = b''
-        #logging.info("SSEClient._read: no more chunk")
-        if data:
-            yield data
-
-    def iterevents(self):
-        for event_chunk in self._read():
-            #logging.info("SSEClient._iterevents: got event")
-            evt = _SSEEvent()
-
-            for line in event_chunk.splitlines():
-                line = line.decode("utf8")
 
-                # Start with : --> comment
-                if line.startswith(":"):
-                    continue
+class _SSEDecoder(object):
+    """Incremental decoder of a server-sent events stream. Bytes are fed as they are received, and
+    complete events are returned as soon as their terminating blank line is seen. Only the last
+    incomplete line of a chunk is kept, so that long events are not copied over and over"""
 
-                data = line.split(":", 1)
-                field = data[0]
+    def __init__(self):
+        self._partial_line = []
+        self._skip_lf = False
+        self._event = _SSEEvent()
+        self._data = []
+
+    def feed(self, chunk):
+        events = []
+        if self._skip_lf and chunk[:1] == b'\n':
+            # second half of a \r\n split between two chunks
+            chunk = chunk[1:]
+        self._skip_lf = chunk.endswith(b'\r')
+        if b'\r' in chunk:
+            chunk = chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        lines = chunk.split(b'\n')
+        incomplete_line = lines.pop()
+        for line in lines:
+            if len(self._partial_line) > 0:
+                self._partial_line.append(line)
+                line = b''.join(self._partial_line)
+                self._partial_line = []
+            self._process_line(line, events)
+        if len(incomplete_line) > 0:
+            self._partial_line.append(incomplete_line)
+        return events
+
+    def flush(self):
+        """Signal the end of the stream, and return the last event, if not terminated by a blank line"""
+        events = []
+        if len(self._partial_line) > 0:
+            self._process_line(b''.join(self._partial_line), events)
+            self._partial_line = []
+        self._process_line(b'', events)
+        return events
+
+    def _process_line(self, line, events):
+        if len(line) == 0:
+            if self._event.event is not None:
+                if len(self._data) > 0:
+                    self._event.data = '\n'.join(self._data) + '\n'
+                events.append(self._event)
+            self._event = _SSEEvent()
+            self._data = []
+            return
+
+        # Start with : --> comment
+        if line.startswith(b':'):
+            return
+
+        field, sep, value = line.partition(b':')
+        field = field.decode("utf8")
+        value = value.decode("utf8").strip()
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._event.event = value
+        elif field == 'id':
+            self._event.id = value
 
-                if len(data) > 1:
-                    value = data[1].strip()
-                else:
-                    value = ''
 
-                if field == 'data':
-                    evt.__dict__[field] += value + '\n'
-                else:
-                    evt.__dict__[field] = value
+class _SSEClient(object):
+    def __init__(self, raw_source):
+        self.raw_source = raw_source
 
-            if evt.event is not None:
-                #logging.info("Yielding event: %s" % evt.__dict__)
+    def iterevents(self):
+        decoder = _SSEDecoder()
+        for chunk in self.raw_source:
+            for evt in decoder.feed(chunk):
                 yield evt
+        for evt in decoder.flush():
+            yield evt
 
 
 class DSSLLMCompletionResponse(object):
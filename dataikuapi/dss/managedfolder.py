@@ -1,12 +1,14 @@
 from ..utils import DataikuException
 from ..utils import DataikuUTF8CSVReader
 from ..utils import DataikuStreamedHttpUTF8CSVReader
+from ..utils import _iter_ordered_concurrently
 from .utils import DSSTaggableObjectListItem, DSSTaggableObjectSettings
+import hashlib
 import json
 import sys
 import os
 from requests import utils
-from .metrics import ComputedMetrics
+from .metrics import ComputedMetrics, _metric_history_to_arrays
 from .future import DSSFuture
 from .discussion import DSSObjectDiscussions
 from .dataset import DSSDataset
@@ -212,10 +214,12 @@ class DSSManagedFolder(object):
         return self.client._perform_empty(
                 "DELETE", "/projects/%s/managedfolders/%s/contents/%s" % (self.project_key, self.odb_id, utils.quote(path)))
 
-    def put_file(self, path, f):
+    def put_file(self, path, f, progress_callback=None):
         """
         Upload the file to the managed folder. If the file already exists in the folder, it is overwritten.
 
+        The file is streamed, it is never fully loaded in memory.
+
         Usage example:
 
         .. code-block:: python
@@ -225,7 +229,9 @@ class DSSManagedFolder(object):
                 print("Uploaded %s bytes" % uploaded["size"])
 
         :param string path: the path of the file to write within the folder
-        :param file f: a file-like
+        :param file f: a file-like, or an iterable of bytes
+        :param progress_callback: (optional) function called as the file is sent, with the number of bytes sent so
+                                  far and the total size of the file (None if not known)
 
         .. note::
 
@@ -241,7 +247,7 @@ class DSSManagedFolder(object):
         """
         return self.client._perform_json_upload(
                 "POST", "/projects/%s/managedfolders/%s/contents/%s" % (self.project_key, self.odb_id, utils.quote(path)),
-                "", f).json()
+                "", f, progress_callback=progress_callback).json()
 
     def upload_folder(self, path, folder):
         """
@@ -262,6 +268,213 @@ class DSSManagedFolder(object):
                     rel_posix_path = "/".join(os.path.relpath(filename, folder).split(os.sep))
                     self.put_file("{}/{}".format(path, rel_posix_path), f)
 
+    def sync_from_local(self, folder, path="/", delete=False, dry_run=False, use_hashes=False, max_workers=8, manifest=None):
+        """
+        Upload the content of a local folder to the managed folder, only transferring the files which changed.
+
+        Local files are compared with the listing of the managed folder, see :meth:`list_contents`. A file is uploaded
+        if it is missing from the managed folder, if its size differs, or if it was modified locally after its last
+        upload. The changed files are uploaded concurrently.
+
+        With `use_hashes`, a manifest of the synchronized files, with the hashes of their contents, is kept locally.
+        A file whose content did not change is then not uploaded again, even if it was touched locally.
+
+        Usage example:
+
+        .. code-block:: python
+
+            report = folder.sync_from_local("./model", path="/model", delete=True, dry_run=True)
+            print("Would upload %s files and delete %s files" % (len(report["copied"]), len(report["deleted"])))
+
+        .. note::
+
+            Without `use_hashes`, modification times are compared between the local machine and the DSS storage,
+            so their clocks are assumed to be in sync
+
+        :param str folder: local path (absolute or relative) of the source folder
+        :param str path: (optional) the destination path of the folder in the managed folder, defaults to the root
+        :param bool delete: (optional) if True, delete the files of the managed folder which are not in the local folder
+        :param bool dry_run: (optional) if True, do not transfer nor delete anything, only report what would be done
+        :param bool use_hashes: (optional) if True, detect changes with content hashes kept in a local manifest
+        :param int max_workers: (optional) maximum number of files transferred at the same time, defaults to 8
+        :param str manifest: (optional) local path of the manifest file used with `use_hashes`. Defaults to a
+                             `.dss-sync-manifest.json` file in the local folder, which is never synchronized
+
+        :returns: a report, as a dict of:
+
+                    * **copied** : the paths of the files uploaded (or to upload, in dry-run mode), relative to `path`
+                    * **deleted** : the paths of the files deleted in the managed folder (or to delete)
+                    * **unchanged** : the number of files which did not need to be uploaded
+                    * **dryRun** : whether this was a dry run
+
+        :rtype: dict
+        """
+        manifest_path = manifest if manifest is not None else os.path.join(folder, _SYNC_MANIFEST_NAME)
+        local_files = _list_local_files(folder, manifest_path)
+        remote_files = self._list_remote_files(path)
+        entries = _load_sync_manifest(manifest_path) if use_hashes else {}
+
+        to_upload = []
+        unchanged = 0
+        for (rel_path, (local_size, local_mtime, local_path)) in sorted(local_files.items()):
+            remote = remote_files.get(rel_path)
+            if remote is None or remote.get("size") != local_size:
+                to_upload.append(rel_path)
+            elif use_hashes:
+                entry = entries.get(rel_path)
+                if entry is None or entry.get("remoteSize") != remote.get("size") or entry.get("remoteLastModified") != remote.get("lastModified"):
+                    # modified remotely since the last synchronization
+                    to_upload.append(rel_path)
+                elif (entry.get("size"), entry.get("mtime")) != (local_size, local_mtime) and entry.get("hash") != _hash_file(local_path):
+                    to_upload.append(rel_path)
+                else:
+                    unchanged += 1
+            elif local_mtime > remote.get("lastModified", 0):
+                to_upload.append(rel_path)
+            else:
+                unchanged += 1
+        to_delete = sorted(p for p in remote_files if p not in local_files) if delete else []
+
+        if not dry_run:
+            def upload(rel_path):
+                (local_size, local_mtime, local_path) = local_files[rel_path]
+                with open(local_path, "rb") as f:
+                    uploaded = self.put_file(_join_folder_path(path, rel_path), f)
+                if use_hashes:
+                    entries[rel_path] = {"size": local_size, "mtime": local_mtime, "hash": _hash_file(local_path),
+                                         "remoteSize": uploaded.get("size"), "remoteLastModified": uploaded.get("lastModified")}
+
+            def delete_remote(rel_path):
+                self.delete_file(_join_folder_path(path, rel_path))
+                entries.pop(rel_path, None)
+
+            try:
+                for _ in _iter_ordered_concurrently(upload, to_upload, max_workers):
+                    pass
+                for _ in _iter_ordered_concurrently(delete_remote, to_delete, max_workers):
+                    pass
+            finally:
+                if use_hashes:
+                    # saved even after a failure, so that the files already transferred are not transferred again
+                    _save_sync_manifest(manifest_path, entries)
+
+        return {"copied": to_upload, "deleted": to_delete, "unchanged": unchanged, "dryRun": dry_run}
+
+    def sync_to_local(self, folder, path="/", delete=False, dry_run=False, use_hashes=False, max_workers=8, manifest=None):
+        """
+        Download the content of the managed folder to a local folder, only transferring the files which changed.
+
+        The listing of the managed folder (see :meth:`list_contents`) is compared with the local files. A file is
+        downloaded if it is missing locally, if its size differs, or if its modification time differs. The modification
+        time of downloaded files is set to the one of the file in the managed folder. The changed files are downloaded
+        concurrently.
+
+        With `use_hashes`, a manifest of the synchronized files, with the hashes of their contents, is kept locally.
+        A local file which was touched but whose content did not change is then not downloaded again.
+
+        Usage example:
+
+        .. code-block:: python
+
+            report = folder.sync_to_local("./model", path="/model", delete=True)
+            print("Downloaded %s files, %s were up to date" % (len(report["copied"]), report["unchanged"]))
+
+        :param str folder: local path (absolute or relative) of the destination folder. Created if needed
+        :param str path: (optional) the path of the source folder in the managed folder, defaults to the root
+        :param bool delete: (optional) if True, delete the local files which are not in the managed folder
+        :param bool dry_run: (optional) if True, do not transfer nor delete anything, only report what would be done
+        :param bool use_hashes: (optional) if True, detect changes with content hashes kept in a local manifest
+        :param int max_workers: (optional) maximum number of files transferred at the same time, defaults to 8
+        :param str manifest: (optional) local path of the manifest file used with `use_hashes`. Defaults to a
+                             `.dss-sync-manifest.json` file in the local folder, which is never synchronized
+
+        :returns: a report, as a dict of:
+
+                    * **copied** : the paths of the files downloaded (or to download, in dry-run mode), relative to `path`
+                    * **deleted** : the paths of the local files deleted (or to delete)
+                    * **unchanged** : the number of files which did not need to be downloaded
+                    * **dryRun** : whether this was a dry run
+
+        :rtype: dict
+        """
+        manifest_path = manifest if manifest is not None else os.path.join(folder, _SYNC_MANIFEST_NAME)
+        local_files = _list_local_files(folder, manifest_path)
+        remote_files = self._list_remote_files(path)
+        entries = _load_sync_manifest(manifest_path) if use_hashes else {}
+
+        to_download = []
+        unchanged = 0
+        for (rel_path, remote) in sorted(remote_files.items()):
+            local = local_files.get(rel_path)
+            if local is None or local[0] != remote.get("size"):
+                to_download.append(rel_path)
+            elif use_hashes:
+                entry = entries.get(rel_path)
+                if entry is None or entry.get("remoteSize") != remote.get("size") or entry.get("remoteLastModified") != remote.get("lastModified"):
+                    # modified remotely since the last synchronization
+                    to_download.append(rel_path)
+                elif (entry.get("size"), entry.get("mtime")) != (local[0], local[1]) and entry.get("hash") != _hash_file(local[2]):
+                    to_download.append(rel_path)
+                else:
+                    unchanged += 1
+            elif local[1] != remote.get("lastModified"):
+                to_download.append(rel_path)
+            else:
+                unchanged += 1
+        to_delete = sorted(p for p in local_files if p not in remote_files) if delete else []
+
+        if not dry_run:
+            def download(rel_path):
+                remote = remote_files[rel_path]
+                local_path = os.path.join(folder, *rel_path.split("/"))
+                local_dir = os.path.dirname(local_path)
+                if not os.path.isdir(local_dir):
+                    try:
+                        os.makedirs(local_dir)
+                    except OSError:
+                        if not os.path.isdir(local_dir):
+                            raise
+                # write to a temporary file first, so that an interrupted download never leaves a truncated file
+                tmp_path = local_path + ".dss-sync-tmp"
+                with self.get_file(_join_folder_path(path, rel_path)) as response:
+                    with open(tmp_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=_SYNC_CHUNK_SIZE):
+                            f.write(chunk)
+                if remote.get("lastModified") is not None:
+                    os.utime(tmp_path, (remote["lastModified"] / 1000.0, remote["lastModified"] / 1000.0))
+                os.replace(tmp_path, local_path)
+                if use_hashes:
+                    stat = os.stat(local_path)
+                    entries[rel_path] = {"size": stat.st_size, "mtime": int(round(stat.st_mtime * 1000)), "hash": _hash_file(local_path),
+                                         "remoteSize": remote.get("size"), "remoteLastModified": remote.get("lastModified")}
+
+            def delete_local(rel_path):
+                os.remove(local_files[rel_path][2])
+                entries.pop(rel_path, None)
+
+            try:
+                for _ in _iter_ordered_concurrently(download, to_download, max_workers):
+                    pass
+                for _ in _iter_ordered_concurrently(delete_local, to_delete, max_workers):
+                    pass
+            finally:
+                if use_hashes:
+                    # saved even after a failure, so that the files already transferred are not transferred again
+                    _save_sync_manifest(manifest_path, entries)
+
+        return {"copied": to_download, "deleted": to_delete, "unchanged": unchanged, "dryRun": dry_run}
+
+    def _list_remote_files(self, path):
+        prefix = "/" + path.strip("/")
+        if prefix != "/":
+            prefix += "/"
+        files = {}
+        for item in self.list_contents()["items"]:
+            item_path = item["path"] if item["path"].startswith("/") else "/" + item["path"]
+            if item_path.startswith(prefix):
+                files[item_path[len(prefix):]] = item
+        return files
+
     ########################################################
     # Managed folder actions
     ########################################################
@@ -322,7 +535,7 @@ class DSSManagedFolder(object):
                 "GET", "/projects/%s/managedfolders/%s/metrics/last" % (self.project_key, self.odb_id)))
 
 
-    def get_metric_history(self, metric):
+    def get_metric_history(self, metric, as_arrays=False):
         """
         Get the history of the values of a metric on this managed folder.
 
@@ -336,15 +549,22 @@ class DSSManagedFolder(object):
                 print("%s : %s" % (time_str, value["value"]))
 
         :param string metric: identifier of the metric to get values of
+        :param bool as_arrays: (optional) if True, return the history as a pair of numpy arrays: the times of the values
+                               (as datetime64[ms]), and the values (as float64 for numeric metrics, else as objects).
+                               Requires numpy
         
         :returns: an object containing the values of the metric, cast to the appropriate type (double, 
-                  boolean,...). The identifier of the metric is in a **metricId** field.
+                  boolean,...). The identifier of the metric is in a **metricId** field. Or a (timestamps, values) pair
+                  of numpy arrays if `as_arrays` is True
 
-        :rtype: dict
+        :rtype: dict or tuple
         """
-        return self.client._perform_json(
+        history = self.client._perform_json(
                 "GET", "/projects/%s/managedfolders/%s/metrics/history" % (self.project_key, self.odb_id),
                 params={'metricLookup' : metric if isinstance(metric, str) or isinstance(metric, unicode) else json.dumps(metric)})
+        if as_arrays:
+            return _metric_history_to_arrays(history)
+        return history
 
 
                 
@@ -468,6 +688,59 @@ class DSSManagedFolder(object):
 
 
 
+_SYNC_MANIFEST_NAME = ".dss-sync-manifest.json"
+_SYNC_CHUNK_SIZE = 1024 * 1024
+
+
+def _join_folder_path(path, rel_path):
+    return "/" + "/".join(p for p in path.strip("/").split("/") + [rel_path] if p)
+
+
+def _list_local_files(folder, manifest_path):
+    """Returns a dict of relative posix path -> (size, modification time in milliseconds, local path)"""
+    files = {}
+    if not os.path.isdir(folder):
+        return files
+    manifest_path = os.path.abspath(manifest_path)
+    for root, _, filenames in os.walk(folder):
+        for filename in filenames:
+            local_path = os.path.join(root, filename)
+            if filename.endswith(".dss-sync-tmp") or os.path.abspath(local_path) == manifest_path:
+                continue
+            stat = os.stat(local_path)
+            rel_posix_path = "/".join(os.path.relpath(local_path, folder).split(os.sep))
+            files[rel_posix_path] = (stat.st_size, int(round(stat.st_mtime * 1000)), local_path)
+    return files
+
+
+def _hash_file(local_path):
+    h = hashlib.sha256()
+    with open(local_path, "rb") as f:
+        while True:
+            block = f.read(_SYNC_CHUNK_SIZE)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def _load_sync_manifest(manifest_path):
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        return json.load(f).get("files", {})
+
+
+def _save_sync_manifest(manifest_path, entries):
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    if not os.path.isdir(manifest_dir):
+        os.makedirs(manifest_dir)
+    tmp_path = manifest_path + ".dss-sync-tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"files": entries}, f)
+    os.replace(tmp_path, manifest_path)
+
+
 class DSSManagedFolderSettings(DSSTaggableObjectSettings):
     """
     Base settings class for a DSS managed folder.
@@ -1,3 +1,4 @@
+from ..utils import _iter_ordered_concurrently
 
 
 class ComputedMetrics(object):
@@ -8,10 +9,13 @@ class ComputedMetrics(object):
         Do not create this class directly, instead use :meth:`.DSSDataset.get_last_metric_values`, 
         :meth:`.DSSSavedModel.get_metric_values`, :meth:`.DSSManagedFolder.get_last_metric_values`.
 
+    The metrics are indexed by id and partition on the first lookup, so looking up many values is fast.
     """
 
     def __init__(self, raw):
         self.raw = raw
+        self._metrics_by_id = None
+        self._data_by_partition = None
 
     def get_raw(self):
         """
@@ -41,12 +45,33 @@ class ComputedMetrics(object):
                  the partition considered, the last values of the metric are given in a sub-list of the dict. 
         :rtype: dict
         """
-        all_ids = []
-        for metric in self.raw["metrics"]:
-            all_ids.append(metric["metric"]["id"])
-            if metric["metric"]["id"] == id:
-                return metric
-        raise Exception("Metric %s not found among: %s" % (id, all_ids))
+        metric = self._get_index().get(id)
+        if metric is None:
+            raise Exception("Metric %s not found among: %s" % (id, self.get_all_ids()))
+        return metric
+
+    def _get_index(self):
+        # built on first lookup, the raw data is not expected to change afterwards
+        if self._metrics_by_id is None:
+            metrics_by_id = {}
+            for metric in self.raw["metrics"]:
+                metrics_by_id.setdefault(metric["metric"]["id"], metric)
+            self._metrics_by_id = metrics_by_id
+            self._data_by_partition = {}
+        return self._metrics_by_id
+
+    def _get_partition_index(self, metric_id):
+        metric = self.get_metric_by_id(metric_id)
+        data_by_partition = self._data_by_partition.get(metric_id)
+        if data_by_partition is None:
+            data_by_partition = {}
+            for partition_data in metric["lastValues"]:
+                data_by_partition.setdefault(partition_data["partition"], partition_data)
+                if partition_data["partition"] in ("NP", "ALL"):
+                    # the first of NP or ALL is the global data
+                    data_by_partition.setdefault(None, partition_data)
+            self._data_by_partition[metric_id] = data_by_partition
+        return data_by_partition
 
     def get_global_data(self, metric_id):
         """
@@ -60,10 +85,10 @@ class ComputedMetrics(object):
         :returns: the metric data, as a dict. The value itself is a **value** string field.
         :rtype: dict        
         """
-        for partition_data in self.get_metric_by_id(metric_id)["lastValues"]:
-            if partition_data["partition"]== "NP" or partition_data["partition"] == "ALL":
-                return partition_data
-        raise Exception("No data found for global partition for metric %s" % metric_id)
+        partition_data = self._get_partition_index(metric_id).get(None)
+        if partition_data is None:
+            raise Exception("No data found for global partition for metric %s" % metric_id)
+        return partition_data
 
     def get_global_value(self, metric_id):
         """
@@ -97,9 +122,9 @@ class ComputedMetrics(object):
         :returns: the metric data, as a dict. The value itself is a **value** string field.
         :rtype: dict        
         """
-        for partition_data in self.get_metric_by_id(metric_id)["lastValues"]:
-            if partition_data["partition"] == partition:
-                return partition_data
+        if partition is None:
+            return None
+        return self._get_partition_index(metric_id).get(partition)
 
     def get_partition_value(self, metric_id, partition):
         """
@@ -133,10 +158,7 @@ class ComputedMetrics(object):
         :returns: list of metric identifiers
         :rtype: list[string]
         """
-        all_ids = []
-        for metric in self.raw["metrics"]:
-            all_ids.append(metric["metric"]["id"])
-        return all_ids
+        return [metric["metric"]["id"] for metric in self.raw["metrics"]]
 
 
     @staticmethod
@@ -159,3 +181,50 @@ class ComputedMetrics(object):
             return float(data["value"])
         else:
             return data["value"]
+
+
+def get_last_metric_values(objects, concurrency=8):
+    """
+    Get the last values of the metrics of many objects, concurrently.
+
+    Usage example:
+
+    .. code-block:: python
+
+        datasets = [project.get_dataset(item.name) for item in project.list_datasets()]
+        for dataset, metrics in zip(datasets, get_last_metric_values(datasets, concurrency=16)):
+            print(dataset.dataset_name, metrics.get_global_value("records:COUNT_RECORDS"))
+
+    :param list objects: the objects, each a :class:`dataikuapi.dss.dataset.DSSDataset`,
+                         :class:`dataikuapi.dss.managedfolder.DSSManagedFolder` or
+                         :class:`dataikuapi.dss.savedmodel.DSSSavedModel`. For datasets, the metrics of the whole dataset
+                         are returned, and for saved models, the metrics of the active version (None if no version is active)
+    :param int concurrency: (optional) the maximum number of objects processed at the same time
+
+    :returns: the metrics of each object, in the order of the objects
+    :rtype: list of :class:`ComputedMetrics`
+    """
+    def get_metrics(obj):
+        if hasattr(obj, "get_last_metric_values"):
+            return obj.get_last_metric_values()
+        version = obj.get_active_version()
+        if version is None:
+            return None
+        return obj.get_metric_values(version["id"])
+
+    return list(_iter_ordered_concurrently(get_metrics, objects, concurrency))
+
+
+def _metric_history_to_arrays(history):
+    """
+    Returns the values of a metric history as a (timestamps as datetime64[ms], values) pair of numpy arrays
+    """
+    import numpy as np
+    points = history.get("values", [])
+    timestamps = np.array([point["time"] for point in points], dtype=np.int64).astype("datetime64[ms]")
+    values = [point["value"] for point in points]
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        values = np.array(values, dtype=np.float64)
+    else:
+        values = np.array(values, dtype=object)
+    return timestamps, values
@@ -11,6 +11,7 @@ from .apiservice import DSSAPIService, DSSAPIServiceListItem
 from .app import DSSAppManifest
 from .codestudio import DSSCodeStudioObject, DSSCodeStudioObjectListItem
 from .continuousactivity import DSSContinuousActivity
+from .data_quality import DSSDataQualityHistoryCollector
 from .dashboard import DSSDashboard, DSSDashboardListItem, DASHBOARDS_URI_FORMAT
 from .dataset import DSSDataset, DSSDatasetListItem, DSSManagedDatasetCreationHelper
 from .discussion import DSSObjectDiscussions
@@ -45,6 +46,7 @@ from .streaming_endpoint import DSSStreamingEndpoint, DSSStreamingEndpointListIt
 from .webapp import DSSWebApp, DSSWebAppListItem
 from .wiki import DSSWiki
 from ..dss_plugin_mlflow import MLflowHandle
+from ..utils import _guess_upload_filename
 
 logger = logging.getLogger(__name__)
 
@@ -1936,10 +1938,12 @@ class DSSProject(object):
                                          "/projects/%s/bundles/imported/actions/importFromArchive" % (self.project_key),
                                          params={"archivePath": osp.abspath(archive_path)})
 
-    def import_bundle_from_stream(self, fp):
+    def import_bundle_from_stream(self, fp, progress_callback=None):
         """
         Imports a bundle from a file stream, on the Automation node.
 
+        The bundle is streamed, it is never fully loaded in memory.
+
         Usage example:
 
         .. code-block:: python
@@ -1949,11 +1953,12 @@ class DSSProject(object):
                 project.import_bundle_from_stream(f)
 
         :param file-like fp: file handler.
+        :param progress_callback: (optional) function called as the bundle is sent, with the number of bytes sent so
+                                  far and the total size of the bundle (None if not known)
         """
-        files = {'file': fp}
-        return self.client._perform_empty("POST",
-                                          "/projects/%s/bundles/imported/actions/importFromStream" % (self.project_key),
-                                          files=files)
+        self.client._perform_json_upload("POST",
+                                         "/projects/%s/bundles/imported/actions/importFromStream" % (self.project_key),
+                                         _guess_upload_filename(fp), fp, progress_callback=progress_callback)
 
     def activate_bundle(self, bundle_id, scenarios_to_enable=None):
         """
@@ -2970,6 +2975,20 @@ class DSSProject(object):
         """
         return self.client._perform_json("GET", "/projects/%s/data-quality/timeline" % self.project_key, params={"minTimestamp": min_timestamp, "maxTimestamp": max_timestamp})
 
+    def get_data_quality_history_collector(self, dataset_names=None, concurrency=8, cursors=None):
+        """
+        Get a helper to collect the history of the data quality rules of many datasets of the project, incrementally
+
+        :param list dataset_names: the names of the datasets to collect, default to all the datasets of the project
+        :param int concurrency: the maximum number of datasets processed at the same time, default to 8
+        :param dict cursors: the cursors of a previous collector, to only collect the results computed since, see
+            :attr:`dataikuapi.dss.data_quality.DSSDataQualityHistoryCollector.cursors`
+
+        :returns: a collector
+        :rtype: :class:`dataikuapi.dss.data_quality.DSSDataQualityHistoryCollector`
+        """
+        return DSSDataQualityHistoryCollector(self.client, self.project_key, dataset_names=dataset_names, concurrency=concurrency, cursors=cursors)
+
     def list_test_scenarios(self):
         """
         Lists all the test scenarios of a DSS Project
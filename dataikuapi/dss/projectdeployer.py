@@ -1,6 +1,7 @@
 from .future import DSSFuture
 from .project_standards import DSSProjectStandardsRunReport
 from .scenario import DSSTestingStatus
+from ..utils import _guess_upload_filename
 
 class DSSProjectDeployer(object):
     """
@@ -211,13 +212,17 @@ class DSSProjectDeployer(object):
         """
         return DSSProjectDeployerProject(self.client, project_key)
 
-    def upload_bundle(self, fp, project_key=None):
+    def upload_bundle(self, fp, project_key=None, progress_callback=None):
         """
         Upload a bundle archive for a project.
 
+        The archive is streamed, it is never fully loaded in memory.
+
         :param file-like fp: a bundle archive (should be a zip)
         :param string project_key: key of the published project where the bundle will be uploaded. If the project does not
                                    exist, it is created. If not set, the key of the bundle's source project is used.
+        :param progress_callback: (optional) function called as the archive is sent, with the number of bytes sent so
+                                  far and the total size of the archive (None if not known)
         """
         if project_key is None:
             params = None
@@ -225,8 +230,9 @@ class DSSProjectDeployer(object):
             params = {
                 "projectKey": project_key,
             }
-        self.client._perform_empty("POST",
-                "/project-deployer/projects/bundles", params=params, files={"file":fp})
+        self.client._perform_json_upload("POST",
+                "/project-deployer/projects/bundles", _guess_upload_filename(fp), fp, params=params,
+                progress_callback=progress_callback)
 
 
 ###############################################
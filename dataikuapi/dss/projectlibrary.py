@@ -1,6 +1,9 @@
-from ..utils import DataikuException
+from ..utils import DataikuException, _iter_ordered_concurrently
+from .managedfolder import _SYNC_MANIFEST_NAME, _list_local_files, _hash_file, _load_sync_manifest, _save_sync_manifest
 import sys
+import os
 import base64
+import hashlib
 
 if sys.version_info >= (3,0):
     import urllib.parse
@@ -15,6 +18,8 @@ class DSSLibrary(object):
     It saves locally a copy of taxonomy to help navigate in the library
     All modifications done through this object and related library items are done locally and on remote.
 
+    The taxonomy is fetched on first use, and the items of each folder are only created when the folder is first accessed.
+
     .. note::
         Taxonomy modifications done outside this library are not reflected locally.
         You should reload the library in this case.
@@ -24,11 +29,20 @@ class DSSLibrary(object):
         """Do not call directly, use :meth:`dataikuapi.dss.project.DSSProject.get_library`"""
         self.client = client
         self.project_key = project_key
-        self.root = self._build_node_("/", None, self.client._perform_json("GET", "/projects/%s/libraries/contents" % (self.project_key)))
+        self._root = None
+
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = self._build_node_("/", None, self._get_contents())
+        return self._root
+
+    def _get_contents(self):
+        return self.client._perform_json("GET", "/projects/%s/libraries/contents" % (self.project_key))
 
     def _build_node_(self, name, parent, children):
         """
-        Helper that builds the tree recursively
+        Helper that builds a node of the tree. The children of a folder are built when first accessed
 
         :param str name: the name of the library item
         :param parent: the parent of the library item
@@ -37,13 +51,150 @@ class DSSLibrary(object):
         :returns: a new node corresponding to an item in the library
         :rtype: :class:`dataikuapi.dss.projectlibrary.DSSLibraryItem`
         """
-        if children is None:
-            return DSSLibraryFile(self.client, self.project_key, name, parent)
+        return DSSLibraryFolder._build_child_(self.client, self.project_key, name, parent, children)
+
+    def pull_to_dir(self, folder, delete=False, max_workers=8):
+        """
+        Copy the files of the library to a local folder.
+
+        The files are downloaded concurrently. A local file is only rewritten if its content differs from the library.
+        A manifest with the hashes of the synchronized files is kept in the local folder, and used by
+        :meth:`push_from_dir` to skip the files which did not change.
+
+        Usage example:
+
+        .. code-block:: python
+
+            library = project.get_library()
+            report = library.pull_to_dir("./lib", delete=True)
+            print("%s files updated, %s unchanged" % (len(report["copied"]), report["unchanged"]))
+
+        :param str folder: the local folder, created if needed
+        :param bool delete: (optional) if True, delete the local files which are not in the library
+        :param int max_workers: (optional) maximum number of files downloaded at the same time
+        :returns: a dict with the list of the "copied" and "deleted" paths, and the number of "unchanged" files
+        :rtype: dict
+        """
+        manifest_path = os.path.join(folder, _SYNC_MANIFEST_NAME)
+        local_files = _list_local_files(folder, manifest_path)
+        remote_paths = self._list_file_paths()
+
+        def download(rel_path):
+            data = self._read_bytes(rel_path)
+            return data, hashlib.sha256(data).hexdigest()
+
+        entries = {}
+        copied = []
+        unchanged = 0
+        for rel_path, (data, digest) in zip(remote_paths, _iter_ordered_concurrently(download, remote_paths, max_workers)):
+            local = local_files.get(rel_path)
+            local_path = os.path.join(folder, *rel_path.split("/"))
+            if local is not None and local[0] == len(data) and _hash_file(local_path) == digest:
+                unchanged += 1
+            else:
+                local_dir = os.path.dirname(local_path)
+                if not os.path.isdir(local_dir):
+                    os.makedirs(local_dir)
+                with open(local_path, "wb") as f:
+                    f.write(data)
+                copied.append(rel_path)
+            stat = os.stat(local_path)
+            entries[rel_path] = {"size": stat.st_size, "mtime": int(round(stat.st_mtime * 1000)), "hash": digest}
+
+        deleted = []
+        if delete:
+            for rel_path in sorted(set(local_files) - set(remote_paths)):
+                os.remove(local_files[rel_path][2])
+                deleted.append(rel_path)
+        _save_sync_manifest(manifest_path, entries)
+        return {"copied": copied, "deleted": deleted, "unchanged": unchanged}
+
+    def push_from_dir(self, folder, delete=False, max_workers=8):
+        """
+        Copy the files of a local folder to the library.
+
+        The files are uploaded concurrently. A file is not uploaded if it is already in the library and its content
+        did not change since the last :meth:`pull_to_dir` or :meth:`push_from_dir` with this local folder, according to
+        the manifest kept in the local folder.
+
+        .. note::
+
+            Files modified in the library since the last synchronization are not detected, and are only overwritten
+            if they changed locally. The local copy of the taxonomy is reloaded on next use.
+
+        :param str folder: the local folder
+        :param bool delete: (optional) if True, delete the library files which are not in the local folder
+        :param int max_workers: (optional) maximum number of files uploaded or deleted at the same time
+        :returns: a dict with the list of the "copied" and "deleted" paths, and the number of "unchanged" files
+        :rtype: dict
+        """
+        manifest_path = os.path.join(folder, _SYNC_MANIFEST_NAME)
+        local_files = _list_local_files(folder, manifest_path)
+        remote_paths = set(self._list_file_paths())
+        entries = _load_sync_manifest(manifest_path)
+
+        new_entries = {}
+        to_upload = []
+        unchanged = 0
+        for rel_path, (size, mtime, local_path) in sorted(local_files.items()):
+            entry = entries.get(rel_path)
+            if entry is not None and (entry.get("size"), entry.get("mtime")) == (size, mtime):
+                digest = entry.get("hash")
+            else:
+                digest = _hash_file(local_path)
+            new_entries[rel_path] = {"size": size, "mtime": mtime, "hash": digest}
+            if rel_path in remote_paths and entry is not None and entry.get("hash") == digest:
+                unchanged += 1
+            else:
+                to_upload.append(rel_path)
+
+        # the uploads not done yet, whose entry must not be saved in the manifest
+        pending = set(to_upload)
 
-        item = DSSLibraryFolder(self.client, self.project_key, name, parent, set())
-        for child in children:
-            item._add_child_(self._build_node_(child["name"], item, child.get("children")))
-        return item
+        def upload(rel_path):
+            # streamed from the file, not read in memory
+            with open(local_files[rel_path][2], "rb") as f:
+                self.client._perform_empty("POST", "/projects/%s/libraries/contents/%s" % (self.project_key, dku_quote_fn(rel_path)), raw_body=f)
+            pending.discard(rel_path)
+
+        def delete_file(rel_path):
+            self.client._perform_empty("DELETE", "/projects/%s/libraries/contents/%s" % (self.project_key, dku_quote_fn(rel_path)))
+            return rel_path
+
+        try:
+            for _ in _iter_ordered_concurrently(upload, to_upload, max_workers):
+                pass
+            deleted = []
+            if delete:
+                deleted = list(_iter_ordered_concurrently(delete_file, sorted(remote_paths - set(local_files)), max_workers))
+        finally:
+            self._root = None
+            # saved even if the push failed part-way, so that the files uploaded are not uploaded again
+            for rel_path in pending:
+                if rel_path in entries:
+                    new_entries[rel_path] = entries[rel_path]
+                else:
+                    del new_entries[rel_path]
+            _save_sync_manifest(manifest_path, new_entries)
+        return {"copied": to_upload, "deleted": deleted, "unchanged": unchanged}
+
+    def _list_file_paths(self):
+        """Returns the relative paths of all the files of the library, from a single listing"""
+        paths = []
+        stack = [("", self._get_contents())]
+        while len(stack) > 0:
+            prefix, children = stack.pop()
+            for child in children:
+                rel_path = prefix + child["name"]
+                if child.get("children") is None:
+                    paths.append(rel_path)
+                else:
+                    stack.append((rel_path + "/", child["children"]))
+        return sorted(paths)
+
+    def _read_bytes(self, rel_path):
+        url = "/projects/%s/libraries/contents/%s" % (self.project_key, dku_quote_fn(rel_path))
+        return base64.b64decode(self.client._perform_json("GET", url, params={"dataEncoding": "base64"})["data"])
 
     def list(self, folder_path="/"):
         """
@@ -173,10 +324,31 @@ class DSSLibraryFolder(DSSLibraryItem):
     .. warning::
             Do not call directly, use :class:`dataikuapi.dss.projectlibrary.DSSLibrary.get_folder`
     """
-    def __init__(self, client, project_key, name, parent, children):
+    def __init__(self, client, project_key, name, parent, children, contents=None):
         """Do not call directly, use :class:`dataikuapi.dss.projectlibrary.DSSLibrary.get_folder`"""
+        # listing of the children not built yet
+        self._contents = contents
         super(DSSLibraryFolder, self).__init__(client, project_key, name, parent, children)
 
+    @property
+    def children(self):
+        if self._contents is not None:
+            contents = self._contents
+            self._contents = None
+            for child in contents:
+                self._children.add(self._build_child_(self.client, self.project_key, child["name"], self, child.get("children")))
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+
+    @staticmethod
+    def _build_child_(client, project_key, name, parent, children):
+        if children is None:
+            return DSSLibraryFile(client, project_key, name, parent)
+        return DSSLibraryFolder(client, project_key, name, parent, set(), contents=children)
+
     def get_child(self, name):
         """
         Retrieve the sub item by its name
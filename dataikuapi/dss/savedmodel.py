@@ -339,13 +339,13 @@ class DSSSavedModel(object):
             archive_filename = _make_zipfile(os.path.join(archive_temp_dir, "tmpmodel.zip"), path)
 
             with open(archive_filename, "rb") as fp:
-                self.client._perform_empty(
+                self.client._perform_json_upload(
                     "POST", "/projects/{project_id}/savedmodels/{saved_model_id}/versions/{version_id}".format(
                         project_id=self.project_key, saved_model_id=self.sm_id, version_id=version_id
                     ),
+                    archive_filename, fp,
                     params={"codeEnvName": code_env_name, "containerExecConfigName": container_exec_config_name,
-                            "setActive": set_active, "binaryClassificationThreshold": binary_classification_threshold},
-                    files={"file": (archive_filename, fp)})
+                            "setActive": set_active, "binaryClassificationThreshold": binary_classification_threshold})
             return self.get_external_model_version_handler(version_id)
 
     def import_mlflow_version_from_managed_folder(
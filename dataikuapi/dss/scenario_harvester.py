@@ -0,0 +1,263 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from ..utils import _iter_ordered_concurrently
+
+
+class DSSScenarioRunHarvester(object):
+    """
+    Incrementally collects the history of scenario runs of a DSS instance into a local folder of Parquet files, for
+    analytics like SLA dashboards.
+
+    Each call to :meth:`harvest` lists the scenarios, fetches their runs, and fetches the details of the new runs, with
+    at most `concurrency` API calls at the same time. For each scenario, the harvester remembers the start time of the
+    latest run collected (its high-watermark), so that only the runs which finished since the previous harvest are
+    fetched. Runs which are still running are collected by a later harvest, once finished.
+
+    The runs and their steps are flattened into two tables, appended to at each harvest: see :meth:`read_runs` and
+    :meth:`read_steps` for their columns.
+
+    .. note::
+
+        This class requires the pyarrow package. Reading the tables as DataFrames also requires pandas
+
+    Usage example:
+
+    .. code-block:: python
+
+        harvester = DSSScenarioRunHarvester(client, "/data/scenario-runs", concurrency=16)
+        report = harvester.harvest()
+        print("Collected %s new runs" % report["runs"])
+        runs = harvester.read_runs()
+        print(runs.groupby(["projectKey", "scenarioId"])["durationSeconds"].quantile(0.95))
+
+    :param client: the client of the DSS instance
+    :type client: :class:`dataikuapi.DSSClient`
+    :param str path: the local folder where the tables and the high-watermarks are stored, created if needed
+    :param int concurrency: (optional) maximum number of API calls at the same time
+    :param int lookback_days: (optional) how far back the history of a scenario is collected the first time, in days
+    :param bool with_steps: (optional) whether to fetch the details of the runs, to collect their steps
+    """
+
+    STATE_FILE = "state.json"
+
+    def __init__(self, client, path, concurrency=8, lookback_days=30, with_steps=True):
+        self.client = client
+        self.path = path
+        self.concurrency = concurrency
+        self.lookback_days = lookback_days
+        self.with_steps = with_steps
+
+    def harvest(self, project_keys=None):
+        """
+        Collect the runs which finished since the previous harvest
+
+        :param list project_keys: (optional) the projects to collect, defaults to all the projects of the instance
+        :returns: a dict with the number of "scenarios" visited, and of "runs" and "steps" collected
+        :rtype: dict
+        """
+        import pyarrow  # fail early if not available
+
+        state = self._load_state()
+        if project_keys is None:
+            project_keys = self.client.list_project_keys()
+
+        def list_scenarios(project_key):
+            return [(project_key, item["id"]) for item in self.client._perform_json("GET", "/projects/%s/scenarios/" % project_key)]
+
+        scenarios = []
+        for project_scenarios in _iter_ordered_concurrently(list_scenarios, project_keys, self.concurrency):
+            scenarios.extend(project_scenarios)
+
+        def get_new_runs(scenario):
+            key = "%s.%s" % scenario
+            return key, self._get_new_runs(scenario[0], scenario[1], state.get(key))
+
+        new_runs = []
+        for key, (runs, scenario_state) in _iter_ordered_concurrently(get_new_runs, scenarios, self.concurrency):
+            new_runs.extend(runs)
+            state[key] = scenario_state
+
+        run_records = []
+        step_records = []
+        if self.with_steps:
+            for run, details in zip(new_runs, _iter_ordered_concurrently(self._get_details, new_runs, self.concurrency)):
+                run_records.append(self._to_run_record(run))
+                step_records.extend(self._to_step_records(run, details.get("stepRuns", [])))
+        else:
+            run_records = [self._to_run_record(run) for run in new_runs]
+
+        # tables first: a failure before the state is saved means the runs are collected again, never lost
+        suffix = "%d-%d" % (int(time.time() * 1000), os.getpid())
+        self._write_table("runs", suffix, run_records, _RUN_COLUMNS)
+        if self.with_steps:
+            self._write_table("steps", suffix, step_records, _STEP_COLUMNS)
+        self._save_state(state)
+        return {"scenarios": len(scenarios), "runs": len(run_records), "steps": len(step_records)}
+
+    def read_runs(self):
+        """
+        Read the collected runs
+
+        :returns: a DataFrame with one row per run, and columns projectKey, scenarioId, runId, start and end (as
+                  epochs in milliseconds), durationSeconds, outcome, triggerType and triggerName
+        :rtype: :class:`pandas.DataFrame`
+        """
+        return self._read_table("runs", _RUN_COLUMNS, ["projectKey", "scenarioId", "runId"])
+
+    def read_steps(self):
+        """
+        Read the steps of the collected runs
+
+        :returns: a DataFrame with one row per step run, and columns projectKey, scenarioId, runId, stepRunId,
+                  stepId, stepName, stepType, start and end (as epochs in milliseconds), durationSeconds, outcome and
+                  jobIds (the ids of the jobs run by the step, comma-separated)
+        :rtype: :class:`pandas.DataFrame`
+        """
+        return self._read_table("steps", _STEP_COLUMNS, ["projectKey", "scenarioId", "runId", "stepRunId"])
+
+    def _get_new_runs(self, project_key, scenario_id, scenario_state):
+        if scenario_state is None:
+            watermark = None
+            recent_runs = {}
+            from_date = datetime.now() - timedelta(days=self.lookback_days)
+        else:
+            watermark = scenario_state["watermark"]
+            recent_runs = scenario_state["recentRuns"]
+            # a day of margin for the difference of timezones with the server
+            from_date = datetime.fromtimestamp(watermark / 1000.0) - timedelta(days=1)
+        to_date = datetime.now() + timedelta(days=2)
+        runs = self.client._perform_json(
+            "GET", "/projects/%s/scenarios/%s/get-runs-by-date" % (project_key, scenario_id), params={
+                'fromDate': from_date.strftime("%Y-%m-%d"),
+                'toDate': to_date.strftime("%Y-%m-%d")
+            })
+
+        new_runs = []
+        earliest_running = None
+        for run in runs:
+            start = run.get("start", 0)
+            if "result" not in run:
+                earliest_running = start if earliest_running is None else min(earliest_running, start)
+            elif (watermark is None or start >= watermark) and run["runId"] not in recent_runs:
+                new_runs.append(run)
+
+        collected = dict(recent_runs)
+        collected.update((run["runId"], run.get("start", 0)) for run in new_runs)
+        starts = list(collected.values()) + ([watermark] if watermark is not None else [])
+        if len(starts) == 0:
+            return new_runs, scenario_state
+        latest = max(starts)
+        if earliest_running is not None:
+            # the watermark does not pass runs still running, so that they are collected once finished
+            latest = min(latest, earliest_running)
+        # the runs at or after the watermark are fetched again by the next harvest, remember which ones are collected
+        recent_runs = dict((run_id, start) for (run_id, start) in collected.items() if start >= latest)
+        return new_runs, {"watermark": latest, "recentRuns": recent_runs}
+
+    def _get_details(self, run):
+        return self.client._perform_json(
+            "GET", "/projects/%s/scenarios/%s/%s/" % (run["scenario"]["projectKey"], run["scenario"]["id"], run["runId"]))
+
+    @staticmethod
+    def _to_run_record(run):
+        trigger = run.get("trigger", {}).get("trigger", {})
+        return {
+            "projectKey": run["scenario"]["projectKey"],
+            "scenarioId": run["scenario"]["id"],
+            "runId": run["runId"],
+            "start": run.get("start"),
+            "end": run.get("end"),
+            "durationSeconds": _get_duration(run),
+            "outcome": run.get("result", {}).get("outcome"),
+            "triggerType": trigger.get("type"),
+            "triggerName": trigger.get("name")
+        }
+
+    @staticmethod
+    def _to_step_records(run, step_runs):
+        records = []
+        for step_run in step_runs:
+            step = step_run.get("step", {})
+            records.append({
+                "projectKey": run["scenario"]["projectKey"],
+                "scenarioId": run["scenario"]["id"],
+                "runId": run["runId"],
+                "stepRunId": step_run.get("runId"),
+                "stepId": step.get("id"),
+                "stepName": step.get("name"),
+                "stepType": step.get("type"),
+                "start": step_run.get("start"),
+                "end": step_run.get("end"),
+                "durationSeconds": _get_duration(step_run),
+                "outcome": step_run.get("result", {}).get("outcome"),
+                "jobIds": ",".join(item["jobId"] for item in step_run.get("additionalReportItems", []) if item.get("type") == "JOB_EXECUTED")
+            })
+        return records
+
+    def _write_table(self, name, suffix, records, columns):
+        if len(records) == 0:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table_dir = os.path.join(self.path, name)
+        if not os.path.isdir(table_dir):
+            os.makedirs(table_dir)
+        schema = _get_arrow_schema(columns)
+        table = pa.Table.from_pylist(records, schema=schema)
+        tmp_path = os.path.join(table_dir, ".part-%s.parquet.tmp" % suffix)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(table_dir, "part-%s.parquet" % suffix))
+
+    def _read_table(self, name, columns, key_columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table_dir = os.path.join(self.path, name)
+        schema = _get_arrow_schema(columns)
+        parts = sorted(f for f in os.listdir(table_dir) if f.endswith(".parquet")) if os.path.isdir(table_dir) else []
+        if len(parts) == 0:
+            return schema.empty_table().to_pandas()
+        table = pa.concat_tables([pq.read_table(os.path.join(table_dir, part), schema=schema) for part in parts])
+        # a harvest interrupted after writing its tables collects its runs again
+        return table.to_pandas().drop_duplicates(subset=key_columns, keep="last").reset_index(drop=True)
+
+    def _load_state(self):
+        state_path = os.path.join(self.path, self.STATE_FILE)
+        if not os.path.isfile(state_path):
+            return {}
+        with open(state_path, "r") as f:
+            return json.load(f).get("scenarios", {})
+
+    def _save_state(self, state):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        state_path = os.path.join(self.path, self.STATE_FILE)
+        with open(state_path + ".tmp", "w") as f:
+            json.dump({"scenarios": state}, f)
+        os.replace(state_path + ".tmp", state_path)
+
+
+def _get_duration(run):
+    start = run.get("start", 0)
+    end = run.get("end", 0)
+    if start and end and end > 0:
+        return (end - start) / 1000.0
+    return None
+
+
+def _get_arrow_schema(columns):
+    import pyarrow as pa
+    return pa.schema([(column, getattr(pa, type_name)()) for (column, type_name) in columns])
+
+
+_RUN_COLUMNS = [
+    ("projectKey", "string"), ("scenarioId", "string"), ("runId", "string"), ("start", "int64"), ("end", "int64"),
+    ("durationSeconds", "float64"), ("outcome", "string"), ("triggerType", "string"), ("triggerName", "string")
+]
+_STEP_COLUMNS = [
+    ("projectKey", "string"), ("scenarioId", "string"), ("runId", "string"), ("stepRunId", "string"),
+    ("stepId", "string"), ("stepName", "string"), ("stepType", "string"), ("start", "int64"), ("end", "int64"),
+    ("durationSeconds", "float64"), ("outcome", "string"), ("jobIds", "string")
+]
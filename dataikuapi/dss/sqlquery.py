@@ -72,10 +72,12 @@ class DSSSQLQuery(object):
         """
         return self.streaming_session['schema']
 
-    def iter_rows(self):
+    def iter_rows(self, raw_strings=False):
         """
         Get an iterator on the query's results.
-        
+
+        :param bool raw_strings: (optional) if True, the values are returned as strings, without being cast to
+                                 python types. Defaults to False
         :return: an iterator over the rows, each row being a tuple of values. The order of values
                  in the tuples is the same as the order of columns in the schema returned by :meth:`~get_schema()`.
                  The values are cast to python types according to the types in :meth:`~get_schema()`
@@ -87,7 +89,7 @@ class DSSSQLQuery(object):
                     "format" : "tsv-excel-noheader"
                 })
 
-        return DataikuStreamedHttpUTF8CSVReader(self.get_schema(), csv_stream).iter_rows()
+        return DataikuStreamedHttpUTF8CSVReader(self.get_schema(), csv_stream, raw_strings=raw_strings).iter_rows()
 
     def verify(self):
         """
@@ -0,0 +1,284 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, as_completed as _futures_as_completed
+
+from ..utils import DataikuException, _ExponentialBackoff, _is_transient_error
+from .future import DSSFuture
+from .job import DSSJob
+from .ml import DSSMLTask
+from .scenario import DSSScenarioRun
+
+logger = logging.getLogger(__name__)
+
+
+class _FutureTask(object):
+    def __init__(self, future):
+        self.item = future
+        self.client = future.client
+
+    def can_bulk_poll(self):
+        return True
+
+    def poll(self):
+        self.item.get_state()
+        return self.item.state.get('hasResult', False)
+
+    def get_result(self):
+        return self.item.result_wrapper(self.item.state.get('result', None))
+
+
+class _JobTask(object):
+    def __init__(self, job, no_fail):
+        self.item = job
+        self.client = job.client
+        self.no_fail = no_fail
+        self.state = None
+
+    def can_bulk_poll(self):
+        return False
+
+    def poll(self):
+        self.state = self.item.get_status().get("baseStatus", {}).get("state", "")
+        return self.state in ["DONE", "ABORTED", "FAILED"]
+
+    def get_result(self):
+        if self.no_fail or self.state == "DONE":
+            return self.state
+        raise DataikuException("Job run did not finish. Status: %s" % (self.state))
+
+
+class _ScenarioRunTask(object):
+    def __init__(self, scenario_run, no_fail):
+        self.item = scenario_run
+        self.client = scenario_run.client
+        self.no_fail = no_fail
+
+    def can_bulk_poll(self):
+        return False
+
+    def poll(self):
+        if self.item.running:
+            self.item.refresh()
+        return not self.item.running
+
+    def get_result(self):
+        if self.item.outcome != 'SUCCESS' and not self.no_fail:
+            raise DataikuException("Scenario run returned status %s" % self.item.outcome)
+        return self.item
+
+
+class _MLTaskTrainTask(object):
+    def __init__(self, mltask):
+        self.item = mltask
+        self.client = mltask.client
+        self.status = None
+
+    def can_bulk_poll(self):
+        return False
+
+    def poll(self):
+        self.status = self.item.get_status()
+        return self.status.get("training", "???") == False
+
+    def get_result(self):
+        return self.status
+
+
+class DSSFutureWaiter(object):
+    """
+    Helper to wait for many long-running tasks at once, from a single polling thread.
+
+    The waiter accepts :class:`dataikuapi.dss.future.DSSFuture`, :class:`dataikuapi.dss.job.DSSJob`,
+    :class:`dataikuapi.dss.scenario.DSSScenarioRun` and :class:`dataikuapi.dss.ml.DSSMLTask` (waiting for its training
+    to complete). Each task is polled with its own exponential backoff, like the `wait` methods of these classes do.
+    Running DSS futures are checked in bulk with one call to the list of futures of their client, so that only the
+    futures which are done are polled individually.
+
+    Each submitted task gets a :class:`concurrent.futures.Future`, which can be waited for, combined with the functions
+    of the :mod:`concurrent.futures` module, or given completion callbacks.
+
+    Usage example:
+
+    .. code-block:: python
+
+        waiter = DSSFutureWaiter()
+        futures = [waiter.submit(folder.compute_metrics()) for folder in folders]
+        futures[0].add_done_callback(lambda f: print("first folder done"))
+        for f in concurrent.futures.as_completed(futures):
+            print(f.result())
+
+    :param int initial_poll_ms: (optional) delay before the first poll of a task, in milliseconds
+    :param int max_poll_ms: (optional) maximum delay between two polls of a task, in milliseconds
+    :param float poll_factor: (optional) growth factor of the delay between two polls of a task
+    :param int max_poll_retries: (optional) number of consecutive polls of a task failing with a transient error
+                                 (connection error, timeout, HTTP 429 or 5xx) retried before the future of the task fails
+    """
+
+    def __init__(self, initial_poll_ms=200, max_poll_ms=15000, poll_factor=1.1, max_poll_retries=5):
+        self.initial_poll_ms = initial_poll_ms
+        self.max_poll_ms = max_poll_ms
+        self.poll_factor = poll_factor
+        self.max_poll_retries = max_poll_retries
+        self._condition = threading.Condition()
+        self._schedule = []
+        self._counter = itertools.count()
+        self._thread = None
+
+    def submit(self, item, no_fail=False):
+        """
+        Start waiting for a long-running task
+
+        :param item: the task to wait for
+        :type item: :class:`dataikuapi.dss.future.DSSFuture`, :class:`dataikuapi.dss.job.DSSJob`,
+                    :class:`dataikuapi.dss.scenario.DSSScenarioRun` or :class:`dataikuapi.dss.ml.DSSMLTask`
+        :param bool no_fail: (optional) if True, do not fail if the job or the run does not end successfully. Only
+                             applies to jobs and scenario runs, ignored for the other tasks
+        :returns: a future completed with the same value as the wait method of the task: the result of a DSS future,
+                  the final state of a job, the finished scenario run, or the final status of a ML task. Cancelling
+                  the future stops waiting for the task, but does not abort the task itself
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        if isinstance(item, DSSFuture):
+            task = _FutureTask(item)
+        elif isinstance(item, DSSJob):
+            task = _JobTask(item, no_fail)
+        elif isinstance(item, DSSScenarioRun):
+            task = _ScenarioRunTask(item, no_fail)
+        elif isinstance(item, DSSMLTask):
+            task = _MLTaskTrainTask(item)
+        else:
+            raise ValueError("Cannot wait for an object of type %s" % type(item).__name__)
+        # the future stays pending until the task completes, so that it can be cancelled
+        result = Future()
+        task.future = result
+        task.backoff = _ExponentialBackoff(self.initial_poll_ms, self.max_poll_ms, self.poll_factor)
+        task.poll_errors = 0
+
+        if isinstance(item, DSSFuture) and item.state is not None and item.state.get('hasResult', False):
+            # no future created in backend, result already in the state
+            self._complete(task)
+            return result
+
+        with self._condition:
+            # first poll right away, as the sync wait methods do
+            self._push(task, time.time())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dss-future-waiter")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return result
+
+    def _push(self, task, due):
+        heapq.heappush(self._schedule, (due, next(self._counter), task))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if len(self._schedule) == 0:
+                        # nothing left to wait for, the thread is restarted by the next submit
+                        self._thread = None
+                        return
+                    delay = self._schedule[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                now = time.time()
+                due_tasks = []
+                while len(self._schedule) > 0 and self._schedule[0][0] <= now:
+                    due_tasks.append(heapq.heappop(self._schedule)[2])
+
+            running_job_ids = self._list_running_futures(due_tasks)
+            for task in due_tasks:
+                if task.future.cancelled():
+                    continue
+                try:
+                    if task.can_bulk_poll() and task.item.job_id in running_job_ids.get(id(task.client), ()):
+                        done = False
+                    else:
+                        done = task.poll()
+                except Exception as e:
+                    task.poll_errors += 1
+                    if _is_transient_error(e) and task.poll_errors <= self.max_poll_retries:
+                        logger.warning("Polling of a %s failed, retrying (%s/%s): %s" % (type(task.item).__name__, task.poll_errors, self.max_poll_retries, e))
+                        with self._condition:
+                            self._push(task, time.time() + float(task.backoff.next_sleep_time()) / 1000.0)
+                    elif task.future.set_running_or_notify_cancel():
+                        task.future.set_exception(e)
+                    continue
+                task.poll_errors = 0
+                if done:
+                    self._complete(task)
+                else:
+                    with self._condition:
+                        self._push(task, time.time() + float(task.backoff.next_sleep_time()) / 1000.0)
+
+    @staticmethod
+    def _list_running_futures(tasks):
+        clients = {}
+        for task in tasks:
+            if task.can_bulk_poll():
+                clients[id(task.client)] = task.client
+        running = {}
+        for client_id, client in clients.items():
+            try:
+                states = client.list_futures()
+            except Exception:
+                # fall back to polling the futures one by one
+                continue
+            running[client_id] = set(state.get('jobId') for state in states if not state.get('hasResult', False))
+        return running
+
+    @staticmethod
+    def _complete(task):
+        if not task.future.set_running_or_notify_cancel():
+            # cancelled by the caller
+            return
+        try:
+            task.future.set_result(task.get_result())
+        except Exception as e:
+            task.future.set_exception(e)
+
+
+def wait_all(items, no_fail=False, timeout=None):
+    """
+    Wait for many long-running tasks, from a single polling thread.
+
+    See :class:`DSSFutureWaiter` for the kinds of tasks that can be waited for.
+
+    :param list items: the tasks to wait for
+    :param bool no_fail: (optional) for jobs and scenario runs, if True, do not fail if the job or the run does not end
+                         successfully
+    :param float timeout: (optional) maximum time to wait, in seconds
+    :returns: the results of the tasks, in the same order as the tasks
+    :rtype: list
+    :raises: the error of the first failed task, in the order of the tasks
+    """
+    waiter = DSSFutureWaiter()
+    futures = [waiter.submit(item, no_fail=no_fail) for item in items]
+    deadline = None if timeout is None else time.time() + timeout
+    return [f.result(None if deadline is None else max(0, deadline - time.time())) for f in futures]
+
+
+def as_completed(items, no_fail=False, timeout=None):
+    """
+    Wait for many long-running tasks, from a single polling thread, and iterate over them as they complete.
+
+    See :class:`DSSFutureWaiter` for the kinds of tasks that can be waited for.
+
+    :param list items: the tasks to wait for
+    :param bool no_fail: (optional) for jobs and scenario runs, if True, do not fail if the job or the run does not end
+                         successfully
+    :param float timeout: (optional) maximum time to wait, in seconds
+    :returns: an iterator over (task, :class:`concurrent.futures.Future`) pairs, in order of completion
+    """
+    waiter = DSSFutureWaiter()
+    futures = {}
+    for item in items:
+        futures[waiter.submit(item, no_fail=no_fail)] = item
+    for f in _futures_as_completed(futures, timeout=timeout):
+        yield futures[f], f
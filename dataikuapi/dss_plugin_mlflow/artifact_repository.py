@@ -174,8 +174,8 @@ class PluginDSSManagedFolderArtifactRepository:
         full_path = self.base_artifact_path / artifact_path
         with self.managed_folder.get_file(str(full_path)) as remote_file:
             with open(local_path, "wb") as local_file:
-                for line in remote_file:
-                    local_file.write(line)
+                for chunk in remote_file.iter_content(chunk_size=1024 * 1024):
+                    local_file.write(chunk)
 
     def delete_artifacts(self, artifact_path=None):
         """
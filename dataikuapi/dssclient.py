@@ -1,5 +1,6 @@
 import json, warnings
 import sys
+from contextlib import contextmanager
 
 if sys.version_info >= (3,0):
     import urllib.parse
@@ -34,14 +35,16 @@ from .dss.unifiedmonitoring import DSSUnifiedMonitoring
 from .dss.utils import DSSInfoMessages, Enum
 from .dss.workspace import DSSWorkspace
 import os.path as osp
-from .utils import dku_basestring_type, handle_http_exception
+from .utils import dku_basestring_type, handle_http_exception, _StreamingMultipartBody, _guess_upload_filename
+from .transport import TransportPolicy
+from .cache import MetadataCache
 from .govern_client import GovernClient
 
 
 class DSSClient(object):
     """Entry point for the DSS API client"""
 
-    def __init__(self, host, api_key=None, internal_ticket=None, extra_headers=None, no_check_certificate=False, client_certificate=None, **kwargs):
+    def __init__(self, host, api_key=None, internal_ticket=None, extra_headers=None, no_check_certificate=False, client_certificate=None, transport_policy=None, **kwargs):
         """Initialize a new DSS API client.
 
         Args:
@@ -52,6 +55,8 @@ class DSSClient(object):
             no_check_certificate (bool, optional): If True, disables SSL certificate verification. 
                 Defaults to False.
             client_certificate (str or tuple, optional): Path to client certificate file or tuple of (cert, key) paths.
+            transport_policy (:class:`dataikuapi.transport.TransportPolicy`, optional): Timeouts, connection pool
+                and retries of the HTTP requests. Defaults to no timeout and no retry.
             **kwargs: Additional keyword arguments. Note: 'insecure_tls' is deprecated in favor of no_check_certificate.
 
         Note:
@@ -72,7 +77,9 @@ class DSSClient(object):
             self._session.verify = False
         if client_certificate:
             self._session.cert = client_certificate
-            
+        self._transport_policy = transport_policy if transport_policy is not None else TransportPolicy()
+        self._transport_policy.mount(self._session)
+
         if self.api_key is not None:
             self._session.auth = HTTPBasicAuth(self.api_key, "")
         elif self.internal_ticket is not None:
@@ -83,6 +90,57 @@ class DSSClient(object):
         if extra_headers is not None:
             self._session.headers.update(extra_headers)
 
+        self._metadata_cache = None
+
+    ########################################################
+    # Metadata cache
+    ########################################################
+
+    def enable_metadata_cache(self, cache=None):
+        """
+        Cache the metadata read by this client, like settings, schemas and lists of objects.
+
+        See :class:`dataikuapi.cache.MetadataCache` for what is cached and when cached responses are invalidated.
+
+        :param cache: (optional) the cache to use, can be shared between clients of the same DSS instance and user.
+                      Defaults to a new cache with the default rules
+        :type cache: :class:`dataikuapi.cache.MetadataCache`
+        :returns: the cache used
+        :rtype: :class:`dataikuapi.cache.MetadataCache`
+        """
+        if cache is None:
+            cache = MetadataCache()
+        self._metadata_cache = cache
+        return cache
+
+    def disable_metadata_cache(self):
+        """
+        Stop caching the metadata read by this client
+        """
+        self._metadata_cache = None
+
+    @contextmanager
+    def metadata_caching(self, cache=None):
+        """
+        Cache the metadata read by this client within a `with` block. See :meth:`enable_metadata_cache`
+
+        .. code-block:: python
+
+            with client.metadata_caching() as cache:
+                run_governance_checks(client)
+                print(cache.get_stats())
+
+        :param cache: (optional) the cache to use. Defaults to a new cache with the default rules
+        :type cache: :class:`dataikuapi.cache.MetadataCache`
+        :returns: a context manager yielding the :class:`dataikuapi.cache.MetadataCache` used. The previous cache of the
+                  client, if any, is restored when the block exits
+        """
+        previous = self._metadata_cache
+        try:
+            yield self.enable_metadata_cache(cache)
+        finally:
+            self._metadata_cache = previous
+
     ########################################################
     # Futures
     ########################################################
@@ -1521,21 +1579,24 @@ class DSSClient(object):
         params = {}
         if project_folder is not None:
             params['projectFolderId'] = project_folder.project_folder_id
-        files = {'file': fp }
-        return self._perform_json("POST",
-                "/projectsFromBundle/", files=files, params=params)
+        return self._perform_json_upload("POST",
+                "/projectsFromBundle/", _guess_upload_filename(fp), fp, params=params).json()
 
-    def prepare_project_import(self, f):
+    def prepare_project_import(self, f, progress_callback=None):
         """
         Prepares import of a project archive.
         Warning: this method can only be used on a design node.
 
+        The archive is streamed, it is never fully loaded in memory.
+
         :param file-like fp: the input stream, as a file-like object
+        :param progress_callback: (optional) function called as the archive is sent, with the number of bytes sent so
+                                  far and the total size of the archive (None if not known)
         :returns: a :class:`TemporaryImportHandle` to interact with the prepared import
         """
         val = self._perform_json_upload(
                 "POST", "/projects/import/upload",
-                "tmp-import.zip", f)
+                "tmp-import.zip", f, progress_callback=progress_callback)
         return TemporaryImportHandle(self, val.json()["id"])
 
     ########################################################
@@ -1783,7 +1844,7 @@ class DSSClient(object):
         if resp.get('enabled', False) is False or resp.get('nodeUrl', None) is None or resp.get('apiKey', None) is None:
             return None
         else:
-            return GovernClient(resp['nodeUrl'], resp['apiKey'], no_check_certificate=resp.get('trustAllSSLCertificates', False))
+            return GovernClient(resp['nodeUrl'], resp['apiKey'], no_check_certificate=resp.get('trustAllSSLCertificates', False), transport_policy=self._transport_policy)
 
     def govern_dss_sync(self, project_key=None):
         """
@@ -1823,7 +1884,7 @@ class DSSClient(object):
     # Internal Request handling
     ########################################################
 
-    def _perform_http(self, method, path, params=None, body=None, stream=False, files=None, raw_body=None, headers=None):
+    def _perform_http(self, method, path, params=None, body=None, stream=False, files=None, raw_body=None, headers=None, timeout=None):
         if body is not None:
             body = json.dumps(body)
         if raw_body is not None:
@@ -1831,33 +1892,57 @@ class DSSClient(object):
 
         #logging.info("Request with headers=%s" % headers)
 
-        http_res = self._session.request(
-                method, "%s/dip/publicapi%s" % (self.host, path),
+        cache = self._metadata_cache
+        if cache is not None and method.upper() not in ("GET", "HEAD", "OPTIONS"):
+            cache.invalidate(path)
+
+        http_res = self._transport_policy.request(
+                self._session, method, "%s/dip/publicapi%s" % (self.host, path),
                 params=params, data=body,
                 files=files,
                 stream=stream,
                 headers=headers,
-                verify=self._session.verify)
+                verify=self._session.verify,
+                timeout=timeout)
         handle_http_exception(http_res)
         return http_res
 
-    def _perform_empty(self, method, path, params=None, body=None, files = None, raw_body=None, headers=None):
-        self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers)
-
-    def _perform_text(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None):
-        return self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers).text
-
-    def _perform_json(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None):
-        return self._perform_http(method, path,  params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers).json()
-
-    def _perform_raw(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None):
-        return self._perform_http(method, path, params=params, body=body, files=files, stream=True, raw_body=raw_body, headers=headers)
-
-    def _perform_json_upload(self, method, path, name, f):
-        http_res = self._session.request(
-            method, "%s/dip/publicapi%s" % (self.host, path),
-            files = {'file': (name, f, {'Expires': '0'})},
-            verify=self._session.verify)
+    def _perform_empty(self, method, path, params=None, body=None, files = None, raw_body=None, headers=None, timeout=None):
+        self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers, timeout=timeout)
+
+    def _perform_text(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None, timeout=None):
+        return self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers, timeout=timeout).text
+
+    def _perform_json(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None, timeout=None):
+        cache = self._metadata_cache
+        if cache is not None and method.upper() == "GET" and body is None and raw_body is None:
+            ttl = cache.get_ttl(path)
+            if ttl > 0:
+                key = cache._get_key(path, params)
+                cached = cache._get(key)
+                if cached is not None:
+                    return cached
+                generation = cache._generation
+                http_res = self._perform_http(method, path, params=params, stream=False, headers=headers, timeout=timeout)
+                cache._put(key, ttl, http_res.text, generation)
+                return http_res.json()
+        return self._perform_http(method, path,  params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers, timeout=timeout).json()
+
+    def _perform_raw(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None, timeout=None):
+        return self._perform_http(method, path, params=params, body=body, files=files, stream=True, raw_body=raw_body, headers=headers, timeout=timeout)
+
+    def _perform_json_upload(self, method, path, name, f, params=None, timeout=None, progress_callback=None):
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(path)
+        # the multipart body is streamed from f, never fully loaded in memory
+        body = _StreamingMultipartBody(name, f, progress_callback=progress_callback)
+        http_res = self._transport_policy.request(
+            self._session, method, "%s/dip/publicapi%s" % (self.host, path),
+            params=params,
+            data=body,
+            headers={"Content-Type": body.content_type},
+            verify=self._session.verify,
+            timeout=timeout)
 
         handle_http_exception(http_res)
         return http_res
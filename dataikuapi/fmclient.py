@@ -6,6 +6,7 @@ import os.path as osp
 import warnings
 
 from .utils import handle_http_exception
+from .transport import TransportPolicy
 
 from .iam.settings import FMSSOSettings, FMLDAPSettings, FMAzureADSettings
 
@@ -71,6 +72,7 @@ class FMClient(object):
         extra_headers=None,
         no_check_certificate=False,
         client_certificate=None,
+        transport_policy=None,
         **kwargs
     ):
         """Initialize a new FM (Fleet Management) API client.
@@ -88,6 +90,8 @@ class FMClient(object):
                 Defaults to False.
             client_certificate (str or tuple, optional): Path to client certificate file or tuple of 
                 (cert, key) paths for client certificate authentication
+            transport_policy (:class:`dataikuapi.transport.TransportPolicy`, optional): Timeouts, connection pool
+                and retries of the HTTP requests. Defaults to no timeout and no retry.
             **kwargs: Additional keyword arguments
 
         Note:
@@ -114,6 +118,8 @@ class FMClient(object):
             self._session.verify = False
         if client_certificate:
             self._session.cert = client_certificate
+        self._transport_policy = transport_policy if transport_policy is not None else TransportPolicy()
+        self._transport_policy.mount(self._session)
 
         if self.api_key_id is not None and self.api_key_secret is not None:
             self._session.auth = HTTPBasicAuth(self.api_key_id, self.api_key_secret)
@@ -376,6 +382,7 @@ class FMClient(object):
         stream=False,
         files=None,
         raw_body=None,
+        timeout=None,
     ):
         if body is not None:
             body = json.dumps(body)
@@ -383,14 +390,16 @@ class FMClient(object):
             body = raw_body
 
 
-        http_res = self._session.request(
+        http_res = self._transport_policy.request(
+                self._session,
                 method,
                 "%s/api/public%s" % (self.host, path),
                 params=params,
                 data=body,
                 files=files,
                 stream=stream,
-                verify=self._session.verify
+                verify=self._session.verify,
+                timeout=timeout
             )
         handle_http_exception(http_res)
         return http_res
@@ -472,7 +481,8 @@ class FMClientAWS(FMClient):
 
         self.cloud = "AWS"
         super(FMClientAWS, self).__init__(
-            host, api_key_id, api_key_secret, tenant_id, extra_headers, no_check_certificate=no_check_certificate
+            host, api_key_id, api_key_secret, tenant_id, extra_headers, no_check_certificate=no_check_certificate,
+            transport_policy=kwargs.get("transport_policy")
         )
 
     def new_cloud_account_creator(self, label):
@@ -554,7 +564,8 @@ class FMClientAzure(FMClient):
 
         self.cloud = "Azure"
         super(FMClientAzure, self).__init__(
-            host, api_key_id, api_key_secret, tenant_id, extra_headers, no_check_certificate=no_check_certificate
+            host, api_key_id, api_key_secret, tenant_id, extra_headers, no_check_certificate=no_check_certificate,
+            transport_policy=kwargs.get("transport_policy")
         )
 
     def new_cloud_account_creator(self, label):
@@ -635,7 +646,8 @@ class FMClientGCP(FMClient):
         
         self.cloud = "GCP"
         super(FMClientGCP, self).__init__(
-            host, api_key_id, api_key_secret, tenant_id, extra_headers, no_check_certificate=no_check_certificate
+            host, api_key_id, api_key_secret, tenant_id, extra_headers, no_check_certificate=no_check_certificate,
+            transport_policy=kwargs.get("transport_policy")
         )
 
     def new_cloud_account_creator(self, label):
@@ -1,5 +1,10 @@
 from dataikuapi.govern.artifact import GovernArtifact
-import copy
+from dataikuapi.utils import _iter_ordered_concurrently
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 class GovernArtifactSearchRequest(object):
     """
@@ -21,21 +26,102 @@ class GovernArtifactSearchRequest(object):
         :return: The response of a single fetch of the search request
         :rtype: a :class:`~dataikuapi.govern.artifact_search.GovernArtifactSearchResponse`
         """
-        body = copy.deepcopy(self.search_query)
-        body["artifactSearchPagination"] = {
-            "pageSize": page_size,
-            "lastArtifactId": self.last_artifact_id
-        }
-
-        response = self.client._perform_json("POST", "/artifacts/search", body=body)
-
+        response = self._fetch_page(page_size, self.last_artifact_id)
         artifact_list = response.get("uiArtifacts", [])
         # update local last_artifact_id for next requests
         if artifact_list:
             self.last_artifact_id = artifact_list[-1]["artifact"]["id"]
-
         return GovernArtifactSearchResponse(self.client, response)
 
+    def iter_hits(self, page_size=100, prefetch=2, with_definitions=False, concurrency=8):
+        """
+        Run the search request and iterate over all its remaining hits, fetching the pages of results as needed.
+
+        The next pages are fetched in a background thread while the current one is consumed, so that the caller does
+        not wait for each page. Like :meth:`fetch_next_batch`, the iteration continues from the last hit fetched, and if
+        it is stopped early, the next fetch continues from the last hit given to the caller.
+
+        .. code-block:: python
+
+            request = client.new_artifact_search_request(GovernArtifactSearchQuery())
+            for hit, definition in request.iter_hits(page_size=500, with_definitions=True):
+                print(hit.get_raw()["artifact"]["id"], definition.get_blueprint_version())
+
+        :param int page_size: (Optional) size of the result pages, default value is set to 100.
+        :param int prefetch: (Optional) maximum number of pages fetched ahead of the consumer, default value is set to 2.
+        :param bool with_definitions: (Optional) if True, also get the definition of the artifact of each hit, with
+            at most `concurrency` calls at the same time, default value is set to False.
+        :param int concurrency: (Optional) maximum number of definitions fetched at the same time, default value is set to 8.
+        :return: an iterator over the hits, or over (hit, definition) pairs if `with_definitions` is True
+        :rtype: iterator of :class:`~dataikuapi.govern.artifact_search.GovernArtifactSearchResponseHit`, or of
+            (:class:`~dataikuapi.govern.artifact_search.GovernArtifactSearchResponseHit`,
+            :class:`~dataikuapi.govern.artifact.GovernArtifactDefinition`) tuples
+        """
+        for hits in self._iter_prefetched_pages(page_size, prefetch):
+            if with_definitions:
+                definitions = _iter_ordered_concurrently(lambda hit: hit.to_artifact().get_definition(), hits, concurrency)
+                for hit, definition in zip(hits, definitions):
+                    # the cursor only moves past the hits given to the caller
+                    self.last_artifact_id = hit.hit["artifact"]["id"]
+                    yield hit, definition
+            else:
+                for hit in hits:
+                    self.last_artifact_id = hit.hit["artifact"]["id"]
+                    yield hit
+
+    def _iter_prefetched_pages(self, page_size, prefetch):
+        pages = queue.Queue(maxsize=max(1, prefetch))
+        stopped = threading.Event()
+
+        def put(item):
+            # give up if the consumer stopped iterating
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch_pages():
+            # paginate with a local cursor, the cursor of the request is moved by the consumer
+            last_artifact_id = self.last_artifact_id
+            try:
+                while True:
+                    artifact_list = self._fetch_page(page_size, last_artifact_id).get("uiArtifacts", [])
+                    if not artifact_list:
+                        put(None)
+                        return
+                    last_artifact_id = artifact_list[-1]["artifact"]["id"]
+                    if not put([GovernArtifactSearchResponseHit(self.client, hit) for hit in artifact_list]):
+                        return
+            except Exception as e:
+                put(e)
+
+        thread = threading.Thread(target=fetch_pages, name="govern-artifact-search")
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is None:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            stopped.set()
+            thread.join()
+
+    def _fetch_page(self, page_size, last_artifact_id):
+        # only the pagination changes between pages, the rest of the query is shared
+        body = dict(self.search_query)
+        body["artifactSearchPagination"] = {
+            "pageSize": page_size,
+            "lastArtifactId": last_artifact_id
+        }
+        return self.client._perform_json("POST", "/artifacts/search", body=body)
+
 class GovernArtifactSearchResponse(object):
     """
     A search request response for a single batch.
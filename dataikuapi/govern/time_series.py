@@ -1,3 +1,9 @@
+import gzip
+import json
+
+from dataikuapi.utils import _iter_ordered_concurrently
+
+
 class GovernTimeSeries(object):
     """
     A handle to interact with a time series.
@@ -30,6 +36,52 @@ class GovernTimeSeries(object):
             "GET", "/time-series/%s" % self.time_series_id, params=params)
         return datapoints
 
+    def iter_values(self, min_timestamp, max_timestamp, window_ms=24 * 3600 * 1000, concurrency=4, as_arrays=False):
+        """
+        Iterate over the values of the time series within a time window, by sub-windows of `window_ms` milliseconds.
+
+        The sub-windows are fetched with at most `concurrency` calls at the same time, and returned in chronological
+        order. Only a few sub-windows are held in memory at any time.
+
+        .. code-block:: python
+
+            total = 0.0
+            for timestamps, values in time_series.iter_values(start, end, window_ms=3600 * 1000, as_arrays=True):
+                total += values.sum()
+
+        :param int min_timestamp: The minimum timestamp of the time window as an epoch in milliseconds
+        :param int max_timestamp: The maximum timestamp of the time window as an epoch in milliseconds
+        :param int window_ms: (Optional) The duration of the sub-windows, in milliseconds. Default value is one day.
+        :param int concurrency: (Optional) The maximum number of sub-windows fetched at the same time. Default value is 4.
+        :param boolean as_arrays: (Optional) If True, yield each sub-window as a tuple of two NumPy arrays: the timestamps
+            (as datetime64[ms]) and the values. Requires numpy. Default value is False.
+        :return: an iterator over the sub-windows, each one a list of data points as Python dict, or a tuple of arrays
+        """
+        assert window_ms > 0, "window_ms should be a positive number of milliseconds"
+        windows = []
+        start = min_timestamp
+        while start <= max_timestamp:
+            # bounds are inclusive
+            end = min(start + window_ms - 1, max_timestamp)
+            windows.append((start, end))
+            start = end + 1
+
+        def fetch(window):
+            datapoints = self.get_values(window[0], window[1])
+            if as_arrays:
+                return self._to_arrays(datapoints)
+            return datapoints
+
+        for result in _iter_ordered_concurrently(fetch, windows, concurrency):
+            yield result
+
+    @staticmethod
+    def _to_arrays(datapoints):
+        import numpy as np
+        timestamps = np.fromiter((datapoint["timestamp"] for datapoint in datapoints), dtype=np.int64, count=len(datapoints))
+        values = np.asarray([datapoint.get("value") for datapoint in datapoints])
+        return timestamps.astype("datetime64[ms]"), values
+
     def push_values(self, datapoints, upsert=True):
         """
         Push a list of values inside the time series.
@@ -39,12 +91,57 @@ class GovernTimeSeries(object):
         :return: None
         """
 
-        for datapoint in datapoints:
-            datapoint['timeSeriesId'] = self.time_series_id
+        datapoints = [dict(datapoint, timeSeriesId=self.time_series_id) for datapoint in datapoints]
 
         self.client._perform_json("PUT", "/time-series/%s" %
                                   self.time_series_id, body=datapoints, params={"upsert": upsert})
 
+    def push_values_in_chunks(self, datapoints, upsert=True, max_chunk_size=10000, max_chunk_bytes=4 * 1024 * 1024,
+                              concurrency=4, compress=False):
+        """
+        Push a large number of values inside the time series, in several calls.
+
+        The datapoints are split in chunks of at most `max_chunk_size` datapoints and `max_chunk_bytes` bytes of JSON,
+        and the chunks are pushed with at most `concurrency` calls at the same time. The datapoints can be given as any
+        iterable, for example a generator: they are consumed as the chunks are sent, and the datapoints are not modified.
+
+        :param datapoints: an iterable of Python dict - The datapoints as Python dict containing the keys "timestamp" (an epoch in milliseconds) and "value" (an object)
+        :param boolean upsert: (Optional) If set to false, values for existing timestamps will not be overridden. Default value is True.
+        :param int max_chunk_size: (Optional) The maximum number of datapoints per call. Default value is 10000.
+        :param int max_chunk_bytes: (Optional) The maximum size of the JSON body of a call, in bytes. Default value is 4MB.
+        :param int concurrency: (Optional) The maximum number of calls at the same time. Default value is 4.
+        :param boolean compress: (Optional) If True, send the bodies gzip-compressed. Only use it if the server, or
+            the proxy in front of it, accepts compressed request bodies. Default value is False.
+        :return: the number of datapoints pushed
+        :rtype: int
+        """
+        headers = {"Content-Encoding": "gzip"} if compress else None
+
+        def push(chunk):
+            body = b"[" + b",".join(chunk) + b"]"
+            if compress:
+                body = gzip.compress(body, compresslevel=6)
+            self.client._perform_empty("PUT", "/time-series/%s" % self.time_series_id, raw_body=body,
+                                       params={"upsert": upsert}, headers=headers)
+            return len(chunk)
+
+        chunks = self._iter_encoded_chunks(datapoints, max_chunk_size, max_chunk_bytes)
+        return sum(_iter_ordered_concurrently(push, chunks, concurrency))
+
+    def _iter_encoded_chunks(self, datapoints, max_chunk_size, max_chunk_bytes):
+        chunk = []
+        chunk_bytes = 2
+        for datapoint in datapoints:
+            encoded = json.dumps(dict(datapoint, timeSeriesId=self.time_series_id)).encode("utf8")
+            if len(chunk) > 0 and (len(chunk) >= max_chunk_size or chunk_bytes + len(encoded) + 1 > max_chunk_bytes):
+                yield chunk
+                chunk = []
+                chunk_bytes = 2
+            chunk.append(encoded)
+            chunk_bytes += len(encoded) + 1
+        if len(chunk) > 0:
+            yield chunk
+
     def delete(self, min_timestamp=None, max_timestamp=None):
         """
         Delete the values of the time series. Use the parameters `min_timestamp` and `max_timestamp` to define a time
@@ -16,13 +16,14 @@ from .govern.blueprint import GovernBlueprintListItem, GovernBlueprint
 from .govern.custom_page import GovernCustomPageListItem, GovernCustomPage
 from .govern.time_series import GovernTimeSeries
 from .govern.uploaded_file import GovernUploadedFile
-from .utils import handle_http_exception
+from .utils import handle_http_exception, _StreamingMultipartBody
+from .transport import TransportPolicy
 
 
 class GovernClient(object):
     """Entry point for the Dataiku Govern API client"""
 
-    def __init__(self, host, api_key=None, internal_ticket=None, extra_headers=None, no_check_certificate=False, client_certificate=None, **kwargs):
+    def __init__(self, host, api_key=None, internal_ticket=None, extra_headers=None, no_check_certificate=False, client_certificate=None, transport_policy=None, **kwargs):
         """Initialize a new Govern API client.
 
         Args:
@@ -33,6 +34,8 @@ class GovernClient(object):
             no_check_certificate (bool, optional): If True, disables SSL certificate verification.
                 Defaults to False.
             client_certificate (str or tuple, optional): Path to client certificate file or tuple of (cert, key) paths.
+            transport_policy (:class:`dataikuapi.transport.TransportPolicy`, optional): Timeouts, connection pool
+                and retries of the HTTP requests. Defaults to no timeout and no retry.
             **kwargs: Additional keyword arguments. Note: 'insecure_tls' is deprecated in favor of no_check_certificate.
 
         Note:
@@ -53,6 +56,8 @@ class GovernClient(object):
             self._session.verify = False
         if client_certificate:
             self._session.cert = client_certificate
+        self._transport_policy = transport_policy if transport_policy is not None else TransportPolicy()
+        self._transport_policy.mount(self._session)
 
         if self.api_key is not None:
             self._session.auth = HTTPBasicAuth(self.api_key, "")
@@ -691,7 +696,7 @@ class GovernClient(object):
     # Internal Request handling
     ########################################################
 
-    def _perform_http(self, method, path, params=None, body=None, stream=False, files=None, raw_body=None, headers=None):
+    def _perform_http(self, method, path, params=None, body=None, stream=False, files=None, raw_body=None, headers=None, timeout=None):
         if body is not None:
             body = json.dumps(body)
         if raw_body is not None:
@@ -699,33 +704,39 @@ class GovernClient(object):
 
         #logging.info("Request with headers=%s" % headers)
 
-        http_res = self._session.request(
-                method, "%s/dip/publicapi%s" % (self.host, path),
+        http_res = self._transport_policy.request(
+                self._session, method, "%s/dip/publicapi%s" % (self.host, path),
                 params=params, data=body,
                 files=files,
                 stream=stream,
                 headers=headers,
-                verify=self._session.verify)
+                verify=self._session.verify,
+                timeout=timeout)
         handle_http_exception(http_res)
         return http_res
 
-    def _perform_empty(self, method, path, params=None, body=None, files = None, raw_body=None, headers=None):
-        self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers)
+    def _perform_empty(self, method, path, params=None, body=None, files = None, raw_body=None, headers=None, timeout=None):
+        self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers, timeout=timeout)
 
-    def _perform_text(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None):
-        return self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers).text
+    def _perform_text(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None, timeout=None):
+        return self._perform_http(method, path, params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers, timeout=timeout).text
 
-    def _perform_json(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None):
-        return self._perform_http(method, path,  params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers).json()
+    def _perform_json(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None, timeout=None):
+        return self._perform_http(method, path,  params=params, body=body, files=files, stream=False, raw_body=raw_body, headers=headers, timeout=timeout).json()
 
-    def _perform_raw(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None):
-        return self._perform_http(method, path, params=params, body=body, files=files, stream=True, raw_body=raw_body, headers=headers)
+    def _perform_raw(self, method, path, params=None, body=None,files=None, raw_body=None, headers=None, timeout=None):
+        return self._perform_http(method, path, params=params, body=body, files=files, stream=True, raw_body=raw_body, headers=headers, timeout=timeout)
 
-    def _perform_json_upload(self, method, path, name, f):
-        http_res = self._session.request(
-            method, "%s/dip/publicapi%s" % (self.host, path),
-            files = {'file': (name, f, {'Expires': '0'})},
-            verify=self._session.verify)
+    def _perform_json_upload(self, method, path, name, f, params=None, timeout=None, progress_callback=None):
+        # the multipart body is streamed from f, never fully loaded in memory
+        body = _StreamingMultipartBody(name, f, progress_callback=progress_callback)
+        http_res = self._transport_policy.request(
+            self._session, method, "%s/dip/publicapi%s" % (self.host, path),
+            params=params,
+            data=body,
+            headers={"Content-Type": body.content_type},
+            verify=self._session.verify,
+            timeout=timeout)
 
         handle_http_exception(http_res)
         return http_res
@@ -930,16 +941,20 @@ class GovernClient(object):
         """
         return GovernUploadedFile(self, uploaded_file_id)
 
-    def upload_file(self, file_name, file):
+    def upload_file(self, file_name, file, progress_callback=None):
         """
         Upload a file on Dataiku Govern. Return a handle to interact with this new uploaded file.
 
+        The file is streamed, it is never fully loaded in memory.
+
         :param str file_name: Name of the file
-        :param stream file: file contents, as a stream - file-like object
+        :param stream file: file contents, as a stream - file-like object, or an iterable of bytes
+        :param progress_callback: (optional) function called as the file is sent, with the number of bytes sent so
+                                  far and the total size of the file (None if not known)
         :return: the newly uploaded file object
         :rtype: a :class:`~dataikuapi.govern.uploaded_file.GovernUploadedFile`
         """
-        description = self._perform_json_upload("POST", "/uploaded-files", file_name, file).json()
+        description = self._perform_json_upload("POST", "/uploaded-files", file_name, file, progress_callback=progress_callback).json()
         return GovernUploadedFile(self, description["id"])
 
 
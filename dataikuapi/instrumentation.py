@@ -0,0 +1,320 @@
+import bisect
+import logging
+import threading
+import time
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+
+class RequestEvent(object):
+    """
+    A HTTP request sent by an API client, as seen by the hooks of a :class:`RequestInstrumentation`.
+
+    Before hooks receive the event before the request is sent: only `method`, `url`, `path`, `path_template`,
+    `bytes_sent` and `start_time` are set. After hooks receive it once the request completed or failed.
+
+    .. important::
+
+        Do not create this class directly, the events are created by :class:`RequestInstrumentation`
+
+    :ivar str method: the HTTP method
+    :ivar str url: the full URL, without query string
+    :ivar str path: the path of the URL
+    :ivar str path_template: the path with the identifiers of objects replaced by `{}`, like
+                             "/dip/publicapi/projects/{}/datasets/{}/schema"
+    :ivar int status: the HTTP status of the last response, None if no response was received
+    :ivar int bytes_sent: the size of the request body, None if not known (streamed body)
+    :ivar int bytes_received: the size of the response body, None if not known (streamed response)
+    :ivar float start_time: the time the request started, as an epoch in seconds
+    :ivar float latency: the time until the response headers were received, including retries, in seconds
+    :ivar int retries: the number of retries of the request
+    :ivar error: the exception raised by the request, if any
+    """
+
+    def __init__(self, method, url, path, path_template, bytes_sent):
+        self.method = method.upper()
+        self.url = url
+        self.path = path
+        self.path_template = path_template
+        self.status = None
+        self.bytes_sent = bytes_sent
+        self.bytes_received = None
+        self.start_time = time.time()
+        self.latency = None
+        self.retries = 0
+        self.error = None
+
+    @property
+    def endpoint(self):
+        """
+        The endpoint of the request: its method and path template, like "GET /dip/publicapi/projects/{}/datasets/"
+
+        :rtype: str
+        """
+        return "%s %s" % (self.method, self.path_template)
+
+
+class RequestInstrumentation(object):
+    """
+    Hooks called around each HTTP request sent by API clients, to measure where the time goes.
+
+    Instrumentation is set on a :class:`dataikuapi.transport.TransportPolicy`, and applies to all the clients using
+    this policy: :class:`dataikuapi.DSSClient`, :class:`dataikuapi.GovernClient`, the FM clients and the API node clients.
+    Hooks are callables receiving a :class:`RequestEvent`. Errors raised by hooks are logged and otherwise ignored.
+
+    Usage example:
+
+    .. code-block:: python
+
+        stats = EndpointLatencyStats()
+        instrumentation = RequestInstrumentation(after_hooks=[stats])
+        client = DSSClient(host, api_key, transport_policy=TransportPolicy(instrumentation=instrumentation))
+        run_automation(client)
+        for endpoint, endpoint_stats in stats.get_top_endpoints(10):
+            print(endpoint, endpoint_stats["count"], endpoint_stats["totalSeconds"], endpoint_stats["p99Ms"])
+
+    The path template is built with a heuristic: in the paths of the public APIs, collections and identifiers alternate,
+    like in "/projects/{}/datasets/{}". Pass a `path_templater` for endpoints that do not follow this pattern.
+
+    :param list before_hooks: (optional) callables called with the :class:`RequestEvent` before each request
+    :param list after_hooks: (optional) callables called with the :class:`RequestEvent` after each request
+    :param path_templater: (optional) function returning the path template of a path, instead of the default heuristic
+    """
+
+    # path prefixes of the public APIs, with the number of identifiers that follow them
+    API_PREFIXES = [
+        ("/dip/publicapi", 0),
+        ("/public/api/v1", 2),
+        ("/public/api", 0),
+        ("/admin/api/v1", 0)
+    ]
+    # segments after which the next segment is not an identifier
+    NAMESPACE_SEGMENTS = frozenset(["admin", "actions", "contents-actions", "public", "private"])
+
+    def __init__(self, before_hooks=None, after_hooks=None, path_templater=None):
+        self.before_hooks = list(before_hooks) if before_hooks is not None else []
+        self.after_hooks = list(after_hooks) if after_hooks is not None else []
+        self.path_templater = path_templater
+
+    def add_before_hook(self, hook):
+        """
+        Add a hook called before each request
+
+        :param hook: a callable receiving a :class:`RequestEvent`
+        :returns: the hook
+        """
+        self.before_hooks.append(hook)
+        return hook
+
+    def add_after_hook(self, hook):
+        """
+        Add a hook called after each request, whether it succeeded or failed
+
+        :param hook: a callable receiving a :class:`RequestEvent`, for example a :class:`EndpointLatencyStats`
+        :returns: the hook
+        """
+        self.after_hooks.append(hook)
+        return hook
+
+    def get_path_template(self, path):
+        """
+        Get the path template of a path, grouping the requests to the same endpoint
+
+        :param str path: the path of a URL
+        :rtype: str
+        """
+        if self.path_templater is not None:
+            return self.path_templater(path)
+        prefix = ""
+        leading_ids = 0
+        for (api_prefix, ids) in self.API_PREFIXES:
+            if path == api_prefix or path.startswith(api_prefix + "/"):
+                prefix = api_prefix
+                leading_ids = ids
+                path = path[len(api_prefix):]
+                break
+        segments = path.split("/")
+        templated = []
+        is_id = False
+        for segment in segments:
+            if segment == "":
+                templated.append(segment)
+            elif leading_ids > 0:
+                templated.append("{}")
+                leading_ids -= 1
+            elif is_id:
+                templated.append("{}")
+                is_id = False
+            else:
+                templated.append(segment)
+                is_id = segment not in self.NAMESPACE_SEGMENTS
+        return prefix + "/".join(templated)
+
+    def _before(self, method, url, data):
+        path = urlsplit(url).path
+        event = RequestEvent(method, url.split("?", 1)[0], path, self.get_path_template(path), _get_body_size(data))
+        self._call_hooks(self.before_hooks, event)
+        return event
+
+    def _after(self, event, http_res, error):
+        event.latency = time.time() - event.start_time
+        event.error = error
+        if http_res is not None:
+            event.status = http_res.status_code
+            if http_res._content_consumed:
+                event.bytes_received = len(http_res.content) if http_res.content is not None else 0
+            else:
+                length = http_res.headers.get("Content-Length")
+                event.bytes_received = int(length) if length is not None and length.isdigit() else None
+        self._call_hooks(self.after_hooks, event)
+
+    @staticmethod
+    def _call_hooks(hooks, event):
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception:
+                logging.exception("Request instrumentation hook failed")
+
+
+def _get_body_size(data):
+    if data is None:
+        return 0
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode("utf8"))
+    return getattr(data, "len", None)
+
+
+class EndpointLatencyStats(object):
+    """
+    An after hook of :class:`RequestInstrumentation` aggregating the requests by endpoint (method and path template),
+    with a latency histogram per endpoint. It can be used from several threads.
+
+    :param list buckets_ms: (optional) upper bounds of the buckets of the latency histograms, in milliseconds
+    """
+
+    DEFAULT_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+    def __init__(self, buckets_ms=None):
+        self.buckets_ms = sorted(buckets_ms if buckets_ms is not None else self.DEFAULT_BUCKETS_MS)
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def __call__(self, event):
+        latency_ms = 1000.0 * event.latency
+        with self._lock:
+            stats = self._endpoints.get(event.endpoint)
+            if stats is None:
+                stats = {"count": 0, "errors": 0, "retries": 0, "totalSeconds": 0.0, "maxMs": 0.0,
+                         "bytesSent": 0, "bytesReceived": 0, "buckets": [0] * (len(self.buckets_ms) + 1)}
+                self._endpoints[event.endpoint] = stats
+            stats["count"] += 1
+            if event.error is not None or (event.status is not None and event.status >= 400):
+                stats["errors"] += 1
+            stats["retries"] += event.retries
+            stats["totalSeconds"] += event.latency
+            stats["maxMs"] = max(stats["maxMs"], latency_ms)
+            stats["bytesSent"] += event.bytes_sent or 0
+            stats["bytesReceived"] += event.bytes_received or 0
+            stats["buckets"][bisect.bisect_left(self.buckets_ms, latency_ms)] += 1
+
+    def reset(self):
+        """
+        Forget all the requests aggregated so far
+        """
+        with self._lock:
+            self._endpoints = {}
+
+    def get_stats(self):
+        """
+        Get the aggregated statistics of each endpoint
+
+        :returns: a dict of endpoint (like "GET /dip/publicapi/projects/{}/datasets/") to a dict with the "count" of
+                  requests, the number of "errors" and "retries", the "totalSeconds" spent, the "maxMs" latency, the
+                  "bytesSent" and "bytesReceived", the "histogram" as a list of (upper bound in ms, count) pairs (the
+                  last bound is None), and the "p50Ms", "p90Ms" and "p99Ms" latencies, estimated from the histogram
+        :rtype: dict
+        """
+        with self._lock:
+            endpoints = dict((endpoint, dict(stats, buckets=list(stats["buckets"]))) for (endpoint, stats) in self._endpoints.items())
+        result = {}
+        for (endpoint, stats) in endpoints.items():
+            buckets = stats.pop("buckets")
+            stats["histogram"] = list(zip(self.buckets_ms + [None], buckets))
+            for (name, q) in (("p50Ms", 0.5), ("p90Ms", 0.9), ("p99Ms", 0.99)):
+                stats[name] = self._estimate_percentile(buckets, stats["count"], q, stats["maxMs"])
+            result[endpoint] = stats
+        return result
+
+    def get_top_endpoints(self, n=10, by="totalSeconds"):
+        """
+        Get the endpoints where most time is spent
+
+        :param int n: (optional) the number of endpoints to return
+        :param str by: (optional) the statistic to sort by, like "totalSeconds", "count" or "p99Ms"
+        :returns: a list of (endpoint, statistics) pairs, see :meth:`get_stats`
+        :rtype: list
+        """
+        return sorted(self.get_stats().items(), key=lambda item: item[1][by], reverse=True)[:n]
+
+    def _estimate_percentile(self, buckets, count, q, max_ms):
+        # upper bound of the bucket of the percentile, capped by the maximum seen
+        rank = q * count
+        seen = 0
+        for (i, bucket_count) in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count > 0:
+                if i < len(self.buckets_ms):
+                    return min(float(self.buckets_ms[i]), max_ms)
+                return max_ms
+        return max_ms
+
+
+class OpenTelemetrySpanExporter(object):
+    """
+    An after hook of :class:`RequestInstrumentation` recording each request as an OpenTelemetry client span.
+
+    The span is named after the endpoint and carries the usual HTTP attributes. It is a child of the current span of the
+    thread that sent the request, if any.
+
+    .. note::
+
+        This exporter requires the opentelemetry-api package. The spans are exported by the OpenTelemetry SDK
+        configured in the process
+
+    :param tracer: (optional) the tracer to create the spans with. Defaults to the tracer "dataikuapi" of the global
+                   tracer provider
+    """
+
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("OpenTelemetrySpanExporter requires the opentelemetry-api package")
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("dataikuapi")
+
+    def __call__(self, event):
+        start_ns = int(event.start_time * 1e9)
+        span = self.tracer.start_span(event.endpoint, kind=self._trace.SpanKind.CLIENT, start_time=start_ns, attributes={
+            "http.request.method": event.method,
+            "url.full": event.url,
+            "url.template": event.path_template,
+            "http.request.resend_count": event.retries
+        })
+        if event.status is not None:
+            span.set_attribute("http.response.status_code", event.status)
+        if event.bytes_sent is not None:
+            span.set_attribute("http.request.body.size", event.bytes_sent)
+        if event.bytes_received is not None:
+            span.set_attribute("http.response.body.size", event.bytes_received)
+        if event.error is not None:
+            span.record_exception(event.error)
+        if event.error is not None or (event.status is not None and event.status >= 400):
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end(end_time=start_ns + int(event.latency * 1e9))
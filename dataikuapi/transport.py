@@ -0,0 +1,179 @@
+import random
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+from requests import exceptions
+from requests.adapters import HTTPAdapter
+
+from .utils import _ExponentialBackoff, dku_basestring_type
+
+
+class TransportPolicy(object):
+    """
+    Policy applied to the HTTP requests sent by an API client: timeouts, connection pool size and retries.
+
+    A policy can be passed to :class:`dataikuapi.DSSClient`, :class:`dataikuapi.GovernClient`, the FM clients,
+    :class:`dataikuapi.APINodeClient` and :class:`dataikuapi.APINodeAdminClient`, and can be shared between clients.
+    The default policy behaves like a plain `requests` session: no timeout, no retry, and a pool of 10 connections.
+
+    Failed requests are only retried if they are safe to replay: the HTTP method must be in `retry_methods`
+    (idempotent methods by default) and the request body must not be a stream. Waits between attempts grow
+    exponentially, with a random jitter, unless the server sends a Retry-After header.
+
+    Usage example:
+
+    .. code-block:: python
+
+        policy = TransportPolicy(connect_timeout=10, read_timeout=600, pool_maxsize=32, max_retries=5)
+        client = DSSClient(host, api_key, transport_policy=policy)
+
+    :param float connect_timeout: (optional) timeout in seconds to establish a connection, None for no timeout
+    :param float read_timeout: (optional) timeout in seconds between two bytes received from the server, None for
+                               no timeout
+    :param int pool_connections: (optional) number of per-host connection pools to keep, defaults to 10
+    :param int pool_maxsize: (optional) maximum number of connections kept open to a host, defaults to 10. Raise it
+                             when the client is used from many threads
+    :param int max_retries: (optional) maximum number of retries of a failed request, defaults to 0 (no retry)
+    :param list retry_statuses: (optional) HTTP status codes to retry, defaults to 429, 502, 503 and 504
+    :param list retry_methods: (optional) HTTP methods that can be retried, defaults to the idempotent methods
+    :param int backoff_initial_ms: (optional) wait before the first retry, in milliseconds
+    :param int backoff_max_ms: (optional) maximum wait between two attempts, in milliseconds
+    :param float backoff_factor: (optional) growth factor of the wait between two attempts
+    :param float jitter: (optional) fraction of each wait that is randomized, between 0 and 1
+    :param bool respect_retry_after: (optional) if True (default), wait for the delay given by the Retry-After
+                                     header of a response, when present
+    :param float max_retry_after: (optional) maximum wait accepted from a Retry-After header, in seconds
+    :param instrumentation: (optional) hooks called around each request, to measure where the time goes
+    :type instrumentation: :class:`dataikuapi.instrumentation.RequestInstrumentation`
+    """
+
+    DEFAULT_RETRY_STATUSES = (429, 502, 503, 504)
+    DEFAULT_RETRY_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+    def __init__(self, connect_timeout=None, read_timeout=None, pool_connections=10, pool_maxsize=10,
+                 max_retries=0, retry_statuses=DEFAULT_RETRY_STATUSES, retry_methods=DEFAULT_RETRY_METHODS,
+                 backoff_initial_ms=500, backoff_max_ms=30000, backoff_factor=2.0, jitter=0.5,
+                 respect_retry_after=True, max_retry_after=120, instrumentation=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+        self.backoff_initial_ms = backoff_initial_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.instrumentation = instrumentation
+
+    def mount(self, session):
+        """
+        Install the connection pool of this policy on a `requests` session
+
+        :param session: a :class:`requests.Session`
+        """
+        for prefix in ("http://", "https://"):
+            session.mount(prefix, HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize))
+
+    def get_timeout(self, timeout=None):
+        """
+        Get the timeout to use for a request
+
+        :param timeout: (optional) per-call timeout, either a number of seconds or a (connect, read) tuple. If None,
+                        the default timeouts of the policy are used
+        :returns: a timeout suitable for `requests`, or None for no timeout
+        """
+        if timeout is not None:
+            return timeout
+        if self.connect_timeout is None and self.read_timeout is None:
+            return None
+        return (self.connect_timeout, self.read_timeout)
+
+    def request(self, session, method, url, timeout=None, **kwargs):
+        """
+        Send a request on a session, retrying it according to this policy
+
+        :param session: the :class:`requests.Session` to use
+        :param str method: the HTTP method
+        :param str url: the full URL
+        :param timeout: (optional) per-call timeout, see :meth:`get_timeout`
+        :param kwargs: other arguments of :meth:`requests.Session.request`
+        :returns: the last response received. HTTP errors are not raised, only connection errors are
+        :rtype: :class:`requests.Response`
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._request(session, method, url, timeout, kwargs, None)
+
+        event = instrumentation._before(method, url, kwargs.get("data"))
+        try:
+            http_res = self._request(session, method, url, timeout, kwargs, event)
+        except Exception as e:
+            instrumentation._after(event, None, e)
+            raise
+        instrumentation._after(event, http_res, None)
+        return http_res
+
+    def _request(self, session, method, url, timeout, kwargs, event):
+        timeout = self.get_timeout(timeout)
+        replayable = method.upper() in self.retry_methods and self._is_replayable(kwargs)
+        backoff = None
+        attempt = 0
+        while True:
+            try:
+                http_res = session.request(method, url, timeout=timeout, **kwargs)
+            except exceptions.ConnectTimeout:
+                # the request was not sent, it can always be replayed if the body can be
+                if attempt >= self.max_retries or not self._is_replayable(kwargs):
+                    raise
+                retry_after = None
+            except (exceptions.ConnectionError, exceptions.Timeout):
+                if attempt >= self.max_retries or not replayable:
+                    raise
+                retry_after = None
+            else:
+                if attempt >= self.max_retries or not replayable or http_res.status_code not in self.retry_statuses:
+                    return http_res
+                retry_after = self._get_retry_after(http_res)
+                http_res.close()
+
+            attempt += 1
+            if event is not None:
+                event.retries = attempt
+            if backoff is None:
+                backoff = self._new_backoff()
+            time.sleep(self._get_sleep_time(backoff, retry_after))
+
+    def _new_backoff(self):
+        return _ExponentialBackoff(self.backoff_initial_ms, self.backoff_max_ms, self.backoff_factor)
+
+    def _get_sleep_time(self, backoff, retry_after):
+        if retry_after is not None:
+            return retry_after
+        sleep_time = float(backoff.next_sleep_time()) / 1000.0
+        return sleep_time * (1.0 - self.jitter * random.random())
+
+    def _get_retry_after(self, http_res):
+        if not self.respect_retry_after:
+            return None
+        value = http_res.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            parsed = parsedate_tz(value)
+            if parsed is None:
+                return None
+            delay = mktime_tz(parsed) - time.time()
+        return min(max(delay, 0.0), self.max_retry_after)
+
+    @staticmethod
+    def _is_replayable(kwargs):
+        if kwargs.get("files") is not None:
+            return False
+        data = kwargs.get("data")
+        return data is None or isinstance(data, (dku_basestring_type, bytes, dict, list, tuple))
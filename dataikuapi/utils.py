@@ -1,12 +1,15 @@
-import csv, sys
+import csv, io, re, sys
 from dateutil import parser as date_iso_parser
+from dateutil import tz as date_iso_tz
 from contextlib import closing
 import os
+from stat import S_ISREG
 import zipfile
 import itertools
 import sys
 import time
 from datetime import datetime
+from requests import exceptions as requests_exceptions
 
 if sys.version_info > (3,0):
     import codecs
@@ -28,7 +31,22 @@ def handle_http_exception(http_res):
             ex = http_res.json()
         except ValueError:
             ex = {"message": http_res.text}
-        raise DataikuException("%s: %s" % (ex.get("errorType", "Unknown error"), ex.get("detailedMessage", ex.get("message", "No message"))))
+        raise _get_http_exception(ex, http_res.status_code)
+
+def _get_http_exception(ex, status_code=None):
+    exception = DataikuException("%s: %s" % (ex.get("errorType", "Unknown error"), ex.get("detailedMessage", ex.get("message", "No message"))))
+    # kept to tell transient errors apart, see _is_transient_error
+    exception._status_code = status_code
+    return exception
+
+def _is_transient_error(e):
+    """
+    Whether a failed call may succeed if retried: connection errors, timeouts, and HTTP 429 or 5xx errors
+    """
+    if isinstance(e, (requests_exceptions.ConnectionError, requests_exceptions.Timeout, requests_exceptions.ChunkedEncodingError)):
+        return True
+    status_code = getattr(e, "_status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
 
 
 class DataikuUTF8CSVReader(object):
@@ -56,28 +74,65 @@ def none_if_throws(f):
     return aux
 
 
+_ISO_8601_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(Z)?)?\Z")
+
+
 class DataikuValueCaster(object):
-    def __init__(self, schema):
+    """
+    Casts raw values to Python values according to a DSS schema.
+
+    The casters are resolved once per schema. Values that cannot be cast are returned as None.
+
+    :param list schema: list of columns, each a dict with at least a "type"
+    :param bool raw_strings: if True, values are not cast and are returned as strings
+    """
+    def __init__(self, schema, raw_strings=False):
+        self.raw_strings = raw_strings
         self.casters = self._get_value_casters(schema)
-        
+        self._safe_casters = [none_if_throws(caster) for caster in self.casters]
+        self._column_casters = [self._get_column_caster(caster, safe_caster)
+                                for (caster, safe_caster) in zip(self.casters, self._safe_casters)]
+
     def _get_value_casters(self, schema):
         def decode(x):
             if sys.version_info > (3,0):
                 return x
             else:
                 return unicode(x, "utf8")
-    
+
+        if self.raw_strings:
+            return [decode for col in schema]
+
+        utc_tz = []
+
         def parse_iso_date(s):
             if s == "":
                 return None
-            else:
-                return date_iso_parser.parse(s)
-    
+            # fast path for the fixed format used by DSS, with the same result as the generic parser
+            m = _ISO_8601_RE.match(s)
+            if m is not None:
+                year, month, day, hour, minute, second, fraction, zulu = m.groups()
+                try:
+                    if hour is None:
+                        return datetime(int(year), int(month), int(day))
+                    microsecond = int(fraction.ljust(6, "0")) if fraction else 0
+                    tzinfo = None
+                    if zulu:
+                        if not utc_tz:
+                            # resolve once the timezone the generic parser assigns to "Z" (tzutc or tzlocal)
+                            utc_tz.append(date_iso_parser.parse("1970-01-01T00:00:00Z").tzinfo)
+                        tzinfo = utc_tz[0]
+                    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                                    microsecond, tzinfo)
+                except ValueError:
+                    pass
+            return date_iso_parser.parse(s)
+
         def str_to_bool(s):
             if s is None:
                 return False
             return s.lower() == "true"
-    
+
         CASTERS = {
             "tinyint" : int,
             "smallint" : int,
@@ -91,10 +146,59 @@ class DataikuValueCaster(object):
             "boolean": str_to_bool,
         }
         return [CASTERS.get(col["type"], decode) for col in schema]
-    
+
+    @staticmethod
+    def _get_column_caster(caster, safe_caster):
+        def cast_column(values):
+            try:
+                # whole column at once, only falls back to per-value error handling when a value is invalid
+                return list(map(caster, values))
+            except Exception:
+                return [safe_caster(val) for val in values]
+        return cast_column
+
     def cast_values(self, values):
-        return [none_if_throws(caster)(val)
-                for (caster, val) in dku_zip_longest(self.casters, values)]
+        """
+        Cast the values of one row
+
+        :param list values: the raw values, in schema order
+        :returns: the cast values, None for the values that could not be cast
+        :rtype: list
+        """
+        safe_casters = self._safe_casters
+        if len(values) == len(safe_casters):
+            return [caster(val) for (caster, val) in zip(safe_casters, values)]
+        return [caster(val) if caster is not None else None
+                for (caster, val) in dku_zip_longest(safe_casters, values)]
+
+    def cast_column(self, index, values):
+        """
+        Cast a chunk of values of a single column
+
+        :param int index: index of the column in the schema
+        :param list values: the raw values of the column
+        :returns: the cast values, None for the values that could not be cast
+        :rtype: list
+        """
+        if index >= len(self._column_casters):
+            return [None] * len(values)
+        return self._column_casters[index](values)
+
+    def cast_rows(self, rows):
+        """
+        Cast a chunk of rows, column by column
+
+        :param list rows: list of rows, each a list of raw values in schema order
+        :returns: the list of cast rows, with the same values as :meth:`cast_values` on each row
+        :rtype: list[list]
+        """
+        width = len(self._column_casters)
+        if any(len(row) != width for row in rows):
+            return [self.cast_values(row) for row in rows]
+        if width == 0 or len(rows) == 0:
+            return [[] for row in rows]
+        columns = [column_caster(column) for (column_caster, column) in zip(self._column_casters, zip(*rows))]
+        return [list(row) for row in zip(*columns)]
 
 
 class DataikuStreamedHttpUTF8CSVReader(object):
@@ -103,10 +207,15 @@ class DataikuStreamedHttpUTF8CSVReader(object):
 
     To verify the stream after all rows have been yielded, you must pass **ALL** the optional arguments:
     read_session_id, client, project_key, dataset_name
+
+    If raw_strings is True, values are returned as strings instead of being cast according to the schema.
     """
-    def __init__(self, schema, csv_stream, read_session_id=None, client=None, project_key=None, dataset_name=None):
+    CAST_CHUNK_SIZE = 256
+
+    def __init__(self, schema, csv_stream, read_session_id=None, client=None, project_key=None, dataset_name=None, raw_strings=False):
         self.schema = schema
         self.csv_stream = csv_stream
+        self.raw_strings = raw_strings
         # To verify a dataset streaming session
         self.read_session_id = read_session_id
         self.project_key = project_key
@@ -115,18 +224,119 @@ class DataikuStreamedHttpUTF8CSVReader(object):
 
     def iter_rows(self):
         schema = self.schema
-        value_caster = DataikuValueCaster(schema)
+        value_caster = DataikuValueCaster(schema, raw_strings=self.raw_strings)
         with closing(self.csv_stream) as r:
             if sys.version_info > (3,0):
                 raw_generator = codecs.iterdecode(r.raw, 'utf-8')
             else:
                 raw_generator = r.raw
-            for uncasted_tuple in csv.reader(raw_generator,
-                                                delimiter='\t',
-                                                quotechar='"',
-                                                doublequote=True):
-                yield value_caster.cast_values(uncasted_tuple)
-
+            reader = csv.reader(raw_generator,
+                                delimiter='\t',
+                                quotechar='"',
+                                doublequote=True)
+            # the first row is yielded as soon as it is read, then the chunks grow up to CAST_CHUNK_SIZE rows
+            chunk_size = 1
+            while True:
+                uncasted_rows = list(itertools.islice(reader, chunk_size))
+                if not uncasted_rows:
+                    break
+                chunk_size = min(chunk_size * 2, self.CAST_CHUNK_SIZE)
+                for row in value_caster.cast_rows(uncasted_rows):
+                    yield row
+
+        self._verify_stream()
+
+    def iter_batches(self, batch_size=10000, format="numpy"):
+        """
+        Iterate over the stream as batches of typed columns instead of rows.
+
+        With format "arrow", the TSV stream is parsed by pyarrow directly into typed column buffers (int64, double,
+        bool, timestamp and string offsets), without creating any per-row Python object. With format "numpy", the stream is
+        parsed by pyarrow into string columns, and each column is converted at once to a numpy array, also without any
+        per-row Python object.
+
+        :param int batch_size: maximum number of rows per batch
+        :param str format: "arrow" to yield :class:`pyarrow.RecordBatch` objects, "numpy" to yield dicts of column
+                           name -> numpy array. In numpy batches, float columns use NaN for missing values, date columns
+                           use NaT, string columns are object arrays with None, and int and boolean columns are
+                           :class:`numpy.ma.MaskedArray` masking missing, invalid or out of range values. Both formats
+                           parse the stream with pyarrow, which is required. Only empty cells are missing values
+        :returns: a generator over the batches
+        """
+        if format == "arrow":
+            batches = self._iter_arrow_batches(batch_size)
+        elif format == "numpy":
+            batches = self._iter_numpy_batches(batch_size)
+        else:
+            raise ValueError("Unsupported batch format: %s, expected 'arrow' or 'numpy'" % format)
+        for batch in batches:
+            yield batch
+        self._verify_stream()
+
+    def _iter_arrow_batches(self, batch_size):
+        import pyarrow as pa
+
+        arrow_types = {
+            "tinyint": pa.int64(),
+            "smallint": pa.int64(),
+            "int": pa.int64(),
+            "bigint": pa.int64(),
+            "float": pa.float64(),
+            "double": pa.float64(),
+            "boolean": pa.bool_(),
+            "date": pa.timestamp("ms", tz="UTC"),
+            "dateonly": pa.date32(),
+            "datetimenotz": pa.timestamp("ms"),
+        }
+        column_types = {col["name"]: arrow_types.get(col["type"], pa.string()) for col in self.schema}
+        for batch in self._iter_arrow_csv_batches(batch_size, column_types):
+            yield batch
+
+    def _iter_numpy_batches(self, batch_size):
+        import numpy as np
+        import pyarrow as pa
+
+        # parsed as strings by pyarrow, then converted column by column: no Python object per row
+        column_types = {col["name"]: pa.string() for col in self.schema}
+        for record_batch in self._iter_arrow_csv_batches(batch_size, column_types):
+            batch = {}
+            for (i, col) in enumerate(self.schema):
+                batch[col["name"]] = _arrow_column_to_numpy(np, pa, col["type"], record_batch.column(i))
+            yield batch
+
+    def _iter_arrow_csv_batches(self, batch_size, column_types):
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        column_names = [col["name"] for col in self.schema]
+        with closing(self.csv_stream) as r:
+            # only the empty cell of DSS is missing, not the default null values of pyarrow like "NA" or "null"
+            reader = pa_csv.open_csv(r.raw,
+                                     read_options=pa_csv.ReadOptions(column_names=column_names),
+                                     parse_options=pa_csv.ParseOptions(delimiter='\t', quote_char='"',
+                                                                       double_quote=True, newlines_in_values=True),
+                                     convert_options=pa_csv.ConvertOptions(column_types=column_types,
+                                                                           null_values=[""],
+                                                                           strings_can_be_null=True,
+                                                                           quoted_strings_can_be_null=False))
+            pending = []
+            pending_rows = 0
+            for record_batch in reader:
+                pending.append(record_batch)
+                pending_rows += record_batch.num_rows
+                if pending_rows < batch_size:
+                    continue
+                table = pa.Table.from_batches(pending).combine_chunks()
+                offset = 0
+                while pending_rows - offset >= batch_size:
+                    yield table.slice(offset, batch_size).to_batches()[0]
+                    offset += batch_size
+                pending = table.slice(offset).to_batches()
+                pending_rows -= offset
+            if pending_rows > 0:
+                yield pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
+
+    def _verify_stream(self):
         if self.read_session_id:
             # exception will be raised if there's an error while streaming
             self.client._perform_empty(
@@ -136,6 +346,77 @@ class DataikuStreamedHttpUTF8CSVReader(object):
                 })
 
 
+_NUMPY_INT_TYPES = {"tinyint", "smallint", "int", "bigint"}
+_NUMPY_FLOAT_TYPES = {"float", "double"}
+_NUMPY_DATE_UNITS = {"date": "datetime64[ms]", "datetimenotz": "datetime64[ms]", "dateonly": "datetime64[D]"}
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+def _arrow_column_to_numpy(np, pa, dss_type, column):
+    """Convert a pyarrow string column, null for missing cells, to a numpy array according to its DSS type"""
+    import pyarrow.compute as pc
+    if dss_type in _NUMPY_INT_TYPES or dss_type in _NUMPY_FLOAT_TYPES:
+        target = pa.int64() if dss_type in _NUMPY_INT_TYPES else pa.float64()
+        try:
+            cast = pc.cast(column, target)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # some cells are not parseable, fall back to the conversion of the strings
+            cast = None
+        if cast is not None:
+            if dss_type in _NUMPY_FLOAT_TYPES:
+                return cast.to_numpy(zero_copy_only=False)
+            return np.ma.MaskedArray(cast.fill_null(0).to_numpy(), mask=column.is_null().to_numpy(zero_copy_only=False))
+    elif dss_type == "boolean":
+        values = pc.equal(pc.utf8_lower(column), "true").fill_null(False)
+        return np.ma.MaskedArray(values.to_numpy(zero_copy_only=False), mask=column.is_null().to_numpy(zero_copy_only=False))
+    elif dss_type not in _NUMPY_DATE_UNITS:
+        return column.to_numpy(zero_copy_only=False)
+    return _column_to_numpy(np, dss_type, column.fill_null("").to_numpy(zero_copy_only=False))
+
+def _column_to_numpy(np, dss_type, values):
+    """Convert a column of raw TSV strings to a numpy array, according to its DSS type"""
+    strings = np.array(values, dtype=object)
+    missing = strings == ""
+    if dss_type in _NUMPY_INT_TYPES or dss_type in _NUMPY_FLOAT_TYPES:
+        target = np.int64 if dss_type in _NUMPY_INT_TYPES else np.float64
+        try:
+            data = np.where(missing, "0", strings).astype(str).astype(target)
+        except (ValueError, OverflowError):
+            # some cells are not parseable, fall back to a per-cell conversion
+            caster = int if target is np.int64 else float
+            parsed = [none_if_throws(caster)(v) for v in values]
+            if target is np.int64:
+                # values out of the int64 range are masked, as the invalid ones
+                parsed = [v if v is not None and _INT64_MIN <= v <= _INT64_MAX else None for v in parsed]
+            missing = np.array([v is None for v in parsed], dtype=bool)
+            data = np.array([0 if v is None else v for v in parsed], dtype=target)
+        if target is np.float64:
+            data[missing] = np.nan
+            return data
+        return np.ma.MaskedArray(data, mask=missing)
+    elif dss_type == "boolean":
+        return np.ma.MaskedArray(np.char.lower(strings.astype(str)) == "true", mask=missing)
+    elif dss_type in _NUMPY_DATE_UNITS:
+        unit = _NUMPY_DATE_UNITS[dss_type]
+        # numpy does not parse timezone designators: DSS dates are UTC, so the trailing Z is dropped
+        cleaned = np.where(missing, "NaT", np.char.rstrip(strings.astype(str), "Z"))
+        try:
+            return cleaned.astype(unit)
+        except ValueError:
+            parsed = [none_if_throws(date_iso_parser.parse)(v) if v != "" else None for v in values]
+            return np.array([_datetime_to_numpy_utc(np, v, unit) for v in parsed], dtype=unit)
+    else:
+        strings[missing] = None
+        return strings
+
+def _datetime_to_numpy_utc(np, value, unit):
+    if value is None:
+        return np.datetime64("NaT")
+    if value.tzinfo is not None:
+        value = value.astimezone(date_iso_tz.tzutc()).replace(tzinfo=None)
+    return np.datetime64(value).astype(unit)
+
+
 class CallableStr(str):
     def __init__(self, val):
         self.val = val
@@ -201,4 +482,120 @@ class _ExponentialBackoff(object):
     def sleep_next(self):
         sleep_time = float(self.next_sleep_time()) / 1000.0
         #print("Sleeping %.3f" % sleep_time)
-        time.sleep(sleep_time)
\ No newline at end of file
+        time.sleep(sleep_time)
+
+
+def _iter_ordered_concurrently(function, items, max_in_flight):
+    """
+    Yield function(item) for each item, in the order of the items, with at most `max_in_flight` calls running at
+    the same time in worker threads. Items are consumed lazily, as calls complete.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        try:
+            for item in items:
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(function, item))
+            while len(pending) > 0:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class _StreamingMultipartBody(object):
+    """
+    Body of a multipart/form-data request with a single file field, read from the source in fixed-size chunks as
+    the request is sent. The memory used does not depend on the size of the file.
+
+    The source can be bytes, a string (uploaded as UTF-8), a file-like object, or an iterable of bytes or strings.
+    The length of the body is known when the source is bytes, a string or a seekable binary file: `requests` then sends
+    it with a Content-Length header, and with chunked transfer encoding otherwise. The progress callback is called
+    after each chunk with the number of bytes of the source sent so far, and the total size of the source (None if
+    not known).
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, name, source, field_name="file", chunk_size=CHUNK_SIZE, progress_callback=None):
+        import uuid
+        self.boundary = uuid.uuid4().hex
+        self.content_type = "multipart/form-data; boundary=%s" % self.boundary
+        self.source = source.encode("utf8") if isinstance(source, dku_basestring_type) and not isinstance(source, bytes) else source
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+
+        disposition = 'form-data; name="%s"' % self._escape(field_name)
+        if name is not None:
+            disposition += '; filename="%s"' % self._escape(name)
+        self._head = ("--%s\r\nContent-Disposition: %s\r\nExpires: 0\r\nContent-Type: application/octet-stream\r\n\r\n"
+                      % (self.boundary, disposition)).encode("utf8")
+        self._tail = ("\r\n--%s--\r\n" % self.boundary).encode("utf8")
+
+        self.source_length = self._get_source_length()
+        # read by requests to set the Content-Length header
+        self.len = None if self.source_length is None else len(self._head) + self.source_length + len(self._tail)
+
+    @staticmethod
+    def _escape(value):
+        # same escaping as browsers, and as requests/urllib3
+        return value.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+    def _get_source_length(self):
+        if isinstance(self.source, bytes):
+            return len(self.source)
+        if not hasattr(self.source, "read") or isinstance(self.source, io.TextIOBase):
+            return None
+        try:
+            position = self.source.tell()
+            raw = self.source.raw if isinstance(self.source, io.BufferedReader) else self.source
+            if isinstance(raw, io.FileIO):
+                # only the file descriptor of a plain file tells the size of what is read, not the one under a
+                # wrapper like a gzip file
+                stat = os.fstat(raw.fileno())
+                if S_ISREG(stat.st_mode):
+                    return stat.st_size - position
+            end = self.source.seek(0, 2)
+            self.source.seek(position)
+            return end - position
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            # not seekable: sent with chunked transfer encoding
+            return None
+
+    def _iter_source(self):
+        if isinstance(self.source, bytes):
+            for i in range(0, len(self.source), self.chunk_size):
+                yield self.source[i:i + self.chunk_size]
+        elif hasattr(self.source, "read"):
+            while True:
+                chunk = self.source.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        else:
+            for chunk in self.source:
+                if chunk:
+                    yield chunk
+
+    def __iter__(self):
+        sent = 0
+        yield self._head
+        for chunk in self._iter_source():
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode("utf8")
+            yield chunk
+            sent += len(chunk)
+            if self.progress_callback is not None:
+                self.progress_callback(sent, self.source_length)
+        yield self._tail
+
+
+def _guess_upload_filename(f):
+    # same file name as requests sends for files={"file": f}
+    name = getattr(f, "name", None)
+    if isinstance(name, dku_basestring_type) and name and name[0] != "<" and name[-1] != ">":
+        return os.path.basename(name)
+    return "file"